@@ -0,0 +1,220 @@
+import json
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional
+
+from agents.context import load_sections, select_context
+from agents.llm import ABORTED_KEY, aborted, chat_json
+from agents.rules import (
+    extract_compositions, mech_records_from_table, merge_alloys, merge_records, property_gaps,
+)
+from agents.schemas import output_schema
+from config import RULES_FAST_PATH
+from agents.microstructure_agent import extract_grain_size_from_snippet
+
+
+MODEL_NAME = "qwen2.5:3b"
+CONTEXT_TOKENS = 2000
+
+
+def build_prompt(
+    text: str,
+    table_records: Optional[List[Dict[str, Any]]] = None,
+    gaps: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """
+    With `table_records` the records are extracted in full; with `gaps`
+    (see agents.rules.property_gaps) only the listed missing properties.
+    """
+    records_schema = ""
+    records_rules = ""
+    records_input = ""
+    if table_records is not None or gaps:
+        records_schema = """,
+  "records": [
+    {
+      "alloy": "AZ31",
+      "variant": "Sheet-RD",
+      "properties": {
+        "avg_grain_size_um": 15,
+        "TYS_MPa": 170,
+        "CYS_MPa": 72,
+        "SD": 2.36,
+        "UTS_MPa": 254,
+        "fracture_strain_pct": 22.2
+      },
+      "evidence": {
+        "source": "Table 1",
+        "snippet": "Table 1 Mechanical properties of the rolled sheets and extrudates ..."
+      }
+    }
+  ]"""
+    if table_records is not None:
+        records_rules = """
+- records: mechanical properties for each alloy+variant. Use Table 1 values
+  as the ground truth. Normalize variant capitalization exactly as:
+  Sheet-RD, Sheet-TD, Extrusion-ED, Extrusion-TD"""
+        records_input = f"""
+Table records:
+{json.dumps(table_records, indent=2)}
+"""
+    elif gaps:
+        records_rules = """
+- records: one record per alloy+variant listed under "Missing properties",
+  with the same alloy and variant, filling ONLY the listed missing
+  mechanical properties (null if not stated)"""
+        records_input = f"""
+Missing properties:
+{json.dumps(gaps, indent=2)}
+"""
+
+    return f"""
+You are a materials science data extraction agent.
+
+TASK:
+Extract, in ONE JSON object, everything below for each alloy mentioned in
+the paper (e.g., AZ31, ZE10):
+- alloys: alloy compositions (e.g. AZ31 = Mg + 3%Al + 1%Zn)
+- processing_routes: product form, condition, heat treatment / extrusion
+  temperatures (°C) and times (h), casting/homogenization steps, thickness (mm)
+- microstructures: average grain size (µm), recrystallized or not, grain
+  morphology, texture, differences between rolled sheet and extruded material{records_rules}
+
+RULES:
+- Use ONLY information explicitly stated in the text. Do NOT infer or hallucinate.
+- If a value is not explicitly stated, use null.
+- Keep numerical values numeric, not strings.
+- Use element symbols properly: Mg, Al, Zn, Ce. If composition is written
+  like "Mg+3 %Al+1 %Zn", parse it correctly.
+- Evidence snippets must be copied verbatim from the paper text.
+- Return STRICT JSON only.
+
+OUTPUT JSON SCHEMA:
+{{
+  "alloys": [
+    {{
+      "alloy_name": "AZ31",
+      "composition": [
+        {{"element": "Mg", "percent": null}},
+        {{"element": "Al", "percent": 3}},
+        {{"element": "Zn", "percent": 1}}
+      ],
+      "evidence": {{"snippet": "A well-known ... AZ31 (Mg+3 %Al+1 %Zn) ..."}}
+    }}
+  ],
+  "processing_routes": [
+    {{
+      "material_form": "rolled sheet",
+      "condition": "O-temper",
+      "thickness_mm": 2,
+      "steps": [
+        {{"step": "annealed", "temperature_C": null, "time_h": null}}
+      ],
+      "evidence": {{"snippet": "The two alloys are used in form of magnesium sheets in an annealed condition (O-temper) with a thickness of 2 mm."}}
+    }}
+  ],
+  "microstructures": [
+    {{
+      "alloy": "AZ31",
+      "material_form": "rolled sheet",
+      "avg_grain_size_um": 15,
+      "recrystallized": true,
+      "grain_morphology": "equi-axed",
+      "texture": "strong basal texture",
+      "evidence": {{"snippet": "The sheets reveal a fully recrystallized microstructure resulting in a comparable average grain size of 15 μm."}}
+    }}
+  ]{records_schema}
+}}
+{records_input}
+Paper text:
+{text[:8000]}
+""".strip()
+
+
+def split_combined(data: Dict[str, Any], with_records: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Split a combined response into the per-agent output documents."""
+    parts = {
+        "composition": {"alloys": data.get("alloys", [])},
+        "processing": {"processing_routes": data.get("processing_routes", [])},
+        "microstructure": {"microstructures": data.get("microstructures", [])},
+    }
+    if with_records:
+        parts["mechanical"] = {"records": data.get("records", [])}
+    return parts
+
+
+def run_combined_agent(
+    sections: str | Path | Dict[str, str],
+    table_records: Optional[List[Dict[str, Any]]] = None,
+    on_item: Optional[Callable[[str, Any], None]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Single-pass alternative to running the composition, processing and
+    microstructure (and, given table records, mechanical) agents
+    separately: the paper text is sent once and the union schema comes
+    back in one response. Returns the per-agent output documents.
+    """
+    sections = load_sections(sections)
+
+    source_text = select_context(sections, "combined", CONTEXT_TOKENS)
+
+    # Table rows that map to records by rule are left out of the prompt;
+    # only the properties they leave null are asked for
+    rule_records = None
+    gaps = None
+    if table_records is not None and not table_records:
+        # No mechanical-property table in the paper, so no records
+        rule_records, table_records = [], None
+    elif RULES_FAST_PATH and table_records:
+        rule_records = mech_records_from_table(table_records) or None
+        if rule_records is not None:
+            gaps = property_gaps(rule_records)
+            table_records = None
+
+    prompt = build_prompt(source_text, table_records, gaps)
+
+    keys = ["alloys", "processing_routes", "microstructures"]
+    if table_records is not None or gaps:
+        keys.append("records")
+
+    # Gap records are partial; the merged records are passed on below
+    item_callback = on_item
+    if gaps and on_item is not None:
+        def item_callback(key, item):
+            if key != "records":
+                on_item(key, item)
+
+    data = chat_json(
+        model=MODEL_NAME,
+        messages=[
+            {"role": "system", "content": "Return only valid JSON. No markdown."},
+            {"role": "user", "content": prompt},
+        ],
+        schema=output_schema(*keys),
+        options={"temperature": 0},
+        on_item=item_callback,
+    )
+
+    # 🔒 Deterministic numeric correction (no hallucination)
+    for entry in data.get("microstructures", []):
+        if entry.get("avg_grain_size_um") is None:
+            snippet = entry.get("evidence", {}).get("snippet", "")
+            extracted = extract_grain_size_from_snippet(snippet)
+            if extracted is not None:
+                entry["avg_grain_size_um"] = extracted
+
+    if RULES_FAST_PATH:
+        data["alloys"] = merge_alloys(extract_compositions(source_text), data.get("alloys", []))
+
+    parts = split_combined(data, with_records=table_records is not None)
+    if rule_records is not None:
+        records = merge_records(rule_records, data.get("records", []))
+        if on_item is not None:
+            for record in records:
+                on_item("records", record)
+        parts["mechanical"] = {"records": records}
+
+    # A truncated response leaves every part incomplete
+    if aborted(data):
+        for part in parts.values():
+            part[ABORTED_KEY] = aborted(data)
+    return parts
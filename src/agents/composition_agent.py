@@ -1,21 +1,15 @@
-import json
-import re
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Callable, Optional
 
-import ollama
+from agents.context import load_sections, select_context
+from agents.llm import chat_json
+from agents.rules import fast_compositions, merge_alloys
+from agents.schemas import COMPOSITION_SCHEMA
+from config import RULES_FAST_PATH
 
 
 MODEL_NAME = "qwen2.5:3b"
-
-
-def strip_code_fences(text: str) -> str:
-    text = text.strip()
-    if text.startswith("```"):
-        text = re.sub(r"^```[a-zA-Z]*\n?", "", text)
-    if text.endswith("```"):
-        text = text[:-3].strip()
-    return text.strip()
+CONTEXT_TOKENS = 2000
 
 
 def build_prompt(full_text: str) -> str:
@@ -59,32 +53,38 @@ Paper text:
 """.strip()
 
 
-def run_composition_agent(sections_json_path: str | Path) -> Dict[str, Any]:
-    sections_json_path = Path(sections_json_path)
+def run_composition_agent(
+    sections: str | Path | Dict[str, str],
+    on_item: Optional[Callable[[str, Any], None]] = None,
+) -> Dict[str, Any]:
+    sections = load_sections(sections)
 
-    if not sections_json_path.exists():
-        raise FileNotFoundError(f"Missing sections JSON: {sections_json_path}")
+    # Paragraphs that mention alloys and wt% figures, wherever they are
+    full_text = select_context(sections, "composition", CONTEXT_TOKENS)
 
-    sections = json.loads(sections_json_path.read_text(encoding="utf-8"))
-
-    # intro contains “Materials and Microstructures” in your case
-    intro_text = sections.get("introduction", "") or ""
-    full_text = intro_text
+    # Composition strings and designations (AZ31, ZE10) are parsed by
+    # rules; the LLM is asked only when some alloy is left incomplete
+    rule_alloys = []
+    if RULES_FAST_PATH:
+        rule_alloys, complete = fast_compositions(full_text)
+        if complete:
+            if on_item is not None:
+                for alloy in rule_alloys:
+                    on_item("alloys", alloy)
+            return {"alloys": rule_alloys}
 
     prompt = build_prompt(full_text)
 
-    response = ollama.chat(
+    data = chat_json(
         model=MODEL_NAME,
         messages=[
             {"role": "system", "content": "Return only valid JSON. No markdown, no explanation."},
             {"role": "user", "content": prompt},
         ],
-        options={"temperature": 0}
+        schema=COMPOSITION_SCHEMA,
+        options={"temperature": 0},
+        on_item=on_item,
     )
 
-    content = strip_code_fences(response["message"]["content"])
-
-    try:
-        return json.loads(content)
-    except Exception as e:
-        raise ValueError(f"LLM returned non-JSON output.\nError: {e}\n\nOutput:\n{content}")
+    data["alloys"] = merge_alloys(rule_alloys, data.get("alloys", []))
+    return data
@@ -0,0 +1,176 @@
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List, Iterable
+
+
+# Rough size of a token for the small local models we run
+CHARS_PER_TOKEN = 4
+CHUNK_CHARS = 600
+
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(])")
+TOKEN_RE = re.compile(r"[a-zα-ωµ°]+|\d+(?:\.\d+)?|%", re.IGNORECASE)
+
+# Per-agent vocabulary. Query terms go through the same tokenizer as the
+# text, so "wt%" matches "wt" and "%" and "°C" matches "°c".
+AGENT_QUERIES = {
+    "composition": [
+        "composition", "compositions", "alloy", "alloys", "nominal", "chemical",
+        "wt%", "at%", "mass", "balance", "Mg", "Al", "Zn", "Mn", "Ce", "Zr", "Y",
+        "Nd", "Ca", "rare", "earth",
+    ],
+    "processing": [
+        "annealed", "annealing", "anneal", "°C", "h", "min", "extruded", "extrusion",
+        "rolled", "rolling", "homogenization", "homogenized", "cast", "casting",
+        "temper", "O-temper", "thickness", "mm", "heat", "treatment", "billet", "slab",
+        "sheet", "sheets", "profile", "ratio",
+    ],
+    "microstructure": [
+        "grain", "grains", "size", "μm", "µm", "um", "recrystallized",
+        "recrystallization", "texture", "basal", "equi-axed", "equiaxed", "elongated",
+        "morphology", "microstructure", "microstructures", "EBSD", "twin", "twins",
+        "pole", "figure", "intensity",
+    ],
+    "mechanical": [
+        "MPa", "GPa", "yield", "tensile", "compressive", "strength", "TYS", "CYS",
+        "UTS", "elongation", "fracture", "strain", "stress", "hardening", "asymmetry",
+        "RD", "TD", "ED",
+    ],
+}
+AGENT_QUERIES["combined"] = (
+    AGENT_QUERIES["composition"]
+    + AGENT_QUERIES["processing"]
+    + AGENT_QUERIES["microstructure"]
+)
+
+# Numbers with the unit an agent is after are the strongest signal that a
+# chunk carries extractable data
+UNIT_PATTERNS = {
+    "composition": re.compile(r"\d+(?:\.\d+)?\s*(?:wt\.?|at\.?)?\s*%\s*[A-Z][a-z]?"),
+    "processing": re.compile(r"\d+(?:\.\d+)?\s*(?:°\s*C|h\b|min\b|mm\b)"),
+    "microstructure": re.compile(r"\d+(?:\.\d+)?\s*[μµu]m\b"),
+    "mechanical": re.compile(r"\d+(?:\.\d+)?\s*[MG]Pa\b"),
+}
+UNIT_WEIGHT = 1.0
+MAX_UNIT_BONUS = 5
+
+
+def load_sections(sections: str | Path | Dict[str, str]) -> Dict[str, str]:
+    """Agents take either a sections dict (from the store) or a JSON path."""
+    if isinstance(sections, dict):
+        return sections
+
+    sections_json_path = Path(sections)
+    if not sections_json_path.exists():
+        raise FileNotFoundError(f"Missing sections JSON: {sections_json_path}")
+    return json.loads(sections_json_path.read_text(encoding="utf-8"))
+
+
+def tokenize(text: str) -> List[str]:
+    return [t.lower() for t in TOKEN_RE.findall(text)]
+
+
+def chunk_sections(
+    sections: Dict[str, str],
+    exclude: Iterable[str] = ("references",),
+    chunk_chars: int = CHUNK_CHARS,
+) -> List[Dict[str, Any]]:
+    """
+    Split section texts into chunks of whole sentences of roughly
+    `chunk_chars` characters, in document order.
+    """
+    exclude = set(exclude)
+    chunks = []
+    for name, text in sections.items():
+        if name in exclude or not text:
+            continue
+
+        text = " ".join(text.split())
+        current = ""
+        for sentence in SENTENCE_SPLIT_RE.split(text):
+            if current and len(current) + len(sentence) + 1 > chunk_chars:
+                chunks.append({"section": name, "order": len(chunks), "text": current})
+                current = ""
+            current = f"{current} {sentence}" if current else sentence
+        if current:
+            chunks.append({"section": name, "order": len(chunks), "text": current})
+    return chunks
+
+
+class ContextIndex:
+    """BM25 index over the chunks of one paper's sections."""
+
+    def __init__(self, sections: Dict[str, str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunk_sections(sections)
+        self.k1 = k1
+        self.b = b
+
+        self._tf = [Counter(tokenize(c["text"])) for c in self.chunks]
+        self._len = [sum(tf.values()) for tf in self._tf]
+        self._avg_len = (sum(self._len) / len(self._len)) if self._len else 0.0
+
+        df = Counter()
+        for tf in self._tf:
+            df.update(tf.keys())
+        n = len(self.chunks)
+        self._idf = {
+            term: math.log(1 + (n - freq + 0.5) / (freq + 0.5)) for term, freq in df.items()
+        }
+
+    def scores(self, agent: str) -> List[float]:
+        terms = set(tokenize(" ".join(AGENT_QUERIES[agent])))
+        patterns = (
+            [UNIT_PATTERNS[agent]] if agent in UNIT_PATTERNS
+            else [UNIT_PATTERNS[a] for a in ("composition", "processing", "microstructure")]
+        )
+
+        scores = []
+        for chunk, tf, length in zip(self.chunks, self._tf, self._len):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self._avg_len) if self._avg_len else self.k1
+            for term in terms:
+                f = tf.get(term)
+                if f:
+                    score += self._idf[term] * f * (self.k1 + 1) / (f + norm)
+
+            unit_hits = sum(len(p.findall(chunk["text"])) for p in patterns)
+            score += UNIT_WEIGHT * min(unit_hits, MAX_UNIT_BONUS)
+            scores.append(score)
+        return scores
+
+    def select(self, agent: str, budget_tokens: int) -> str:
+        """
+        Highest-scoring chunks for `agent` that fit in `budget_tokens`,
+        joined back in document order. Falls back to the leading chunks
+        when nothing matches the agent's vocabulary.
+        """
+        budget = budget_tokens * CHARS_PER_TOKEN
+        scores = self.scores(agent)
+
+        if any(s > 0 for s in scores):
+            ranked = sorted(
+                (i for i in range(len(self.chunks)) if scores[i] > 0),
+                key=lambda i: (-scores[i], i),
+            )
+        else:
+            ranked = list(range(len(self.chunks)))
+
+        picked = []
+        used = 0
+        for i in ranked:
+            size = len(self.chunks[i]["text"]) + 2
+            if used + size > budget:
+                continue
+            picked.append(i)
+            used += size
+
+        if not picked and ranked:
+            return self.chunks[ranked[0]]["text"][:budget]
+
+        return "\n\n".join(self.chunks[i]["text"] for i in sorted(picked))
+
+
+def select_context(sections: Dict[str, str], agent: str, budget_tokens: int) -> str:
+    return ContextIndex(sections).select(agent, budget_tokens)
@@ -0,0 +1,136 @@
+import json
+from typing import Dict, Any, List, Tuple, Iterable, Optional
+
+
+class StreamAborted(Exception):
+    pass
+
+
+class JSONStreamParser:
+    """
+    Incremental parser for agent responses shaped like
+    {"records": [{...}, {...}], ...}.
+
+    Text is fed in chunks as the model generates it; every object inside a
+    top-level array is returned as soon as its closing brace arrives.
+    StreamAborted is raised once the output can no longer be a valid
+    response: text before the opening brace, an unexpected top-level key,
+    the same item repeated over and over, or a runaway length.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str],
+        max_items: int = 200,
+        max_repeats: int = 3,
+        max_chars: int = 40000,
+    ):
+        self.keys = set(keys)
+        self.max_items = max_items
+        self.max_repeats = max_repeats
+        self.max_chars = max_chars
+
+        self.text = ""
+        self.items: Dict[str, List[Any]] = {}
+        self.done = False
+
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = False
+        self._key = None
+        self._array_key = None
+        self._item_start = None
+        self._last_item = None
+        self._repeats = 0
+        self._count = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        if len(self.text) > self.max_chars:
+            raise StreamAborted(f"output exceeded {self.max_chars} characters")
+
+        completed = []
+        text = self.text
+        while self._pos < len(text) and not self.done:
+            c = text[self._pos]
+            i = self._pos
+            self._pos += 1
+
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                    continue
+                prefix = text[:i + 1].strip()
+                if prefix and not "```json".startswith(prefix.lower()):
+                    raise StreamAborted(f"output does not start with a JSON object: {prefix[:40]!r}")
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = json.loads(text[self._string_start:i + 1])
+                        self._expect_key = False
+                        if self._key not in self.keys:
+                            raise StreamAborted(f"unexpected top-level key {self._key!r}")
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                if self._depth == 1 and c == "[":
+                    self._array_key = self._key
+                    self.items.setdefault(self._key, [])
+                elif self._depth == 2 and self._array_key is not None and c == "{":
+                    self._item_start = i
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 2 and c == "}" and self._item_start is not None:
+                    try:
+                        item = json.loads(text[self._item_start:i + 1])
+                    except ValueError as e:
+                        raise StreamAborted(f"malformed item: {e}")
+                    self._item_start = None
+                    self._add_item(item)
+                    completed.append((self._array_key, item))
+                elif self._depth == 1 and c == "]":
+                    self._array_key = None
+                elif self._depth == 0:
+                    self.done = True
+            elif c == "," and self._depth == 1:
+                self._expect_key = True
+
+        return completed
+
+    def _add_item(self, item: Any) -> None:
+        if item == self._last_item:
+            self._repeats += 1
+            if self._repeats >= self.max_repeats:
+                raise StreamAborted(f"item repeated {self._repeats + 1} times")
+        else:
+            self._last_item = item
+            self._repeats = 0
+
+        self._count += 1
+        if self._count > self.max_items:
+            raise StreamAborted(f"more than {self.max_items} items")
+
+        self.items[self._array_key].append(item)
+
+    def partial_result(self, keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Items completed so far, with an empty list for missing keys."""
+        result = {key: [] for key in (keys or [])}
+        result.update({key: list(items) for key, items in self.items.items()})
+        return result
@@ -0,0 +1,300 @@
+import json
+import random
+import re
+import threading
+import time
+from typing import Dict, Any, List, Optional, Callable, Iterable
+
+import httpx
+import ollama
+
+from agents.json_stream import JSONStreamParser, StreamAborted
+from agents.llm_cache import ResponseCache, cache_key, to_dict
+from agents.ollama_pool import get_pool
+from agents.schemas import validate
+from config import (
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF_S,
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_MAX_BYTES,
+    LLM_STREAMING,
+    LLM_STRUCTURED_OUTPUT,
+)
+import metrics
+
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Set on the result of a stream stopped early, with the reason. Such a
+# result is truncated: it is saved, but the job counts as failed and is
+# run again (see agents.scheduler and pipeline).
+ABORTED_KEY = "_aborted"
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def strip_code_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```[a-zA-Z]*\n?", "", text)
+    if text.endswith("```"):
+        text = text[:-3].strip()
+    return text.strip()
+
+
+def parse_json_content(content: str) -> Dict[str, Any]:
+    content = strip_code_fences(content)
+    try:
+        return json.loads(content)
+    except Exception as e:
+        raise ValueError(f"LLM returned non-JSON output.\nError: {e}\n\nOutput:\n{content}")
+
+
+def get_cache() -> Optional[ResponseCache]:
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES)
+    return _cache
+
+
+def aborted(data: Any) -> Optional[str]:
+    """Why an agent output was cut short, or None if it is complete."""
+    return data.get(ABORTED_KEY) if isinstance(data, dict) else None
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError))
+
+
+def _chat_with_retry(model, messages, options, **kwargs):
+    # Requests in flight are bounded per host by the pool, so extra
+    # callers wait there instead of piling up in a server's queue; a
+    # retry goes to another host if there is one
+    attempt = 0
+    failed = None
+    while True:
+        host = None
+        try:
+            with get_pool().host(model, avoid=failed) as host:
+                return host.client.chat(model=model, messages=messages, options=options, **kwargs)
+        except Exception as e:
+            if attempt >= LLM_MAX_RETRIES or not is_transient(e):
+                raise
+            failed = host
+            delay = LLM_RETRY_BACKOFF_S * (2 ** attempt) * (0.5 + random.random())
+            attempt += 1
+            time.sleep(delay)
+
+
+def chat(
+    model: str,
+    messages: List[Dict[str, str]],
+    options: Optional[Dict[str, Any]] = None,
+    check: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **kwargs,
+):
+    """
+    Drop-in replacement for `ollama.chat` shared by all agents.
+
+    Retries transient failures (connection errors, timeouts, 5xx/429)
+    with jittered exponential backoff. Deterministic requests
+    (temperature 0, not streamed) are served from the response cache.
+    `check` raises ValueError on an unusable response; such a response
+    is neither cached nor served from the cache, so a retry asks again.
+    """
+    cache = get_cache()
+    cacheable = (
+        cache is not None
+        and not kwargs.get("stream")
+        and (options or {}).get("temperature") == 0
+    )
+    if not cacheable:
+        start = time.perf_counter()
+        response = _chat_with_retry(model, messages, options, **kwargs)
+        if not kwargs.get("stream"):
+            metrics.record_llm(model, response, time.perf_counter() - start)
+        return response
+
+    key = cache_key(model, messages, options, **kwargs)
+    cached = cache.get(key)
+    if cached is not None and _passes(check, cached):
+        metrics.record_llm(model, cached, 0.0, cached=True)
+        return cached
+
+    start = time.perf_counter()
+    response = to_dict(_chat_with_retry(model, messages, options, **kwargs))
+    metrics.record_llm(model, response, time.perf_counter() - start)
+    if check is not None:
+        check(response)
+    cache.put(key, model, response)
+    return response
+
+
+def _passes(check: Optional[Callable[[Dict[str, Any]], None]], data: Dict[str, Any]) -> bool:
+    if check is None:
+        return True
+    try:
+        check(data)
+    except ValueError:
+        return False
+    return True
+
+
+def _stream_with_retry(model, messages, options, parser, on_item, **kwargs):
+    attempt = 0
+    failed = None
+    while True:
+        received = False
+        final = None
+        host = None
+        try:
+            with get_pool().host(model, avoid=failed) as host:
+                stream = host.client.chat(
+                    model=model, messages=messages, options=options, stream=True, **kwargs
+                )
+                try:
+                    for chunk in stream:
+                        received = True
+                        for key, item in parser.feed(chunk["message"]["content"]):
+                            if on_item is not None:
+                                on_item(key, item)
+                        if chunk.get("done"):
+                            final = chunk
+                finally:
+                    # Closing the stream drops the HTTP response, which makes
+                    # Ollama stop generating for an aborted request
+                    if hasattr(stream, "close"):
+                        stream.close()
+            return final
+        except StreamAborted:
+            raise
+        except Exception as e:
+            # Once tokens have been consumed a retry would re-emit items
+            if received or attempt >= LLM_MAX_RETRIES or not is_transient(e):
+                raise
+            failed = host
+            delay = LLM_RETRY_BACKOFF_S * (2 ** attempt) * (0.5 + random.random())
+            attempt += 1
+            time.sleep(delay)
+
+
+def stream_json(
+    model: str,
+    messages: List[Dict[str, str]],
+    keys: Iterable[str],
+    options: Optional[Dict[str, Any]] = None,
+    on_item: Optional[Callable[[str, Any], None]] = None,
+    check: Optional[Callable[[Dict[str, Any]], None]] = None,
+    **kwargs,
+) -> Dict[str, Any]:
+    """
+    Stream a JSON response token by token. Each object in one of the
+    top-level `keys` arrays is passed to `on_item` as soon as it closes.
+    If the output diverges from the expected shape or starts repeating,
+    generation is stopped and the items completed so far are returned,
+    marked with ABORTED_KEY. Only output that parses and passes `check`
+    (see chat) is cached.
+    """
+    keys = list(keys)
+
+    cache = get_cache()
+    cacheable = cache is not None and (options or {}).get("temperature") == 0
+    if cacheable:
+        key = cache_key(model, messages, options, **kwargs)
+        cached = cache.get(key)
+        data = None
+        if cached is not None:
+            try:
+                data = parse_json_content(cached["message"]["content"])
+            except ValueError:
+                pass
+        if data is not None and _passes(check, data):
+            metrics.record_llm(model, cached, 0.0, cached=True)
+            if on_item is not None:
+                for name in keys:
+                    for item in data.get(name) or []:
+                        on_item(name, item)
+            return data
+
+    parser = JSONStreamParser(keys)
+    start = time.perf_counter()
+    try:
+        final = _stream_with_retry(model, messages, options, parser, on_item, **kwargs)
+        metrics.record_llm(model, final, time.perf_counter() - start)
+    except StreamAborted as e:
+        # Aborted streams end without Ollama's final counts
+        metrics.record_llm(model, None, time.perf_counter() - start, aborted=True)
+        print(f"⚠️  Stopped generation early ({e}); keeping {sum(map(len, parser.items.values()))} items")
+        return {**parser.partial_result(keys), ABORTED_KEY: str(e)}
+
+    data = parse_json_content(parser.text)
+    if check is not None:
+        check(data)
+
+    if cacheable:
+        response = to_dict(final) if final is not None else {"model": model}
+        response["message"] = {"role": "assistant", "content": parser.text}
+        cache.put(key, model, response)
+
+    return data
+
+
+def chat_json(
+    model: str,
+    messages: List[Dict[str, str]],
+    keys: Optional[Iterable[str]] = None,
+    options: Optional[Dict[str, Any]] = None,
+    on_item: Optional[Callable[[str, Any], None]] = None,
+    schema: Optional[Dict[str, Any]] = None,
+    **kwargs,
+) -> Dict[str, Any]:
+    """
+    Request a JSON object whose top-level `keys` hold arrays of items.
+
+    With a `schema`, `keys` default to its properties, decoding is
+    constrained through Ollama's structured-output `format` and the
+    response is validated against the same schema. Streams when
+    LLM_STREAMING is on. Raises ValueError on invalid output.
+    """
+    check = None
+    if schema is not None:
+        if keys is None:
+            keys = list(schema["properties"])
+        if LLM_STRUCTURED_OUTPUT:
+            kwargs["format"] = schema
+
+        # Validated before caching, so a bad reply is not replayed
+        def check(data):
+            errors = validate(data, schema)
+            if errors:
+                raise ValueError(
+                    "LLM output does not match the schema:\n" + "\n".join(errors[:20])
+                )
+    keys = list(keys or [])
+
+    if LLM_STREAMING:
+        data = stream_json(model, messages, keys, options, on_item=on_item, check=check, **kwargs)
+    else:
+        response = chat(
+            model, messages, options,
+            check=None if check is None else lambda r: check(parse_json_content(r["message"]["content"])),
+            **kwargs,
+        )
+        data = parse_json_content(response["message"]["content"])
+        if on_item is not None:
+            for name in keys:
+                for item in data.get(name) or []:
+                    on_item(name, item)
+
+    # Partial results of an aborted stream were not checked yet
+    if check is not None:
+        check(data)
+
+    return data
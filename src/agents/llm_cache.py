@@ -0,0 +1,179 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    response    TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created     REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+CREATE INDEX IF NOT EXISTS responses_model ON responses (model);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def cache_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    options: Optional[Dict[str, Any]] = None,
+    **extra,
+) -> str:
+    payload = json.dumps(
+        {"model": model, "messages": messages, "options": options or {}, "extra": extra},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def to_dict(response) -> Dict[str, Any]:
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json")
+    return dict(response)
+
+
+class ResponseCache:
+    """
+    On-disk LLM response cache in SQLite with size-bounded LRU eviction.
+    Safe to share between threads; separate processes may share the file.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def _bump(self, name: str) -> None:
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                self._bump("misses")
+            else:
+                self.hits += 1
+                self._bump("hits")
+                self._conn.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+            self._conn.commit()
+
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, model: str, response: Dict[str, Any]) -> None:
+        blob = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, size, created, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, blob, len(blob.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the bound so we don't evict on every put
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC"
+        ).fetchall():
+            if total <= target:
+                break
+            evicted.append((key,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        for _ in evicted:
+            self._bump("evictions")
+
+    def invalidate(self, model: Optional[str] = None) -> int:
+        with self._lock:
+            if model is None:
+                cur = self._conn.execute("DELETE FROM responses")
+            else:
+                cur = self._conn.execute("DELETE FROM responses WHERE model = ?", (model,))
+            self._conn.commit()
+            return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            per_model = dict(self._conn.execute(
+                "SELECT model, COUNT(*) FROM responses GROUP BY model"
+            ).fetchall())
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+
+        return {
+            "path": str(self.path),
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "models": per_model,
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+        }
+
+
+def main():
+    from config import LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES
+
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the LLM response cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="show size and hit/miss counters")
+    invalidate = sub.add_parser("invalidate", help="drop cached responses")
+    group = invalidate.add_mutually_exclusive_group(required=True)
+    group.add_argument("--model", help="only drop responses from this model")
+    group.add_argument("--all", action="store_true", help="drop every response")
+    args = parser.parse_args()
+
+    cache = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES)
+
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    else:
+        removed = cache.invalidate(None if args.all else args.model)
+        print(f"🗑️  Removed {removed} cached responses")
+
+
+if __name__ == "__main__":
+    main()
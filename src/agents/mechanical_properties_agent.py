@@ -1,20 +1,37 @@
 import json
-import re
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Callable, Optional
 
-import ollama
+from agents.context import select_context
+from agents.llm import ABORTED_KEY, aborted, chat_json
+from agents.rules import mech_records_from_table, merge_records, property_gaps
+from agents.schemas import MECHANICAL_SCHEMA
+from config import RULES_FAST_PATH
 
 MODEL_NAME = "qwen2.5:3b"
+CONTEXT_TOKENS = 750
 
 
-def strip_code_fences(text: str) -> str:
-    text = text.strip()
-    if text.startswith("```"):
-        text = re.sub(r"^```[a-zA-Z]*\n?", "", text)
-    if text.endswith("```"):
-        text = text[:-3].strip()
-    return text.strip()
+RECORD_EXAMPLE = """{
+  "records": [
+    {
+      "alloy": "AZ31",
+      "variant": "Sheet-RD",
+      "properties": {
+        "avg_grain_size_um": 15,
+        "TYS_MPa": 170,
+        "CYS_MPa": 72,
+        "SD": 2.36,
+        "UTS_MPa": 254,
+        "fracture_strain_pct": 22.2
+      },
+      "evidence": {
+        "source": "Table 1",
+        "snippet": "Table 1 Mechanical properties of the rolled sheets and extrudates ..."
+      }
+    }
+  ]
+}"""
 
 
 def build_prompt(table_records: List[Dict[str, Any]], results_text: str) -> str:
@@ -31,26 +48,7 @@ RULES:
   Sheet-RD, Sheet-TD, Extrusion-ED, Extrusion-TD
 
 OUTPUT JSON schema:
-{{
-  "records": [
-    {{
-      "alloy": "AZ31",
-      "variant": "Sheet-RD",
-      "properties": {{
-        "avg_grain_size_um": 15,
-        "TYS_MPa": 170,
-        "CYS_MPa": 72,
-        "SD": 2.36,
-        "UTS_MPa": 254,
-        "fracture_strain_pct": 22.2
-      }},
-      "evidence": {{
-        "source": "Table 1",
-        "snippet": "Table 1 Mechanical properties of the rolled sheets and extrudates ..."
-      }}
-    }}
-  ]
-}}
+{RECORD_EXAMPLE}
 
 Table records:
 {json.dumps(table_records, indent=2)}
@@ -60,41 +58,94 @@ Results text:
 """.strip()
 
 
-def run_mechanical_properties_agent(
-    pdf_name: str,
-    output_dir: str | Path,
-    sections: Dict[str, Any],
-) -> Dict[str, Any]:
+def build_gap_prompt(gaps: List[Dict[str, Any]], results_text: str) -> str:
+    return f"""
+You are a materials data extraction assistant.
+
+TASK:
+The mechanical properties below are missing from the paper's table. Fill
+them from the results text and return STRICT JSON only.
+
+RULES:
+- Output must be VALID JSON only.
+- Return one record per listed alloy+variant, with the same alloy and variant.
+- Fill ONLY the listed missing properties; use null if a value is not
+  explicitly stated in the text.
+- The evidence snippet must be copied verbatim from the results text.
+
+OUTPUT JSON schema:
+{RECORD_EXAMPLE}
 
-    output_dir = Path(output_dir)
+Missing properties:
+{json.dumps(gaps, indent=2)}
 
-    table1_path = output_dir / f"{pdf_name}_table1_clean.json"
-    sections_path = output_dir / f"{pdf_name}_sections.json"
-    out_path = output_dir / f"{pdf_name}_mech_agent.json"
+Results text:
+{results_text[:3000]}
+""".strip()
 
-    if not table1_path.exists():
-        raise FileNotFoundError(f"Missing Table 1 JSON: {table1_path}")
 
-    table_records = json.loads(table1_path.read_text(encoding="utf-8"))
-    results_text = sections.get("results", "") or ""
+def run_mechanical_properties_agent(
+    pdf_name: str,
+    output_dir: Optional[str | Path],
+    sections: Dict[str, Any],
+    on_item: Optional[Callable[[str, Any], None]] = None,
+    table_records: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    With `table_records` given (e.g. read from the store) no files are
+    touched and the caller saves the result; otherwise Table 1 is read
+    from and the result written to `output_dir`.
+
+    A paper without a mechanical-property table gets no records. Clean
+    table rows map to records directly; the LLM is only asked for
+    the properties they leave null, or for everything when the fast path
+    is off or no row could be mapped.
+    """
+    from_files = table_records is None
+    if from_files:
+        output_dir = Path(output_dir)
+        table1_path = output_dir / f"{pdf_name}_table1_clean.json"
+
+        if not table1_path.exists():
+            raise FileNotFoundError(f"Missing Table 1 JSON: {table1_path}")
+
+        table_records = json.loads(table1_path.read_text(encoding="utf-8"))
+
+    records = mech_records_from_table(table_records) if RULES_FAST_PATH else []
+    if not table_records:
+        # No mechanical-property table in the paper
+        data = {"records": []}
+    elif not records:
+        results_text = select_context(sections, "mechanical", CONTEXT_TOKENS)
+        data = _ask_llm(build_prompt(table_records, results_text), on_item)
+    else:
+        gaps = property_gaps(records)
+        filled = {}
+        if gaps:
+            results_text = select_context(sections, "mechanical", CONTEXT_TOKENS)
+            filled = _ask_llm(build_gap_prompt(gaps, results_text), None)
+            records = merge_records(records, filled.get("records", []))
+        if on_item is not None:
+            for record in records:
+                on_item("records", record)
+        data = {"records": records}
+        if aborted(filled):
+            data[ABORTED_KEY] = aborted(filled)
+
+    if from_files:
+        out_path = output_dir / f"{pdf_name}_mech_agent.json"
+        out_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    return data
 
-    prompt = build_prompt(table_records, results_text)
 
-    response = ollama.chat(
+def _ask_llm(prompt: str, on_item: Optional[Callable[[str, Any], None]]) -> Dict[str, Any]:
+    return chat_json(
         model=MODEL_NAME,
         messages=[
             {"role": "system", "content": "Return only valid JSON. No markdown."},
             {"role": "user", "content": prompt},
         ],
-        options={"temperature": 0}
+        schema=MECHANICAL_SCHEMA,
+        options={"temperature": 0},
+        on_item=on_item,
     )
-
-    content = strip_code_fences(response["message"]["content"])
-
-    try:
-        data = json.loads(content)
-    except Exception as e:
-        raise ValueError(f"Invalid JSON from LLM:\n{content}") from e
-
-    out_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
-    return data
@@ -1,20 +1,13 @@
-import json
 import re
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
 
-import ollama
+from agents.context import load_sections, select_context
+from agents.llm import chat_json
+from agents.schemas import MICROSTRUCTURE_SCHEMA
 
 MODEL_NAME = "qwen2.5:3b"
-
-
-def strip_code_fences(text: str) -> str:
-    text = text.strip()
-    if text.startswith("```"):
-        text = re.sub(r"^```[a-zA-Z]*\n?", "", text)
-    if text.endswith("```"):
-        text = text[:-3].strip()
-    return text.strip()
+CONTEXT_TOKENS = 1500
 
 
 def extract_grain_size_from_snippet(snippet: str):
@@ -73,43 +66,28 @@ Paper text:
 """.strip()
 
 
-def run_microstructure_agent(sections_json_path: str | Path) -> Dict[str, Any]:
-    sections_json_path = Path(sections_json_path)
+def run_microstructure_agent(
+    sections: str | Path | Dict[str, str],
+    on_item: Optional[Callable[[str, Any], None]] = None,
+) -> Dict[str, Any]:
+    sections = load_sections(sections)
 
-    if not sections_json_path.exists():
-        raise FileNotFoundError(f"Missing sections JSON: {sections_json_path}")
-
-    sections = json.loads(sections_json_path.read_text(encoding="utf-8"))
-
-    # Combine all relevant sections for robust extraction
-    source_text = (
-        sections.get("materials and microstructures", "")
-        + "\n"
-        + sections.get("introduction", "")
-        + "\n"
-        + sections.get("results", "")
-    )
+    # Most relevant paragraphs (grain size, μm, texture...) across all sections
+    source_text = select_context(sections, "microstructure", CONTEXT_TOKENS)
 
     prompt = build_prompt(source_text)
 
-    response = ollama.chat(
+    data = chat_json(
         model=MODEL_NAME,
         messages=[
             {"role": "system", "content": "Return only valid JSON. No markdown."},
             {"role": "user", "content": prompt},
         ],
-        options={"temperature": 0}
+        schema=MICROSTRUCTURE_SCHEMA,
+        options={"temperature": 0},
+        on_item=on_item,
     )
 
-    content = strip_code_fences(response["message"]["content"])
-
-    try:
-        data = json.loads(content)
-    except Exception as e:
-        raise ValueError(
-            f"LLM returned non-JSON output.\nError: {e}\n\nOutput:\n{content}"
-        )
-
     # 🔒 Deterministic numeric correction (no hallucination)
     for entry in data.get("microstructures", []):
         if entry.get("avg_grain_size_um") is None:
@@ -0,0 +1,284 @@
+import argparse
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import httpx
+import ollama
+
+from config import (
+    OLLAMA_HOSTS,
+    OLLAMA_NUM_PARALLEL,
+    OLLAMA_EJECT_AFTER,
+    OLLAMA_EJECT_S,
+    OLLAMA_MAX_EJECT_S,
+    OLLAMA_HEALTH_INTERVAL_S,
+    OLLAMA_HEALTH_TIMEOUT_S,
+)
+import metrics
+
+
+# Client side load balancing over several Ollama servers. Each request
+# goes to the healthy host with the most free capacity that has the
+# model; hosts that keep failing are ejected for a while and re-admitted
+# by a passing health check or, without one, once the ejection is over.
+
+
+def parse_hosts(hosts: List[str]) -> List[Tuple[Optional[str], int]]:
+    """
+    "http://node1:11434=8" -> ("http://node1:11434", 8). No hosts means
+    the client's default host (None, read from OLLAMA_HOST).
+    """
+    parsed = []
+    for spec in hosts:
+        url, sep, limit = spec.rpartition("=")
+        if sep and limit.isdigit():
+            parsed.append((url, max(1, int(limit))))
+        else:
+            parsed.append((spec, OLLAMA_NUM_PARALLEL))
+    return parsed or [(None, OLLAMA_NUM_PARALLEL)]
+
+
+def pool_capacity(hosts: List[str] = OLLAMA_HOSTS) -> int:
+    """Requests the configured hosts take in flight, together."""
+    return sum(limit for _, limit in parse_hosts(hosts))
+
+
+def model_tag(model: str) -> str:
+    """Model names as /api/tags lists them; "qwen2.5" is "qwen2.5:latest"."""
+    return model if ":" in model else f"{model}:latest"
+
+
+def is_host_failure(error: BaseException) -> bool:
+    """Errors that say something about the host, not the request."""
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500
+    return isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError))
+
+
+class Host:
+    def __init__(self, url: Optional[str], limit: int):
+        self.url = url
+        self.name = url or "default"
+        self.limit = limit
+        self.client = ollama.Client(host=url)
+        # Separate client so a hung host cannot stall health checks
+        self._probe = ollama.Client(host=url, timeout=OLLAMA_HEALTH_TIMEOUT_S)
+
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+        # None until the first successful health check; unknown hosts
+        # are assumed to have every model
+        self.models: Optional[Set[str]] = None
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def list_models(self) -> Set[str]:
+        response = self._probe.list()
+        return {
+            model_tag(m.get("model") or m.get("name"))
+            for m in response["models"]
+            if m.get("model") or m.get("name")
+        }
+
+    def status(self, now: float) -> Dict[str, Any]:
+        return {
+            "host": self.name,
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejected_for_s": round(max(0.0, self.ejected_until - now), 1),
+            "models": sorted(self.models) if self.models is not None else None,
+        }
+
+
+class OllamaPool:
+    """
+    Least-loaded routing over Ollama hosts with per-host in-flight limits.
+    Safe to share between threads; callers block in host() while every
+    host that has the model is at its limit.
+    """
+
+    def __init__(
+        self,
+        hosts: List[Tuple[Optional[str], int]],
+        eject_after: int = OLLAMA_EJECT_AFTER,
+        eject_s: float = OLLAMA_EJECT_S,
+        max_eject_s: float = OLLAMA_MAX_EJECT_S,
+        health_interval_s: float = OLLAMA_HEALTH_INTERVAL_S,
+    ):
+        self.hosts = [Host(url, limit) for url, limit in hosts]
+        self.eject_after = eject_after
+        self.eject_s = eject_s
+        self.max_eject_s = max_eject_s
+        self.health_interval_s = health_interval_s
+
+        self._cond = threading.Condition()
+        self._started = False
+        self._closed = threading.Event()
+
+    @property
+    def capacity(self) -> int:
+        return sum(h.limit for h in self.hosts)
+
+    def start(self) -> None:
+        """Check every host once, then keep checking in the background."""
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+
+        self.check()
+        if self.health_interval_s > 0:
+            threading.Thread(target=self._health_loop, name="ollama-health", daemon=True).start()
+
+    def close(self) -> None:
+        self._closed.set()
+
+    def _health_loop(self) -> None:
+        while not self._closed.wait(self.health_interval_s):
+            self.check()
+
+    def check(self) -> None:
+        """Refresh every host's model list; failing hosts are ejected, passing ones re-admitted."""
+        for host in self.hosts:
+            try:
+                models = host.list_models()
+            except Exception as e:
+                if not is_host_failure(e):
+                    continue
+                with self._cond:
+                    self._eject(host)
+                continue
+
+            # A passing check only re-admits the host: its failure and
+            # ejection counts are reset by a successful chat (release), so
+            # a host whose chats keep failing is ejected for longer each
+            # time even though it answers health checks
+            with self._cond:
+                host.models = models
+                if host.ejected_until:
+                    print(f"✅ Ollama host {host.name} passed its health check, back in rotation")
+                host.ejected_until = 0.0
+                self._cond.notify_all()
+
+    def _eject(self, host: Host) -> None:
+        # Callers hold self._cond
+        duration = min(self.eject_s * 2 ** host.ejections, self.max_eject_s)
+        host.ejected_until = time.monotonic() + duration
+        host.ejections += 1
+        host.failures = 0
+        metrics.registry.inc("matextract_llm_host_ejections_total", {"host": host.name})
+        if len(self.hosts) > 1:
+            print(f"⚠️ Ollama host {host.name} ejected for {duration:g}s")
+
+    def acquire(self, model: str, avoid: Optional[Host] = None) -> Host:
+        """
+        Reserve a slot on the least-loaded live host that has `model`,
+        preferring any host other than `avoid` (the one that just failed).
+        When every host is ejected, the one due back first is used, so a
+        single host is never left without traffic.
+        """
+        self.start()
+        tag = model_tag(model)
+
+        with self._cond:
+            while True:
+                candidates = [h for h in self.hosts if h.serves(tag)]
+                if not candidates:
+                    raise ollama.ResponseError(
+                        f"model '{model}' not found on any Ollama host", 404
+                    )
+                if avoid is not None and len(candidates) > 1:
+                    candidates = [h for h in candidates if h is not avoid]
+
+                now = time.monotonic()
+                live = [h for h in candidates if h.ejected_until <= now]
+                if not live:
+                    live = [min(candidates, key=lambda h: h.ejected_until)]
+
+                free = [h for h in live if h.in_flight < h.limit]
+                if free:
+                    host = min(free, key=lambda h: (h.in_flight / h.limit, h.requests))
+                    host.in_flight += 1
+                    host.requests += 1
+                    return host
+
+                # Woken by a release or a re-admission; ejections also
+                # lapse without either
+                ejected = [h.ejected_until - now for h in candidates if h.ejected_until > now]
+                self._cond.wait(min(ejected) if ejected else None)
+
+    def release(self, host: Host, model: str, error: Optional[BaseException] = None) -> None:
+        with self._cond:
+            host.in_flight -= 1
+            if error is None:
+                outcome = "ok"
+                host.failures = 0
+                host.ejections = 0
+                host.ejected_until = 0.0
+            elif is_host_failure(error):
+                outcome = "failed"
+                host.failures += 1
+                if host.failures >= self.eject_after:
+                    self._eject(host)
+            else:
+                outcome = "error"
+                # The host has dropped the model since its last check
+                if isinstance(error, ollama.ResponseError) and error.status_code == 404:
+                    if host.models is not None:
+                        host.models.discard(model_tag(model))
+            self._cond.notify_all()
+
+        metrics.registry.inc(
+            "matextract_llm_host_requests_total", {"host": host.name, "outcome": outcome}
+        )
+
+    @contextmanager
+    def host(self, model: str, avoid: Optional[Host] = None):
+        """Hold a slot on a host for one request: `with pool.host(m) as h: h.client.chat(...)`."""
+        host = self.acquire(model, avoid)
+        try:
+            yield host
+        except BaseException as e:
+            self.release(host, model, e)
+            raise
+        else:
+            self.release(host, model)
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._cond:
+            return [h.status(now) for h in self.hosts]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> OllamaPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OllamaPool(parse_hosts(OLLAMA_HOSTS))
+    return _pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the configured Ollama hosts")
+    parser.parse_args()
+
+    pool = OllamaPool(parse_hosts(OLLAMA_HOSTS), health_interval_s=0)
+    pool.start()
+    print(json.dumps(pool.status(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
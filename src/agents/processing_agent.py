@@ -1,21 +1,13 @@
-import json
-import re
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Optional
 
-import ollama
+from agents.context import load_sections, select_context
+from agents.llm import chat_json
+from agents.schemas import PROCESSING_SCHEMA
 
 
 MODEL_NAME = "qwen2.5:3b"
-
-
-def strip_code_fences(text: str) -> str:
-    text = text.strip()
-    if text.startswith("```"):
-        text = re.sub(r"^```[a-zA-Z]*\n?", "", text)
-    if text.endswith("```"):
-        text = text[:-3].strip()
-    return text.strip()
+CONTEXT_TOKENS = 1100
 
 
 def build_prompt(text: str) -> str:
@@ -74,31 +66,24 @@ Paper text:
 """.strip()
 
 
-def run_processing_agent(sections_json_path: str | Path) -> Dict[str, Any]:
-    sections_json_path = Path(sections_json_path)
-
-    if not sections_json_path.exists():
-        raise FileNotFoundError(f"Missing sections JSON: {sections_json_path}")
+def run_processing_agent(
+    sections: str | Path | Dict[str, str],
+    on_item: Optional[Callable[[str, Any], None]] = None,
+) -> Dict[str, Any]:
+    sections = load_sections(sections)
 
-    sections = json.loads(sections_json_path.read_text(encoding="utf-8"))
+    # Paragraphs about product forms, heat treatments, °C and h
+    source_text = select_context(sections, "processing", CONTEXT_TOKENS)
 
-    # Most processing info is in introduction in your case
-    intro_text = sections.get("introduction", "") or ""
+    prompt = build_prompt(source_text)
 
-    prompt = build_prompt(intro_text)
-
-    response = ollama.chat(
+    return chat_json(
         model=MODEL_NAME,
         messages=[
             {"role": "system", "content": "Return only valid JSON. No markdown."},
             {"role": "user", "content": prompt},
         ],
-        options={"temperature": 0}
+        schema=PROCESSING_SCHEMA,
+        options={"temperature": 0},
+        on_item=on_item,
     )
-
-    content = strip_code_fences(response["message"]["content"])
-
-    try:
-        return json.loads(content)
-    except Exception as e:
-        raise ValueError(f"LLM returned non-JSON output.\nError: {e}\n\nOutput:\n{content}")
\ No newline at end of file
@@ -0,0 +1,263 @@
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# Deterministic extraction tier that runs before the LLM agents. Anything
+# it fills completely never reaches the model; the agents escalate only
+# what is left.
+
+ELEMENT_SYMBOLS = {
+    "Mg", "Al", "Zn", "Mn", "Ce", "Zr", "Y", "Nd", "Ca", "Si", "Fe", "Cu", "Ni",
+    "Gd", "Li", "Sn", "Ag", "Sr", "La", "Th", "Be", "Bi", "Cd", "Pb", "Cr", "Sb",
+    "Sc", "Er", "Dy", "Pr", "Sm", "Yb", "Ti", "Ga", "In", "Ge",
+}
+
+# ASTM B951 letter codes for magnesium alloy designations: AZ31 is
+# Mg-3Al-1Zn, WE43 is Mg-4Y-3RE. "RE" (mixed rare earths) has no symbol.
+DESIGNATION_CODES = {
+    "A": "Al", "B": "Bi", "C": "Cu", "D": "Cd", "E": "RE", "F": "Fe", "H": "Th",
+    "J": "Sr", "K": "Zr", "L": "Li", "M": "Mn", "N": "Ni", "P": "Pb", "Q": "Ag",
+    "R": "Cr", "S": "Si", "T": "Sn", "V": "Gd", "W": "Y", "X": "Ca", "Y": "Sb",
+    "Z": "Zn",
+}
+# Letter codes that are not designations although all their letters are
+# ASTM codes: loading directions ("RD10") and hardness scales ("HV10",
+# "HB30", "HRB100")
+NOT_DESIGNATIONS = {
+    "RD", "TD", "ED", "ND",
+    "HV", "HB", "HK", "HR", "HS", "HRA", "HRB", "HRC", "HRD", "HRE", "HRF", "HRH", "HRK",
+}
+
+DESIGNATION_RE = re.compile(r"\b([A-Z]{2,3})(\d{2,3})[A-Z]?\b")
+
+# "Mg+3 %Al+1 %Zn", "Mg-3Al-1Zn", "Mg–1.3Zn–0.2Ce", "Mg-3 wt.% Al"
+_TERM = r"\d+(?:[.,]\d+)?\s*(?:(?:wt|at|mass)\.?\s*)?%?\s*[A-Z][a-z]?"
+COMPOSITION_RE = re.compile(rf"\bMg(?:\s*[-+–—]\s*{_TERM})+")
+TERM_RE = re.compile(
+    r"[-+–—]\s*(?P<percent>\d+(?:[.,]\d+)?)\s*(?:(?:wt|at|mass)\.?\s*)?%?\s*(?P<element>[A-Z][a-z]?)"
+)
+
+ALLOY_NAME = r"[A-Z]{1,3}\d{1,3}[A-Z]?"
+NAME_BEFORE_RE = re.compile(rf"\b({ALLOY_NAME})\s*(?:\(\s*|[=:]\s*)$")
+NAME_AFTER_RE = re.compile(rf"^\s*\(\s*({ALLOY_NAME})\s*\)")
+
+SNIPPET_CHARS = 300
+
+
+def _number(text: str) -> float | int:
+    value = float(text.replace(",", "."))
+    return int(value) if value.is_integer() else value
+
+
+def sentence_around(text: str, start: int, end: int) -> str:
+    """The sentence containing text[start:end], clipped to SNIPPET_CHARS."""
+    left = text.rfind(". ", 0, start)
+    left = 0 if left == -1 else left + 2
+    right = text.find(". ", end)
+    right = len(text) if right == -1 else right + 1
+    left = max(left, start - SNIPPET_CHARS // 2)
+    right = min(right, end + SNIPPET_CHARS // 2)
+    return " ".join(text[left:right].split())
+
+
+def parse_composition_string(text: str) -> List[Dict[str, Any]]:
+    """
+    "Mg+3 %Al+1 %Zn" -> Mg (balance, percent null), Al 3, Zn 1.
+    Stops at the first term whose element is not a known symbol.
+    """
+    match = COMPOSITION_RE.search(text)
+    if match is None:
+        return []
+
+    composition = [{"element": "Mg", "percent": None}]
+    for term in TERM_RE.finditer(match.group(0)):
+        if term.group("element") not in ELEMENT_SYMBOLS:
+            break
+        composition.append({
+            "element": term.group("element"),
+            "percent": _number(term.group("percent")),
+        })
+    return composition if len(composition) > 1 else []
+
+
+def decode_designation(name: str) -> List[Dict[str, Any]]:
+    """
+    Nominal composition from an ASTM designation: AZ31 -> Al 3, Zn 1.
+    A 0 digit means "less than 0.5 %", so its percent is left null.
+
+    >>> [(p["element"], p["percent"]) for p in decode_designation("AZ31")]
+    [('Mg', None), ('Al', 3), ('Zn', 1)]
+    >>> decode_designation("HV10"), decode_designation("HRB100"), decode_designation("RD45")
+    ([], [], [])
+    """
+    match = DESIGNATION_RE.fullmatch(name) or DESIGNATION_RE.match(name)
+    if match is None:
+        return []
+
+    letters, digits = match.groups()
+    if len(letters) != len(digits) or letters in NOT_DESIGNATIONS:
+        return []
+    if any(letter not in DESIGNATION_CODES for letter in letters):
+        return []
+
+    composition = [{"element": "Mg", "percent": None}]
+    for letter, digit in zip(letters, digits):
+        composition.append({
+            "element": DESIGNATION_CODES[letter],
+            "percent": int(digit) or None,
+        })
+    return composition
+
+
+def is_complete(alloy: Dict[str, Any]) -> bool:
+    """Every alloying element (all but the Mg balance) has a percent."""
+    parts = alloy["composition"][1:]
+    return bool(parts) and all(p["percent"] is not None for p in parts)
+
+
+def extract_compositions(text: str) -> List[Dict[str, Any]]:
+    """
+    Alloys in `text`, from explicit composition strings where the paper
+    gives one ("AZ31 (Mg+3 %Al+1 %Zn)") and from designation decoding
+    for alloys only mentioned by name.
+    """
+    alloys = {}
+
+    for m in COMPOSITION_RE.finditer(text):
+        composition = parse_composition_string(m.group(0))
+        if not composition:
+            continue
+
+        before = NAME_BEFORE_RE.search(text[max(0, m.start() - 20):m.start()])
+        after = NAME_AFTER_RE.search(text[m.end():m.end() + 20])
+        name = (before or after).group(1) if (before or after) else m.group(0).strip()
+
+        if name not in alloys:
+            alloys[name] = {
+                "alloy_name": name,
+                "composition": composition,
+                "evidence": {"snippet": sentence_around(text, m.start(), m.end())},
+            }
+
+    for m in DESIGNATION_RE.finditer(text):
+        name = m.group(0)
+        if name in alloys:
+            continue
+        composition = decode_designation(name)
+        if composition:
+            alloys[name] = {
+                "alloy_name": name,
+                "composition": composition,
+                "evidence": {"snippet": sentence_around(text, m.start(), m.end())},
+            }
+
+    return list(alloys.values())
+
+
+def merge_alloys(
+    rule_alloys: List[Dict[str, Any]],
+    llm_alloys: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """LLM alloys, with complete rule-based entries taking precedence by name."""
+    complete = {a["alloy_name"]: a for a in rule_alloys if is_complete(a)}
+    merged = [complete.pop(a.get("alloy_name"), a) for a in llm_alloys]
+    return merged + list(complete.values())
+
+
+def normalize_variant(variant: Optional[str]) -> Optional[str]:
+    """"sheet-rd" / "Sheet RD" -> "Sheet-RD"."""
+    if not variant:
+        return variant
+    words = re.split(r"[\s\-_/]+", variant.strip())
+    return "-".join(
+        w.upper() if len(w) <= 2 else w[0].upper() + w[1:].lower() for w in words if w
+    )
+
+
+MECH_FIELDS = [
+    "avg_grain_size_um", "TYS_MPa", "CYS_MPa", "SD", "UTS_MPa", "fracture_strain_pct",
+]
+
+# Evidence source of records mapped from a clean table row. Their values
+# are checked against that row (see evaluation.validator), not against
+# the snippet, which only reproduces the row's cells.
+RULE_TABLE_SOURCE = "rules:table"
+
+
+def mech_records_from_table(table_records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Map clean Table 1 rows straight to the mechanical agent's "records"
+    schema. The evidence points at the table row: its table_index, page,
+    caption and raw cells.
+    """
+    records = []
+    for row in table_records:
+        if not row.get("alloy"):
+            continue
+
+        properties = {field: row.get(field) for field in MECH_FIELDS}
+        if all(v is None for v in properties.values()):
+            continue
+
+        cells = row.get("cells") or []
+        records.append({
+            "alloy": row["alloy"],
+            "variant": normalize_variant(row.get("variant")),
+            "properties": properties,
+            "evidence": {
+                "source": RULE_TABLE_SOURCE,
+                "table_index": row.get("table_index"),
+                "page": row.get("page"),
+                "caption": row.get("caption"),
+                "cells": cells,
+                "snippet": " | ".join(c for c in cells if c),
+            },
+        })
+    return records
+
+
+def property_gaps(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The alloy+variant pairs of rule records with properties still null."""
+    gaps = []
+    for record in records:
+        missing = [f for f in MECH_FIELDS if record["properties"].get(f) is None]
+        if missing:
+            gaps.append({"alloy": record["alloy"], "variant": record["variant"], "missing": missing})
+    return gaps
+
+
+def merge_records(
+    rule_records: List[Dict[str, Any]],
+    llm_records: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Rule records with their null properties filled from the LLM record of
+    the same alloy and variant. Table values always win; the filled
+    fields and the LLM's evidence for them are kept under "filled".
+    """
+    by_key = {
+        (r.get("alloy"), normalize_variant(r.get("variant"))): r for r in llm_records
+    }
+
+    merged = []
+    for record in rule_records:
+        llm = by_key.get((record["alloy"], record["variant"]))
+        properties = (llm or {}).get("properties") or {}
+        filled = {
+            field: value for field, value in properties.items()
+            if field in record["properties"] and record["properties"][field] is None and value is not None
+        }
+        if filled:
+            record = {
+                **record,
+                "properties": {**record["properties"], **filled},
+                "filled": {"fields": sorted(filled), "evidence": llm.get("evidence") or {}},
+            }
+        merged.append(record)
+    return merged
+
+
+def fast_compositions(text: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """Rule-based alloys and whether they fill the output without the LLM."""
+    alloys = extract_compositions(text)
+    return alloys, bool(alloys) and all(is_complete(a) for a in alloys)
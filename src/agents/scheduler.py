@@ -0,0 +1,197 @@
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Callable, Optional, Iterable
+
+from agents.combined_agent import run_combined_agent
+from agents.composition_agent import run_composition_agent
+from agents.llm import aborted
+from agents.mechanical_properties_agent import run_mechanical_properties_agent
+from agents.microstructure_agent import run_microstructure_agent
+from agents.processing_agent import run_processing_agent
+from agents.triage import routed_sections, skipped_output, triage_paper
+from config import TRIAGE
+import metrics
+
+
+def _table_records(store, paper: str) -> Optional[List[Dict[str, Any]]]:
+    return store.read(paper, "table1_clean") if store.exists(paper, "table1_clean") else None
+
+
+def _run_mechanical(store, paper: str, sections: Dict[str, str]) -> Dict[str, Any]:
+    table_records = store.read(paper, "table1_clean")
+    return run_mechanical_properties_agent(paper, None, sections, table_records=table_records)
+
+
+AGENTS = {
+    "mechanical": {
+        "run": _run_mechanical,
+        "output": "mech_agent",
+        "requires": ["sections", "table1_clean"],
+    },
+    "composition": {
+        "run": lambda store, paper, sections: run_composition_agent(sections),
+        "output": "composition_agent",
+        "requires": ["sections"],
+    },
+    "processing": {
+        "run": lambda store, paper, sections: run_processing_agent(sections),
+        "output": "processing_agent",
+        "requires": ["sections"],
+    },
+    "microstructure": {
+        "run": lambda store, paper, sections: run_microstructure_agent(sections),
+        "output": "microstructure_agent",
+        "requires": ["sections"],
+    },
+}
+
+
+def _run_combined(store, paper: str, sections: Dict[str, str], agents: List[str]) -> Dict[str, Any]:
+    table_records = None
+    if "mechanical" in agents:
+        table_records = store.read(paper, "table1_clean")
+    return run_combined_agent(sections, table_records)
+
+
+def build_jobs(
+    store,
+    agents: Iterable[str] = AGENTS,
+    skip_existing: bool = False,
+    combined: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    One job per (paper, agent). With `combined`, the agents a paper needs
+    are folded into a single job that runs the combined agent instead, so
+    the paper text is prefilled once rather than once per agent.
+
+    Papers with jobs are triaged here, once, and the decision is passed
+    to each of their jobs (which run concurrently).
+    """
+    jobs = []
+    for paper in store.papers():
+        paper_jobs = []
+        for name in agents:
+            spec = AGENTS[name]
+            if not all(store.exists(paper, kind) for kind in spec["requires"]):
+                continue
+
+            # Outputs of an aborted generation are incomplete, so redone
+            if (
+                skip_existing and store.exists(paper, spec["output"])
+                and not aborted(store.read(paper, spec["output"]))
+            ):
+                continue
+
+            paper_jobs.append({
+                "store": store,
+                "paper": paper,
+                "agent": name,
+                "outputs": {name: spec["output"]},
+            })
+
+        if combined and len(paper_jobs) > 1:
+            paper_jobs = [{
+                "store": store,
+                "paper": paper,
+                "agent": "combined",
+                "outputs": {k: v for job in paper_jobs for k, v in job["outputs"].items()},
+            }]
+
+        if TRIAGE and paper_jobs:
+            decision = triage(store, paper, store.read(paper, "sections"))
+            for job in paper_jobs:
+                job["decision"] = decision
+
+        jobs.extend(paper_jobs)
+    return jobs
+
+
+def triage(store, paper: str, sections: Dict[str, str]) -> Dict[str, Any]:
+    """Triage a paper (cheap, so always from its current sections) and record the decision."""
+    tables = store.read(paper, "tables") if store.exists(paper, "tables") else None
+    decision = triage_paper(sections, tables)
+    store.write(paper, "triage", decision)
+    return decision
+
+
+def run_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    store, paper = job["store"], job["paper"]
+
+    start = time.perf_counter()
+    skipped = []
+    try:
+        with metrics.timed(job["agent"], paper):
+            sections = store.read(paper, "sections")
+            decision = job.get("decision")
+
+            # Agents triage rules out get only the rules' output, no LLM call
+            routed = {name: routed_sections(decision, name, sections) for name in job["outputs"]}
+            skipped = [name for name, s in routed.items() if s is None]
+            table_records = _table_records(store, paper) if "mechanical" in skipped else None
+            parts = {name: skipped_output(name, sections, table_records) for name in skipped}
+            active = [name for name in job["outputs"] if name not in skipped]
+
+            if job["agent"] == "combined" and active:
+                merged = {k: v for s in routed.values() if s for k, v in s.items()}
+                combined = _run_combined(store, paper, merged, active)
+                parts.update({name: combined[name] for name in active})
+            elif active:
+                parts[job["agent"]] = AGENTS[job["agent"]]["run"](store, paper, routed[job["agent"]])
+
+        for name, kind in job["outputs"].items():
+            store.write(paper, kind, parts[name])
+        # Truncated outputs are kept, but the job failed
+        truncated = [f"{name}: {aborted(parts[name])}" for name in job["outputs"] if aborted(parts[name])]
+        if truncated:
+            status, error = "failed", "generation aborted (" + "; ".join(truncated) + ")"
+        else:
+            status, error = "ok", None
+    except Exception as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+
+    return {
+        "paper": paper,
+        "agent": job["agent"],
+        "status": status,
+        "error": error,
+        "skipped": skipped,
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def run_agents(
+    jobs: List[Dict[str, Any]],
+    concurrency: int,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run agent jobs on a thread pool with at most `concurrency` LLM calls
+    in flight. Jobs are submitted lazily, a small window ahead of the
+    workers, so a large corpus never builds an unbounded backlog.
+    """
+    results = []
+    pending = iter(jobs)
+    window = max(1, concurrency) * 2
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = set()
+        while True:
+            while len(futures) < window:
+                job = next(pending, None)
+                if job is None:
+                    break
+                futures.add(pool.submit(run_job, job))
+
+            if not futures:
+                break
+
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+
+    return results
@@ -0,0 +1,166 @@
+from typing import Dict, Any, List
+
+
+# JSON schemas for the agent outputs. They are sent to Ollama as the
+# structured-output `format` so decoding is constrained to valid JSON of
+# the right shape, and `validate` checks responses against the same schema.
+
+NUMBER_OR_NULL = {"type": ["number", "null"]}
+STRING_OR_NULL = {"type": ["string", "null"]}
+
+EVIDENCE = {
+    "type": "object",
+    "properties": {
+        "source": {"type": "string"},
+        "snippet": {"type": "string"},
+    },
+    "required": ["snippet"],
+}
+
+MECHANICAL_RECORD = {
+    "type": "object",
+    "properties": {
+        "alloy": {"type": "string"},
+        "variant": STRING_OR_NULL,
+        "properties": {
+            "type": "object",
+            "properties": {
+                "avg_grain_size_um": NUMBER_OR_NULL,
+                "TYS_MPa": NUMBER_OR_NULL,
+                "CYS_MPa": NUMBER_OR_NULL,
+                "SD": NUMBER_OR_NULL,
+                "UTS_MPa": NUMBER_OR_NULL,
+                "fracture_strain_pct": NUMBER_OR_NULL,
+            },
+        },
+        "evidence": EVIDENCE,
+    },
+    "required": ["alloy", "variant", "properties", "evidence"],
+}
+
+ALLOY = {
+    "type": "object",
+    "properties": {
+        "alloy_name": {"type": "string"},
+        "composition": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "element": {"type": "string"},
+                    "percent": NUMBER_OR_NULL,
+                },
+                "required": ["element", "percent"],
+            },
+        },
+        "evidence": EVIDENCE,
+    },
+    "required": ["alloy_name", "composition", "evidence"],
+}
+
+PROCESSING_ROUTE = {
+    "type": "object",
+    "properties": {
+        "material_form": STRING_OR_NULL,
+        "condition": STRING_OR_NULL,
+        "thickness_mm": NUMBER_OR_NULL,
+        "steps": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "step": {"type": "string"},
+                    "temperature_C": NUMBER_OR_NULL,
+                    "time_h": NUMBER_OR_NULL,
+                },
+                "required": ["step", "temperature_C", "time_h"],
+            },
+        },
+        "evidence": EVIDENCE,
+    },
+    "required": ["material_form", "condition", "thickness_mm", "steps", "evidence"],
+}
+
+MICROSTRUCTURE = {
+    "type": "object",
+    "properties": {
+        "alloy": {"type": "string"},
+        "material_form": STRING_OR_NULL,
+        "avg_grain_size_um": NUMBER_OR_NULL,
+        "recrystallized": {"type": ["boolean", "null"]},
+        "grain_morphology": STRING_OR_NULL,
+        "texture": STRING_OR_NULL,
+        "evidence": EVIDENCE,
+    },
+    "required": [
+        "alloy", "material_form", "avg_grain_size_um", "recrystallized",
+        "grain_morphology", "texture", "evidence",
+    ],
+}
+
+OUTPUT_ITEMS = {
+    "records": MECHANICAL_RECORD,
+    "alloys": ALLOY,
+    "processing_routes": PROCESSING_ROUTE,
+    "microstructures": MICROSTRUCTURE,
+}
+
+
+def output_schema(*keys: str) -> Dict[str, Any]:
+    """Top-level object schema with one array per key, e.g. output_schema("alloys")."""
+    return {
+        "type": "object",
+        "properties": {
+            key: {"type": "array", "items": OUTPUT_ITEMS[key]} for key in keys
+        },
+        "required": list(keys),
+    }
+
+
+MECHANICAL_SCHEMA = output_schema("records")
+COMPOSITION_SCHEMA = output_schema("alloys")
+PROCESSING_SCHEMA = output_schema("processing_routes")
+MICROSTRUCTURE_SCHEMA = output_schema("microstructures")
+
+
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "null": lambda v: v is None,
+}
+
+
+def validate(data: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """
+    Validate `data` against the subset of JSON Schema used above
+    (type, properties, required, items, enum). Returns a list of errors;
+    an empty list means the data is valid.
+    """
+    errors = []
+
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else types
+        if not any(_TYPE_CHECKS[t](data) for t in types):
+            return [f"{path}: expected {' or '.join(types)}, got {type(data).__name__}"]
+
+    if "enum" in schema and data not in schema["enum"]:
+        errors.append(f"{path}: {data!r} not in {schema['enum']}")
+
+    if isinstance(data, dict):
+        for key in schema.get("required", []):
+            if key not in data:
+                errors.append(f"{path}: missing required key {key!r}")
+        for key, sub in schema.get("properties", {}).items():
+            if key in data:
+                errors.extend(validate(data[key], sub, f"{path}.{key}"))
+
+    if isinstance(data, list) and "items" in schema:
+        for i, item in enumerate(data):
+            errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+
+    return errors
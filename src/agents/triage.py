@@ -0,0 +1,182 @@
+import re
+from typing import Dict, Any, List, Optional
+
+from agents.context import UNIT_PATTERNS
+from agents.rules import (
+    COMPOSITION_RE, DESIGNATION_RE, decode_designation, extract_compositions, mech_records_from_table,
+)
+from config import RULES_FAST_PATH, TRIAGE
+
+
+# Deterministic paper/section triage ahead of the LLM agents. Each
+# section is scored per agent from unit-bearing numbers and a few
+# unambiguous terms; an agent only runs on papers with at least one
+# qualifying section (or a table classified for it), and only sees those
+# sections. Triage only gates the LLM: skipped agents get what the rules
+# fast path fills for free (see skipped_output), without an LLM call.
+
+TRIAGE_VERSION = "2"
+
+AGENT_OUTPUT_KEYS = {
+    "mechanical": "records",
+    "composition": "alloys",
+    "processing": "processing_routes",
+    "microstructure": "microstructures",
+}
+
+# Terms that are rarely used without the data behind them (unlike
+# "alloy" or "size", which every paper in the corpus contains)
+AGENT_TERMS = {
+    "mechanical": re.compile(
+        r"\b(?:yield (?:strength|stress)|tensile|compressive|ultimate|elongation|"
+        r"fracture strain|hardness|flow (?:stress|curve)s?|stress-strain)\b",
+        re.IGNORECASE,
+    ),
+    "composition": re.compile(
+        r"\b(?:chemical compositions?|nominal compositions?|compositions? of|balance|wt\.?\s*%|at\.?\s*%)",
+        re.IGNORECASE,
+    ),
+    "processing": re.compile(
+        r"\b(?:rolled|rolling|extru(?:ded|sion)|anneal(?:ed|ing)|homogeni[sz](?:ed|ation)|"
+        r"aged|ag(?:e)?ing|heat[- ]treat(?:ed|ment)|cast|forged|quenched|reduction per pass)\b",
+        re.IGNORECASE,
+    ),
+    "microstructure": re.compile(
+        r"\b(?:grain size|recrystalli[sz](?:ed|ation)|texture|EBSD|twin(?:s|ning)?|"
+        r"pole figures?|microstructures?|equi-?axed)\b",
+        re.IGNORECASE,
+    ),
+}
+
+# Table labels (see ingest.table_classifier) that make an agent relevant
+AGENT_TABLE_LABELS = {
+    "mechanical": "mechanical",
+    "composition": "composition",
+    "processing": "processing",
+}
+
+UNIT_WEIGHT = 2.0
+TERM_WEIGHT = 1.0
+COMPOSITION_STRING_WEIGHT = 3.0
+# Hits counted per signal; a long section should not win on length alone
+MAX_HITS = 5
+MIN_SECTION_SCORE = 3.0
+
+EXCLUDED_SECTIONS = {"references"}
+# Sent along with an agent's qualifying sections; names the alloys
+CONTEXT_SECTIONS = ["abstract"]
+
+
+def alloy_names(text: str) -> List[str]:
+    """Mg alloy designations and composition strings mentioned in `text`."""
+    names = {m.group(0) for m in DESIGNATION_RE.finditer(text) if decode_designation(m.group(0))}
+    names.update(" ".join(m.group(0).split()) for m in COMPOSITION_RE.finditer(text))
+    return sorted(names)
+
+
+def section_scores(text: str) -> Dict[str, float]:
+    scores = {}
+    for agent, terms in AGENT_TERMS.items():
+        units = len(UNIT_PATTERNS[agent].findall(text))
+        hits = len(terms.findall(text))
+        score = UNIT_WEIGHT * min(units, MAX_HITS) + TERM_WEIGHT * min(hits, MAX_HITS)
+        if agent == "composition":
+            score += COMPOSITION_STRING_WEIGHT * min(len(COMPOSITION_RE.findall(text)), MAX_HITS)
+        scores[agent] = round(score, 2)
+    return scores
+
+
+def triage_paper(
+    sections: Dict[str, str],
+    tables: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Score every section for every agent and decide, per agent, whether it
+    runs and on which sections. Papers that name no Mg alloy are skipped
+    by all agents. Returns the decision as stored in the "triage"
+    artifact.
+    """
+    text = "\n".join(t for name, t in sections.items() if name not in EXCLUDED_SECTIONS)
+    alloys = alloy_names(text)
+
+    scores = {
+        name: section_scores(t)
+        for name, t in sections.items() if name not in EXCLUDED_SECTIONS and t
+    }
+    table_labels = sorted({t.get("label") for t in tables or [] if t.get("label")})
+
+    agents = {}
+    for agent in AGENT_OUTPUT_KEYS:
+        qualifying = [name for name, s in scores.items() if s[agent] >= MIN_SECTION_SCORE]
+        has_table = AGENT_TABLE_LABELS.get(agent) in table_labels
+
+        if not alloys:
+            run, reason = False, "no Mg alloy designation or composition in the paper"
+        elif qualifying:
+            run, reason = True, f"{len(qualifying)} qualifying sections"
+        elif has_table:
+            run, reason = True, f"{AGENT_TABLE_LABELS[agent]} table"
+        else:
+            run, reason = False, f"no section scores {MIN_SECTION_SCORE:g} or more"
+
+        agents[agent] = {
+            "run": run,
+            "reason": reason,
+            "score": round(sum(s[agent] for s in scores.values()), 2),
+            "sections": qualifying,
+        }
+
+    return {
+        "version": TRIAGE_VERSION,
+        "alloys": alloys,
+        "table_labels": table_labels,
+        "agents": agents,
+        "section_scores": scores,
+    }
+
+
+def empty_output(agent: str) -> Dict[str, Any]:
+    return {AGENT_OUTPUT_KEYS[agent]: []}
+
+
+def skipped_output(
+    agent: str,
+    sections: Dict[str, str],
+    table_records: Optional[List[Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    The output of an agent triage skips: what the deterministic rules
+    extract (compositions from strings and designations, mechanical
+    records from clean table rows), or nothing with the fast path off.
+    """
+    if not RULES_FAST_PATH:
+        return empty_output(agent)
+    if agent == "composition":
+        text = "\n".join(t for name, t in sections.items() if name not in EXCLUDED_SECTIONS)
+        return {"alloys": extract_compositions(text)}
+    if agent == "mechanical" and table_records:
+        return {"records": mech_records_from_table(table_records)}
+    return empty_output(agent)
+
+
+def routed_sections(
+    decision: Optional[Dict[str, Any]],
+    agent: str,
+    sections: Dict[str, str],
+) -> Optional[Dict[str, str]]:
+    """
+    The sections `agent` should see, or None if triage skips it. All
+    sections pass when triage is off, there is no decision or the agent
+    only qualified through a table.
+    """
+    if not TRIAGE or decision is None or agent not in decision["agents"]:
+        return sections
+
+    routed = decision["agents"][agent]
+    if not routed["run"]:
+        return None
+    if not routed["sections"]:
+        return sections
+
+    keep = set(routed["sections"]) | set(CONTEXT_SECTIONS)
+    return {name: text for name, text in sections.items() if name in keep}
@@ -0,0 +1,253 @@
+import argparse
+import random
+from pathlib import Path
+from typing import Dict, Any, List
+
+import fitz  # PyMuPDF
+
+
+# Synthetic Mg-alloy papers for benchmarks: numbered sections, composition
+# strings, a ruled mechanical-property table in "value (std)" format and a
+# composition table, padded with filler paragraphs up to a page count.
+# Everything is drawn from a seeded RNG, so a corpus can be regenerated
+# byte for byte.
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 60
+FONT_SIZE = 9.5
+LINE_HEIGHT = 12.5
+CHARS_PER_LINE = 105
+TABLE_ROW_HEIGHT = 16
+
+# (designation, {element: wt.%}) with Mg as balance
+ALLOYS = [
+    ("AZ31", {"Al": 3.0, "Zn": 1.0, "Mn": 0.3}),
+    ("AZ61", {"Al": 6.0, "Zn": 1.0, "Mn": 0.3}),
+    ("AZ91", {"Al": 9.0, "Zn": 0.7, "Mn": 0.2}),
+    ("ZK60", {"Zn": 5.5, "Zr": 0.5}),
+    ("AM60", {"Al": 6.0, "Mn": 0.3}),
+    ("ZE10", {"Zn": 1.3, "Ce": 0.2}),
+    ("WE43", {"Y": 4.0, "Nd": 2.3, "Zr": 0.5}),
+]
+CONDITIONS = ["as-rolled", "annealed", "as-extruded", "aged", "RD", "TD", "45°"]
+PROCESSES = ["hot rolled", "extruded", "annealed", "homogenized", "cast"]
+
+FILLER = [
+    "The deformation behaviour of wrought magnesium alloys is governed by the activity of basal slip and twinning",
+    "Previous studies have reported a strong dependence of the yield asymmetry on the initial texture",
+    "Samples were ground, polished and etched in an acetic picral solution prior to observation",
+    "The discrepancy between the two orientations is attributed to the different twinning activity",
+    "These observations are consistent with the classical Hall-Petch relationship for hexagonal metals",
+    "Further work is needed to separate the contributions of solute strengthening and grain refinement",
+]
+
+
+def composition_string(alloy: Dict[str, float]) -> str:
+    """Mg-3Al-1Zn style, the form agents.rules parses."""
+    return "Mg-" + "-".join(f"{pct:g}{element}" for element, pct in alloy.items())
+
+
+def make_paper(rng: random.Random, index: int, pages: int, tables: int) -> Dict[str, Any]:
+    """The content of one synthetic paper: sections as lists of paragraphs, and tables."""
+    alloys = rng.sample(ALLOYS, k=min(len(ALLOYS), rng.randint(1, 3)))
+    temperature = rng.choice([250, 300, 350, 400, 450])
+    hours = rng.choice([0.5, 1, 2, 4, 24])
+
+    rows = []
+    for name, _ in alloys:
+        for condition in rng.sample(CONDITIONS, k=2):
+            tys = rng.uniform(90, 260)
+            rows.append({
+                "alloy": name,
+                "condition": condition,
+                "grain_size": round(rng.uniform(2, 40), 1),
+                "tys": round(tys),
+                "tys_std": rng.randint(1, 9),
+                "uts": round(tys + rng.uniform(40, 120)),
+                "uts_std": rng.randint(1, 9),
+                "elongation": round(rng.uniform(4, 30), 1),
+                "elongation_std": round(rng.uniform(0.2, 3), 1),
+            })
+
+    first = alloys[0][0]
+    strings = ", ".join(f"{name} ({composition_string(comp)})" for name, comp in alloys)
+    results = [
+        f"The {r['alloy']} {r['condition']} samples showed an average grain size of {r['grain_size']} µm, "
+        f"a tensile yield strength of {r['tys']} ± {r['tys_std']} MPa and an elongation of {r['elongation']} %."
+        for r in rows
+    ]
+
+    sections = {
+        "Abstract": [
+            f"The microstructure and mechanical properties of {', '.join(n for n, _ in alloys)} "
+            f"sheets {rng.choice(PROCESSES)} and annealed at {temperature} °C for {hours} h were investigated."
+        ],
+        "1. Introduction": [rng.choice(FILLER) + "."],
+        "2. Experimental": [
+            f"The alloys used in this study were {strings} (wt.%). "
+            f"Plates of {rng.choice([3, 6, 10])} mm thickness were {rng.choice(PROCESSES)} "
+            f"and annealed at {temperature} °C for {hours} h.",
+        ],
+        "3. Results and discussion": results + [
+            f"Recrystallized equiaxed grains were observed in the annealed {first} sheets with a basal texture."
+        ],
+        "4. Conclusions": [f"Annealing of {first} at {temperature} °C refined the grains and lowered the yield strength."],
+        "References": [f"[{i}] A. Author, Journal of Magnesium and Alloys {2000 + i} ({i}) {100 + i}." for i in range(1, 16)],
+    }
+
+    mechanical = {
+        "caption": f"Table 1. Mechanical properties of the {first} sheets (mean (std)).",
+        "header": ["Alloy", "Condition", "Grain size (µm)", "TYS (MPa)", "UTS (MPa)", "Elongation (%)"],
+        "rows": [
+            [r["alloy"], r["condition"], f"{r['grain_size']}", f"{r['tys']} ({r['tys_std']})",
+             f"{r['uts']} ({r['uts_std']})", f"{r['elongation']} ({r['elongation_std']})"]
+            for r in rows
+        ],
+    }
+    elements = sorted({e for _, comp in alloys for e in comp})
+    composition = {
+        "caption": "Table 2. Chemical composition of the alloys (wt.%).",
+        "header": ["Alloy"] + elements + ["Mg"],
+        "rows": [
+            [name] + [f"{comp[e]:g}" if e in comp else "-" for e in elements] + ["bal."]
+            for name, comp in alloys
+        ],
+    }
+
+    return {
+        "name": f"synthetic_{index:04d}",
+        "alloys": [name for name, _ in alloys],
+        "rows": rows,
+        "sections": sections,
+        "tables": [mechanical, composition][:max(0, tables)],
+        "pages": pages,
+    }
+
+
+def _wrap(text: str) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > CHARS_PER_LINE:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return lines + [line] if line else lines
+
+
+class _Writer:
+    """Top-to-bottom text and table layout over new pages."""
+
+    def __init__(self, doc: fitz.Document):
+        self.doc = doc
+        self.page = None
+        self.y = PAGE_HEIGHT
+
+    def need(self, height: float) -> None:
+        if self.page is None or self.y + height > PAGE_HEIGHT - MARGIN:
+            self.page = self.doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            self.y = MARGIN
+
+    def line(self, text: str, bold: bool = False) -> None:
+        self.need(LINE_HEIGHT)
+        self.page.insert_text(
+            (MARGIN, self.y), text, fontsize=FONT_SIZE, fontname="hebo" if bold else "helv",
+        )
+        self.y += LINE_HEIGHT
+
+    def paragraph(self, text: str) -> None:
+        for line in _wrap(text):
+            self.line(line)
+        self.y += LINE_HEIGHT / 2
+
+    def table(self, table: Dict[str, Any]) -> None:
+        rows = [table["header"]] + table["rows"]
+        self.need(LINE_HEIGHT + TABLE_ROW_HEIGHT * len(rows) + LINE_HEIGHT)
+        self.line(table["caption"])
+
+        width = (PAGE_WIDTH - 2 * MARGIN) / len(table["header"])
+        top = self.y - LINE_HEIGHT / 2
+        bottom = top + TABLE_ROW_HEIGHT * len(rows)
+        for i in range(len(rows) + 1):
+            y = top + i * TABLE_ROW_HEIGHT
+            self.page.draw_line((MARGIN, y), (PAGE_WIDTH - MARGIN, y), width=0.5)
+        for j in range(len(table["header"]) + 1):
+            x = MARGIN + j * width
+            self.page.draw_line((x, top), (x, bottom), width=0.5)
+
+        for i, row in enumerate(rows):
+            y = top + i * TABLE_ROW_HEIGHT + TABLE_ROW_HEIGHT - 4.5
+            for j, cell in enumerate(row):
+                self.page.insert_text(
+                    (MARGIN + j * width + 3, y), cell, fontsize=FONT_SIZE - 1.5,
+                    fontname="hebo" if i == 0 else "helv",
+                )
+        self.y = bottom + LINE_HEIGHT * 1.5
+
+
+def write_pdf(paper: Dict[str, Any], path: Path, rng: random.Random) -> None:
+    doc = fitz.open()
+    writer = _Writer(doc)
+
+    writer.line(f"Synthetic study of {', '.join(paper['alloys'])} magnesium alloys", bold=True)
+    writer.y += LINE_HEIGHT
+
+    # Filler goes to the introduction and discussion until the page
+    # target is reached, leaving room for the rest of the paper
+    lines_per_page = int((PAGE_HEIGHT - 2 * MARGIN) / LINE_HEIGHT)
+    filler_lines = max(0, (paper["pages"] - 2) * lines_per_page)
+
+    for title, paragraphs in paper["sections"].items():
+        writer.y += LINE_HEIGHT / 2
+        writer.line(title, bold=True)
+        for text in paragraphs:
+            writer.paragraph(text)
+
+        if title.endswith("Introduction") or title.endswith("discussion"):
+            written = 0
+            while written < filler_lines // 2:
+                text = " ".join(rng.choice(FILLER) + "." for _ in range(5))
+                writer.paragraph(text)
+                written += len(_wrap(text)) + 1
+
+        if title.endswith("discussion"):
+            for table in paper["tables"]:
+                writer.table(table)
+
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def generate_corpus(
+    directory: Path,
+    papers: int,
+    pages: int = 8,
+    tables: int = 2,
+    seed: int = 0,
+) -> List[Dict[str, Any]]:
+    """Write `papers` synthetic PDFs to `directory`; returns their content."""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(papers):
+        paper = make_paper(rng, i, pages, tables)
+        write_pdf(paper, directory / f"{paper['name']}.pdf", rng)
+        corpus.append(paper)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic PDF corpus for benchmarks")
+    parser.add_argument("directory", type=Path, help="where to write the PDFs")
+    parser.add_argument("--papers", type=int, default=20, help="number of papers (default: 20)")
+    parser.add_argument("--pages", type=int, default=8, help="approximate pages per paper (default: 8)")
+    parser.add_argument("--tables", type=int, default=2, choices=[0, 1, 2], help="tables per paper (default: 2)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.directory, args.papers, args.pages, args.tables, args.seed)
+    print(f"✅ Wrote {len(corpus)} papers to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List
+
+from bench.corpus import generate_corpus
+from config import RUNS_DIR, TABLE_BACKEND
+from evaluation.grounding import PageIndex
+from evaluation.validator import evaluate_records
+import fake_ollama
+from ingest.pdf_reader import iter_pdf_pages, open_pdf
+from ingest.section_splitter import split_sections_with_index
+from ingest.table_classifier import classify_tables
+from ingest.table_cleaner import clean_tables
+from ingest.table_extractor import extract_tables_from_pdf, select_table_pages
+from metrics import percentile, summarize_log
+
+
+# End-to-end benchmark on a synthetic corpus (see bench/corpus.py). The
+# ingest and validation stages are timed one by one in this process,
+# then src/pipeline.py runs over the whole corpus in a subprocess with
+# its directories moved to a scratch area and the LLM served by
+# fake_ollama, so nothing touches the real corpus, cache or model.
+#
+#   cd src && python -m bench.run --papers 20 --pages 8
+#   cd src && python -m bench.run --save-baseline   # then compare later runs
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+
+STAGES = ["pdf_reader", "section_splitter", "table_extractor", "clean_table1", "validator"]
+
+BASELINE_PATH = RUNS_DIR / "bench_baseline.json"
+# A run is a regression when a timing is this much worse than the baseline
+DEFAULT_TOLERANCE = 0.15
+# Timings below this are mostly noise and are not compared
+MIN_COMPARED_S = 0.005
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size; for RUSAGE_CHILDREN, of the largest waited-for descendant."""
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def stage_stats(values: List[float]) -> Dict[str, Any]:
+    values = sorted(values)
+    return {
+        "runs": len(values),
+        "total_s": round(sum(values), 4),
+        "p50_s": round(percentile(values, 50), 4),
+        "p95_s": round(percentile(values, 95), 4),
+        "p99_s": round(percentile(values, 99), 4),
+        "max_s": round(values[-1], 4),
+    }
+
+
+def reference_records(paper: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Microstructure records as an agent would report them from the results section."""
+    return [
+        {
+            "alloy": row["alloy"],
+            "material_form": "sheet",
+            "avg_grain_size_um": row["grain_size"],
+            "recrystallized": None,
+            "grain_morphology": None,
+            "texture": None,
+            "evidence": {"source": "text", "snippet": snippet},
+        }
+        for row, snippet in zip(paper["rows"], paper["sections"]["3. Results and discussion"])
+    ]
+
+
+def bench_stages(pdfs: List[Path], corpus: List[Dict[str, Any]], repeat: int) -> Dict[str, Any]:
+    """Each stage over every paper, the way ingest.batch and run_pipeline_b chain them."""
+    timings = {stage: [] for stage in STAGES}
+
+    def timed(stage, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        result = fn(*args, **kwargs)
+        timings[stage].append(time.perf_counter() - t0)
+        return result
+
+    for _ in range(repeat):
+        for path, paper in zip(pdfs, corpus):
+            pages = timed("pdf_reader", lambda: list(iter_pdf_pages(path)))
+            timed("section_splitter", split_sections_with_index, {"file_name": path.name, "pages": pages})
+
+            def extract():
+                table_pages = ",".join(str(p) for p in select_table_pages(pages))
+                doc = open_pdf(path)
+                try:
+                    return classify_tables(extract_tables_from_pdf(path, pages=table_pages, doc=doc))
+                finally:
+                    doc.close()
+
+            tables = timed("table_extractor", extract)
+            timed("clean_table1", clean_tables, tables)
+            timed("validator", lambda: evaluate_records(reference_records(paper), PageIndex(pages)))
+
+    return {
+        "stages": {stage: stage_stats(values) for stage, values in timings.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_pipeline(work: Path, papers: int, args) -> Dict[str, Any]:
+    """src/pipeline.py over the corpus in `work`, against a fake Ollama."""
+    server = fake_ollama.make_server([
+        "--port", "0",
+        "--latency", str(args.llm_latency),
+        "--token-rate", str(args.llm_token_rate),
+        "--parallel", str(args.llm_parallel),
+    ])
+    threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+    host, port = server.server_address[:2]
+
+    env = {
+        **os.environ,
+        "MATEXTRACT_PDF_DIR": str(work / "pdfs"),
+        "MATEXTRACT_OUTPUT_DIR": str(work / "output"),
+        "MATEXTRACT_RUNS_DIR": str(work / "runs"),
+        "MATEXTRACT_CACHE_DIR": str(work / "cache"),
+        "OLLAMA_HOSTS": f"http://{host}:{port}={args.llm_parallel}",
+        "LLM_CACHE": "0",
+        "METRICS_LOG": "1",
+        "METRICS_PORT": "0",
+    }
+    env.pop("OLLAMA_HOST", None)
+
+    command = [sys.executable, str(SRC_DIR / "pipeline.py")]
+    if args.workers:
+        command += ["--workers", str(args.workers)]
+
+    log_path = work / "pipeline.log"
+    t0 = time.perf_counter()
+    try:
+        with open(log_path, "w", encoding="utf-8") as log:
+            process = subprocess.run(command, cwd=SRC_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    finally:
+        server.shutdown()
+        server.server_close()
+    wall_s = time.perf_counter() - t0
+
+    if process.returncode != 0:
+        print(log_path.read_text(encoding="utf-8")[-3000:])
+        raise RuntimeError(f"pipeline exited with {process.returncode}, see {log_path}")
+
+    summaries = sorted((work / "runs").glob("pipeline_*.json"))
+    logs = sorted((work / "runs").glob("metrics_*.jsonl"))
+    status = json.loads(summaries[-1].read_text(encoding="utf-8"))["stages"] if summaries else {}
+
+    return {
+        "wall_s": round(wall_s, 3),
+        "papers": papers,
+        "papers_per_s": round(papers / wall_s, 3),
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN),
+        "status": status,
+        "stages": summarize_log(logs[-1])["stages"] if logs else {},
+        "llm": server.counts,
+    }
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Timings and memory against the baseline, one row per metric; rows
+    worse than `tolerance` (relative) are flagged as regressions.
+    """
+    pairs = []
+    for section in ("stages", "pipeline_stages"):
+        current = result.get(section, {})
+        for stage, stats in baseline.get(section, {}).items():
+            if stage not in current:
+                continue
+            for key in ("p50_s", "p95_s"):
+                pairs.append((f"{section}.{stage}.{key}", stats[key], current[stage][key], False))
+
+    for key, higher_is_better in (("wall_s", False), ("papers_per_s", True), ("peak_rss_mb", False)):
+        if key in baseline.get("pipeline", {}) and key in result.get("pipeline", {}):
+            pairs.append((f"pipeline.{key}", baseline["pipeline"][key], result["pipeline"][key], higher_is_better))
+
+    rows = []
+    for metric, before, after, higher_is_better in pairs:
+        if metric.endswith("_s") and max(before, after) < MIN_COMPARED_S:
+            continue
+        if not before:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better else change
+        rows.append({
+            "metric": metric,
+            "baseline": before,
+            "current": after,
+            "change_pct": round(100 * change, 1),
+            "regression": worse > tolerance,
+        })
+    return rows
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on a synthetic corpus")
+    parser.add_argument("--papers", type=int, default=20, help="papers in the corpus (default: 20)")
+    parser.add_argument("--pages", type=int, default=8, help="approximate pages per paper (default: 8)")
+    parser.add_argument("--tables", type=int, default=2, choices=[0, 1, 2], help="tables per paper (default: 2)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus for the stage timings (default: 3)")
+    parser.add_argument("--workers", type=int, help="ingest worker processes for the pipeline run (default: pipeline's)")
+    parser.add_argument("--skip-stages", action="store_true", help="only run the full pipeline")
+    parser.add_argument("--skip-pipeline", action="store_true", help="only time the stages")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="fake Ollama seconds before the first token (default: 0)")
+    parser.add_argument("--llm-token-rate", type=float, default=0.0, help="fake Ollama tokens per second (default: instant)")
+    parser.add_argument("--llm-parallel", type=int, default=4, help="fake Ollama generations at once (default: 4)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help=f"baseline to compare with (default: runs/{BASELINE_PATH.name})")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help=f"relative slowdown counted as a regression (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--keep", type=Path, help="work in this directory and keep the corpus and outputs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    work = args.keep or Path(tempfile.mkdtemp(prefix="matextract_bench_"))
+    corpus_params = {
+        "papers": args.papers, "pages": args.pages, "tables": args.tables, "seed": args.seed,
+    }
+    result: Dict[str, Any] = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "table_backend": TABLE_BACKEND,
+        "corpus": dict(corpus_params),
+    }
+
+    try:
+        t0 = time.perf_counter()
+        corpus = generate_corpus(work / "pdfs", args.papers, args.pages, args.tables, args.seed)
+        pdfs = [work / "pdfs" / f"{paper['name']}.pdf" for paper in corpus]
+        result["corpus"]["generate_s"] = round(time.perf_counter() - t0, 3)
+        result["corpus"]["mb"] = round(sum(p.stat().st_size for p in pdfs) / 1e6, 2)
+        print(f"📄 {len(pdfs)} synthetic papers ({result['corpus']['mb']} MB) in {work}")
+
+        if not args.skip_stages:
+            stages = bench_stages(pdfs, corpus, args.repeat)
+            result["stages"] = stages["stages"]
+            result["stages_peak_rss_mb"] = stages["peak_rss_mb"]
+            for stage, stats in result["stages"].items():
+                print(f"⏱️  {stage}: p50 {stats['p50_s'] * 1000:.1f} ms, p95 {stats['p95_s'] * 1000:.1f} ms, p99 {stats['p99_s'] * 1000:.1f} ms")
+
+        if not args.skip_pipeline:
+            pipeline = bench_pipeline(work, len(pdfs), args)
+            result["pipeline_stages"] = pipeline.pop("stages")
+            result["pipeline"] = pipeline
+            print(
+                f"🚀 Pipeline: {pipeline['wall_s']}s, {pipeline['papers_per_s']} papers/s, "
+                f"peak RSS {pipeline['peak_rss_mb']} MB"
+            )
+    finally:
+        if args.keep is None:
+            shutil.rmtree(work, ignore_errors=True)
+
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    result_path = RUNS_DIR / f"bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+
+    regressions = []
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if {k: baseline["corpus"].get(k) for k in corpus_params} != corpus_params:
+            print(f"⚠️ Baseline corpus {baseline['corpus']} differs from this run's; comparing anyway")
+        rows = compare(result, baseline, args.tolerance)
+        result["comparison"] = {"baseline": str(args.baseline), "rows": rows}
+        regressions = [r for r in rows if r["regression"]]
+
+        print(f"\n📊 Against {args.baseline}:")
+        for r in rows:
+            mark = "❌" if r["regression"] else "  "
+            print(f"{mark} {r['metric']}: {r['baseline']} → {r['current']} ({r['change_pct']:+.1f}%)")
+
+    result_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(f"✅ Results saved to {result_path}")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"📌 Saved as the baseline: {args.baseline}")
+
+    if regressions:
+        print(f"❌ {len(regressions)} regressions over {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
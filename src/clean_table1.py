@@ -1,117 +1,56 @@
-import json
-import re
-from pathlib import Path
+import argparse
+import time
 
+from ingest.table_cleaner import clean_tables
+from pipeline import STAGES, fingerprint, is_fresh, load_state, state_record
+from storage import get_store
 
-TABLES_JSON = Path("output/Steglich_Tian_Bohlen_Kuwabara_ExpMech2014_tables.json")
-OUT_JSON = Path("output/Steglich_Tian_Bohlen_Kuwabara_ExpMech2014_table1_clean.json")
 
-TARGET_TABLE_INDEX = 9
-
-
-def parse_value_with_std(text: str):
-    """
-    Converts values like:
-    "15 (1)" -> 15
-    "22.2 (1.5)" -> 22.2
-    "-" -> None
-    "" -> None
-    """
-    text = text.strip()
-
-    if text in ["", "-", "–"]:
-        return None
-
-    # take first number before space or bracket
-    match = re.search(r"[-+]?\d+(\.\d+)?", text)
-    if not match:
-        return None
-
-    num = match.group()
-    if "." in num:
-        return float(num)
-    return int(num)
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Normalize the mechanical-property tables of every paper"
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="re-clean papers whose clean Table 1 records are up to date",
+    )
+    return parser.parse_args()
 
 
 def main():
-    if not TABLES_JSON.exists():
-        print(f"❌ Missing file: {TABLES_JSON}")
-        return
-
-    with open(TABLES_JSON, "r", encoding="utf-8") as f:
-        tables = json.load(f)
-
-    target = None
-    for t in tables:
-        if t["table_index"] == TARGET_TABLE_INDEX:
-            target = t
-            break
-
-    if target is None:
-        print(f"❌ Table index {TARGET_TABLE_INDEX} not found.")
-        return
-
-    rows = target["rows"]
+    args = parse_args()
+    store = get_store()
 
-    # Find header row (contains "Alloy" and "Variant")
-    header_idx = None
-    for i, r in enumerate(rows):
-        joined = " ".join(r).lower()
-        if "alloy" in joined and "variant" in joined and "tys" in joined:
-            header_idx = i
-            break
+    # Same freshness check as the pipeline's clean_tables stage: the clean
+    # records are redone once the tables (or the cleaner) change, and a
+    # run of either tool counts for the other
+    spec = STAGES["clean_tables"]
 
-    if header_idx is None:
-        print("❌ Could not find header row.")
-        return
-
-    header = rows[header_idx]
-    data_rows = rows[header_idx + 1:]
-
-    # Expected columns
-    # Alloy | Variant | Av. grain size | TYS | CYS | SD | UTS | Fracture strain
-    clean_records = []
-
-    current_alloy = None
-
-    for r in data_rows:
-        if len(r) < 8:
+    cleaned = skipped = 0
+    for paper in store.papers():
+        if not store.exists(paper, "tables"):
             continue
-
-        alloy = r[0].strip()
-        variant = r[1].strip()
-
-        # If alloy column is empty, it belongs to previous alloy
-        if alloy != "":
-            current_alloy = alloy
-        else:
-            alloy = current_alloy
-
-        # skip totally empty rows
-        if not alloy and not variant:
+        state = load_state(store, paper)
+        key = fingerprint(store, paper, "clean_tables", spec)
+        if not args.force and is_fresh(store, paper, state.get("clean_tables"), key):
             continue
 
-        record = {
-            "alloy": alloy if alloy else None,
-            "variant": variant if variant else None,
-            "avg_grain_size_um": parse_value_with_std(r[2]),
-            "TYS_MPa": parse_value_with_std(r[3]),
-            "CYS_MPa": parse_value_with_std(r[4]),
-            "SD": parse_value_with_std(r[5]),
-            "UTS_MPa": parse_value_with_std(r[6]),
-            "fracture_strain_pct": parse_value_with_std(r[7]),
-        }
-
-        clean_records.append(record)
+        # Written even when empty, replacing records from an earlier run
+        start = time.perf_counter()
+        records = clean_tables(store.read(paper, "tables"))
+        store.write(paper, "table1_clean", records)
+        outputs = {"table1_clean": store.info(paper, "table1_clean")}
+        state["clean_tables"] = state_record("ok", key, outputs, time.perf_counter() - start)
+        store.write(paper, "pipeline_state", state)
+        if not records:
+            skipped += 1
+            continue
 
-    with open(OUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(clean_records, f, indent=2, ensure_ascii=False)
+        cleaned += 1
+        print(f"✅ {paper}: {len(records)} clean rows")
 
-    print(f"✅ Clean Table 1 records saved to: {OUT_JSON.resolve()}")
-    print(f"✅ Extracted {len(clean_records)} rows")
-    print("\nSample record:")
-    print(clean_records[0])
+    print(f"\n📊 Cleaned {cleaned} papers, {skipped} without a mechanical-property table")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
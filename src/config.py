@@ -1,11 +1,93 @@
+import os
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
 DATA_DIR = PROJECT_ROOT / "data"
-RAW_PDF_DIR = DATA_DIR / "raw_pdfs"
 
-OUTPUT_DIR = PROJECT_ROOT / "output"
+# Each directory can be moved with an environment variable, e.g. to run
+# on a scratch corpus (see bench/)
+RAW_PDF_DIR = Path(os.getenv("MATEXTRACT_PDF_DIR", DATA_DIR / "raw_pdfs"))
+OUTPUT_DIR = Path(os.getenv("MATEXTRACT_OUTPUT_DIR", PROJECT_ROOT / "output"))
+RUNS_DIR = Path(os.getenv("MATEXTRACT_RUNS_DIR", PROJECT_ROOT / "runs"))
+CACHE_DIR = Path(os.getenv("MATEXTRACT_CACHE_DIR", PROJECT_ROOT / "cache"))
+
+# Where per-paper artifacts live: "json" writes OUTPUT_DIR/<paper>/*.json,
+# "sqlite" keeps every artifact compressed in a single corpus database.
+STORAGE_BACKEND = os.getenv("MATEXTRACT_STORAGE", "json")
+STORE_DB_NAME = "artifacts.sqlite"
+
+# Parquet tables written by export_parquet.py
+EXPORT_DIR = PROJECT_ROOT / "export"
+
+# Ingestion (Pipeline A, stages 1-4)
+INGEST_WORKERS = os.cpu_count() or 1
+INGEST_TIMEOUT_S = 600
+# "auto" runs Camelot only on pages that look like they carry a table,
+# "all" scans every page
+TABLE_PAGES = "auto"
+# Table engine: "pymupdf" detects tables in the already-open document,
+# "camelot" re-parses the PDF with Camelot (slower, needs OpenCV), and
+# "auto" uses PyMuPDF with Camelot as a fallback for pages where it
+# finds nothing (skipped if Camelot is not installed)
+TABLE_BACKEND = os.getenv("TABLE_BACKEND", "auto")
+# Stop reading a PDF once its references start. Saves time and memory on
+# theses and proceedings, but drops the reference list and any appendix.
+STOP_AT_REFERENCES = False
+
+# LLM agents (Pipeline A, stage 5). Keep the in-flight limit matched to
+# the Ollama server's OLLAMA_NUM_PARALLEL so its queue stays full.
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+LLM_MAX_RETRIES = 3
+LLM_RETRY_BACKOFF_S = 2.0
+
+# Ollama servers to spread requests over, comma-separated, each with an
+# optional in-flight limit ("http://node1:11434=8,http://node2:11434");
+# the limit defaults to OLLAMA_NUM_PARALLEL. Unset, the single default
+# host (OLLAMA_HOST) is used. Requests go to the least-loaded healthy
+# host that has the model (see agents/ollama_pool.py).
+OLLAMA_HOSTS = [h.strip() for h in os.getenv("OLLAMA_HOSTS", "").split(",") if h.strip()]
+# A host is ejected after this many consecutive failures, for
+# OLLAMA_EJECT_S doubling per repeat up to OLLAMA_MAX_EJECT_S, and
+# re-admitted early by a passing health check
+OLLAMA_EJECT_AFTER = 3
+OLLAMA_EJECT_S = 30.0
+OLLAMA_MAX_EJECT_S = 600.0
+# Seconds between health checks (model list) of every host; 0 disables
+OLLAMA_HEALTH_INTERVAL_S = float(os.getenv("OLLAMA_HEALTH_INTERVAL_S", "15"))
+OLLAMA_HEALTH_TIMEOUT_S = 5.0
+
+# Responses to deterministic (temperature 0) requests are cached on disk.
+# Set LLM_CACHE=0 to bypass; manage with `python -m agents.llm_cache`.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = CACHE_DIR / "llm_responses.sqlite"
+LLM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Stream responses and parse them incrementally, stopping generation as
+# soon as the output goes off-schema. Set LLM_STREAMING=0 to disable.
+LLM_STREAMING = os.getenv("LLM_STREAMING", "1") != "0"
+
+# Pass each agent's JSON schema as Ollama's structured-output `format`
+# (needs Ollama >= 0.5). Responses are validated against it either way.
+LLM_STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "1") != "0"
+
+# Fill agent outputs from tables and composition strings with deterministic
+# rules first; only what they cannot fill goes to the LLM. Set
+# RULES_FAST_PATH=0 to always use the LLM.
+RULES_FAST_PATH = os.getenv("RULES_FAST_PATH", "1") != "0"
+
+# Score papers and sections before the LLM agents and skip agents that
+# have nothing to extract (see agents/triage.py). TRIAGE=0 runs every
+# agent on every paper.
+TRIAGE = os.getenv("TRIAGE", "1") != "0"
+
+# Stage timings and LLM token counts go to a JSONL log in RUNS_DIR
+# (METRICS_LOG=0 to disable); set METRICS_PORT to serve them in
+# Prometheus format from long-running commands.
+METRICS_LOG = os.getenv("METRICS_LOG", "1") != "0"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
 
 OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
 RAW_PDF_DIR.mkdir(exist_ok=True, parents=True)
+RUNS_DIR.mkdir(exist_ok=True, parents=True)
+CACHE_DIR.mkdir(exist_ok=True, parents=True)
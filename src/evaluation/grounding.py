@@ -0,0 +1,244 @@
+import bisect
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, List, Iterable, Optional, Tuple
+
+from config import RAW_PDF_DIR
+from ingest.pdf_reader import iter_pdf_pages
+
+
+# Length of the character n-grams used to find candidate locations for
+# snippets that do not occur verbatim
+QGRAM = 8
+# Fuzzy matches may differ from the page text in at most this share of
+# characters (OCR noise, ligatures, a paraphrased word)
+MAX_ERROR_RATE = 0.15
+# Candidate alignments verified with edit distance per snippet fragment
+MAX_CANDIDATES = 3
+# Fragments shorter than this are too unspecific to locate on their own:
+# they are dropped, unless they carry a number, which must then occur
+# verbatim ("... 99 μm ...")
+MIN_FRAGMENT_CHARS = 12
+DIGIT_RE = re.compile(r"\d")
+
+# LLM snippets elide text with "..." ("A well-known ... AZ31 (Mg+3 %Al) ...")
+ELLIPSIS_RE = re.compile(r"\s*(?:\.\s*){3,}|\s*…\s*")
+
+_CHAR_MAP = str.maketrans({
+    "‐": "-", "‑": "-", "‒": "-", "–": "-", "—": "-", "−": "-",
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "µ": "μ",
+})
+
+
+def normalize(text: str) -> Tuple[str, List[int]]:
+    """
+    Case-fold, unify dashes, quotes and ligatures, collapse whitespace and
+    rejoin words hyphenated across lines. Returns the normalized text and,
+    for each of its characters, the offset of the source character.
+    """
+    out = []
+    offsets = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+
+        # "recrys-\ntallized" -> "recrystallized"
+        if c in "-‐" and i + 1 < n and text[i + 1] == "\n":
+            i += 2
+            continue
+
+        if c.isspace():
+            if out and out[-1] != " ":
+                out.append(" ")
+                offsets.append(i)
+            i += 1
+            continue
+
+        for ch in unicodedata.normalize("NFKC", c).translate(_CHAR_MAP).lower():
+            out.append(ch)
+            offsets.append(i)
+        i += 1
+
+    return "".join(out), offsets
+
+
+def banded_distance(pattern: str, text: str, band: int) -> Tuple[int, int, int]:
+    """
+    Semi-global edit distance of `pattern` against `text`, where the match
+    must start within the first 2*band+1 characters of `text` and stays
+    within `band` of that diagonal. Returns (distance, start, end) in
+    `text` coordinates.
+    """
+    m = len(pattern)
+    width = 2 * band + 1
+    inf = m + width
+
+    # Row i covers text columns i .. i + 2*band; k = j - i
+    cost = [0] * width
+    start = list(range(width))
+    for i in range(1, m + 1):
+        p = pattern[i - 1]
+        new_cost = [inf] * width
+        new_start = [0] * width
+        for k in range(width):
+            j = i + k
+            if j > len(text):
+                break
+            # diagonal: previous row, same k
+            best = cost[k] + (p != text[j - 1])
+            origin = start[k]
+            # up (skip a pattern char): previous row, k + 1
+            if k + 1 < width and cost[k + 1] + 1 < best:
+                best = cost[k + 1] + 1
+                origin = start[k + 1]
+            # left (skip a text char): this row, k - 1
+            if k > 0 and new_cost[k - 1] + 1 < best:
+                best = new_cost[k - 1] + 1
+                origin = new_start[k - 1]
+            new_cost[k] = best
+            new_start[k] = origin
+        cost, start = new_cost, new_start
+
+    k = min(range(width), key=lambda k: cost[k])
+    return cost[k], start[k], m + k
+
+
+class PageIndex:
+    """
+    The page texts of one paper, normalized into a single string with a
+    map back to (page, offset in the page text), plus an n-gram index for
+    finding approximate matches. Built once per paper.
+    """
+
+    def __init__(self, pages: Iterable[Dict[str, Any]]):
+        parts = []
+        self._texts: List[str] = []
+        self._offsets: List[int] = []
+        self._page_starts: List[int] = []
+        self._page_numbers: List[int] = []
+
+        pos = 0
+        for page in pages:
+            text, offsets = normalize(page["text"])
+            self._page_starts.append(pos)
+            self._page_numbers.append(page["page"])
+            self._texts.append(page["text"])
+            parts.append(text + " ")
+            self._offsets.extend(offsets)
+            self._offsets.append(len(page["text"]))
+            pos += len(text) + 1
+
+        self.text = "".join(parts)
+
+        self._grams: Dict[str, List[int]] = {}
+        for i in range(len(self.text) - QGRAM + 1):
+            self._grams.setdefault(self.text[i:i + QGRAM], []).append(i)
+
+    def position(self, pos: int) -> Tuple[int, int]:
+        """(page number, offset in that page's text) of a normalized offset."""
+        k = bisect.bisect_right(self._page_starts, pos) - 1
+        return self._page_numbers[k], self._offsets[pos]
+
+    def excerpt(self, start: int, end: int) -> str:
+        """The page text behind the normalized span start:end."""
+        first = bisect.bisect_right(self._page_starts, start) - 1
+        last = bisect.bisect_right(self._page_starts, max(end - 1, start)) - 1
+        parts = []
+        for k in range(first, last + 1):
+            lo = self._offsets[start] if k == first else 0
+            hi = self._offsets[end - 1] + 1 if k == last else len(self._texts[k])
+            parts.append(self._texts[k][lo:hi])
+        return " ".join(parts)
+
+    def _candidates(self, fragment: str) -> List[int]:
+        """Likely start offsets of `fragment`, by n-gram votes per diagonal."""
+        votes = Counter()
+        for j in range(0, len(fragment) - QGRAM + 1, QGRAM):
+            for i in self._grams.get(fragment[j:j + QGRAM], ()):
+                votes[i - j] += 1
+        return [start for start, _ in votes.most_common(MAX_CANDIDATES)]
+
+    def _locate_fragment(self, fragment: str) -> Optional[Dict[str, Any]]:
+        start = self.text.find(fragment)
+        if start != -1:
+            return {"start": start, "end": start + len(fragment), "distance": 0}
+
+        max_distance = int(MAX_ERROR_RATE * len(fragment))
+        band = max(max_distance, 1)
+
+        best = None
+        for candidate in self._candidates(fragment):
+            lo = max(candidate - band, 0)
+            window = self.text[lo:candidate + len(fragment) + 2 * band]
+            distance, s, e = banded_distance(fragment, window, band)
+            if distance <= max_distance and (best is None or distance < best["distance"]):
+                best = {"start": lo + s, "end": lo + e, "distance": distance}
+        return best
+
+    def locate(self, snippet: str) -> Dict[str, Any]:
+        """
+        Find `snippet` in the paper. Elided snippets are located fragment
+        by fragment and must appear in order. Returns "found" with the
+        page and character span of the match in the page texts, the edit
+        distance, a 0-1 match score and the page text actually matched
+        ("text"), which is what values should be checked against.
+        """
+        fragments = [
+            normalize(f)[0].strip() for f in ELLIPSIS_RE.split(snippet or "")
+        ]
+        fragments = [
+            f for f in fragments if len(f) >= MIN_FRAGMENT_CHARS or DIGIT_RE.search(f)
+        ]
+        if not fragments:
+            return {"found": False, "reason": "empty snippet"}
+
+        matches = []
+        for fragment in fragments:
+            if len(fragment) >= MIN_FRAGMENT_CHARS:
+                match = self._locate_fragment(fragment)
+            else:
+                start = self.text.find(fragment)
+                match = None if start == -1 else {"start": start, "end": start + len(fragment), "distance": 0}
+            if match is None:
+                return {"found": False, "reason": f"not in paper: {fragment[:60]!r}"}
+            matches.append(match)
+
+        if any(b["start"] < a["start"] for a, b in zip(matches, matches[1:])):
+            return {"found": False, "reason": "fragments out of order"}
+
+        start, end = matches[0]["start"], matches[-1]["end"]
+        page_start, offset_start = self.position(start)
+        page_end, offset_end = self.position(max(end - 1, start))
+        distance = sum(m["distance"] for m in matches)
+        length = sum(len(f) for f in fragments)
+
+        return {
+            "found": True,
+            "method": "exact" if distance == 0 else "fuzzy",
+            "page": page_start,
+            "page_end": page_end,
+            "start": offset_start,
+            "end": offset_end + 1,
+            "distance": distance,
+            "score": round(1 - distance / length, 3),
+            "text": " ... ".join(self.excerpt(m["start"], m["end"]) for m in matches),
+        }
+
+
+def source_pdf(paper: str, store=None) -> Path:
+    """The PDF a paper was ingested from, per its manifest or RAW_PDF_DIR."""
+    if store is not None and store.exists(paper, "ingest_manifest"):
+        path = Path(store.read(paper, "ingest_manifest")["source"]["path"])
+        if path.exists():
+            return path
+    return RAW_PDF_DIR / f"{paper}.pdf"
+
+
+def load_page_index(paper: str, store=None) -> PageIndex:
+    pdf_path = source_pdf(paper, store)
+    if not pdf_path.exists():
+        raise FileNotFoundError(f"Missing source PDF for {paper}: {pdf_path}")
+    return PageIndex(iter_pdf_pages(pdf_path))
@@ -1,42 +1,257 @@
 import re
+from functools import lru_cache
+from typing import Dict, List, Iterable, Optional, Set, Tuple
+
+from agents.rules import RULE_TABLE_SOURCE
+
+
+# "um" typed for "μm", only after a number so "medium" stays intact
+ASCII_MICRON_RE = re.compile(r"(?<=\d)(\s*)um\b")
 
 
 def normalize_units(text: str) -> str:
     if not text:
         return ""
-    return (
+    text = (
         text
         .replace("Î¼", "μ")
-        .replace("um", "μm")
+        .replace("µ", "μ")
+        .replace("−", "-")
     )
+    if "um" in text:
+        text = ASCII_MICRON_RE.sub(r"\1μm", text)
+    return text
+
+
+# Every unit maps to a canonical unit and a factor, so "0.015 mm" and
+# "15 μm" index to the same value
+UNITS = {
+    "nm": ("μm", 1e-3),
+    "μm": ("μm", 1.0),
+    "mm": ("μm", 1e3),
+    "MPa": ("MPa", 1.0),
+    "GPa": ("MPa", 1e3),
+    "%": ("%", 1.0),
+    "°C": ("°C", 1.0),
+    "K": ("°C", None),  # offset, see canonical()
+    "h": ("h", 1.0),
+    "min": ("h", 1 / 60),
+    "s": ("h", 1 / 3600),
+}
+
+# Units implied by field-name suffixes (avg_grain_size_um, TYS_MPa, ...)
+FIELD_UNITS = [
+    ("_um", "μm"),
+    ("_mm", "mm"),
+    ("_MPa", "MPa"),
+    ("_GPa", "GPa"),
+    ("_pct", "%"),
+    ("_C", "°C"),
+    ("_h", "h"),
+    ("percent", "%"),
+]
+
+# Units a value was accepted with before field units existed
+LEGACY_UNITS = ("μm", "MPa", "%")
+
+NUMBER_UNIT_RE = re.compile(
+    r"(?<![\w.])(?P<number>\d+(?:\.\d+)?)(?![\w.]*\d)"
+    # an optional spread between value and unit: "170 ± 2 MPa", "15 (1) μm"
+    r"(?:\s*(?:±\s*\d+(?:\.\d+)?|\(\s*±?\s*\d+(?:\.\d+)?\s*\)))?"
+    r"\s*(?P<unit>%|°\s*C(?![A-Za-z])|(?:μm|nm|mm|MPa|GPa|K|h|min|s)(?![A-Za-z]))?"
+)
+# Text between the numbers of a range or list: "15 and 7 μm",
+# "150–200 MPa", "3, 5 or 7 %"
+SEPARATOR_RE = re.compile(r"\s*(?:,|and|or|to|-|–|—|/|,\s*and)?\s*$")
+
+# Two numbers match when within this relative tolerance, which absorbs
+# float noise from unit conversion but not a different reported value
+REL_TOL = 1e-3
+
+
+def canonical(number: float, unit: str) -> Tuple[str, float]:
+    if unit == "K":
+        return "°C", number - 273.15
+    canon, factor = UNITS[unit]
+    return canon, number * factor
+
+
+@lru_cache(maxsize=None)
+def field_unit(field: str) -> Optional[str]:
+    for suffix, unit in FIELD_UNITS:
+        if field.endswith(suffix):
+            return unit
+    return None
+
+
+class EvidenceIndex:
+    """
+    (number, unit) pairs of one snippet, normalized and tokenized once.
+    A unitless number directly followed by a range or list continuation
+    inherits the unit at its end, so both 15 and 7 count as μm in
+    "15 and 7 μm". Values are stored in canonical units.
+    """
+
+    def __init__(self, snippet: str):
+        text = normalize_units(snippet or "")
+
+        numbers, units, spans = [], [], []
+        for m in NUMBER_UNIT_RE.finditer(text):
+            number, unit = m.groups()
+            numbers.append(float(number))
+            units.append(unit.replace(" ", "") if unit else None)
+            spans.append(m.span())
+
+        # Propagate units right to left across separators
+        for i in range(len(units) - 2, -1, -1):
+            if units[i] is None and units[i + 1] is not None:
+                if SEPARATOR_RE.match(text, spans[i][1], spans[i + 1][0]):
+                    units[i] = units[i + 1]
+
+        # Canonical unit -> values; membership is a set lookup and the
+        # tolerance scan only runs on a miss
+        self.values: Dict[Optional[str], Set[float]] = {}
+        for number, unit in zip(numbers, units):
+            if unit is not None:
+                unit, number = canonical(number, unit)
+            if unit in self.values:
+                self.values[unit].add(number)
+            else:
+                self.values[unit] = {number}
+        self._all = set().union(*self.values.values()) if len(self.values) > 1 else (
+            next(iter(self.values.values())) if self.values else set()
+        )
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self.values.values())
+
+    def contains(self, value: float, unit: Optional[str] = None) -> bool:
+        """
+        Whether `value` appears with `unit` (converted to canonical units).
+        With no unit, any number in the snippet counts.
+        """
+        if unit is None:
+            candidates = self._all
+        else:
+            unit, value = canonical(value, unit)
+            candidates = self.values.get(unit, ())
+
+        if value in candidates:
+            return True
+
+        tol = REL_TOL * max(abs(value), 1.0)
+        return any(abs(c - value) <= tol for c in candidates)
 
+    def contains_any(self, value: float, units: Iterable[str]) -> bool:
+        return any(self.contains(value, unit) for unit in units)
 
-def value_in_evidence(value, snippet: str) -> bool:
+
+@lru_cache(maxsize=65536)
+def evidence_index(snippet: str) -> EvidenceIndex:
+    """Indexes are cached per snippet; records often share one."""
+    return EvidenceIndex(snippet)
+
+
+def value_in_evidence(value, snippet: str, unit: Optional[str] = None) -> bool:
     if value is None or not snippet:
         return False
 
-    snippet = normalize_units(snippet)
-
     # Numeric values only
-    if isinstance(value, (int, float)):
-        number = int(value) if value == int(value) else value
-        pattern = rf"{number}\s*(μm|MPa|%)"
-        return re.search(pattern, snippet) is not None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
 
-    return False
+    index = evidence_index(snippet)
+    if unit is not None:
+        return index.contains(value, unit)
+    return index.contains_any(value, LEGACY_UNITS)
 
 
-def evaluate_record(record: dict) -> dict:
-    evidence = normalize_units(
-        record.get("evidence", {}).get("snippet", "")
-    )
+SKIPPED_FIELDS = frozenset(["alloy", "variant", "material_form", "evidence", "filled"])
+
+
+def table_row(record: dict, table_records: Optional[List[dict]]) -> Optional[dict]:
+    """
+    The clean table row a rule-derived record cites (same table_index and
+    raw cells), or None for any other record or a row that is not there.
+    """
+    evidence = record.get("evidence", {})
+    if evidence.get("source") != RULE_TABLE_SOURCE or not table_records:
+        return None
+    for row in table_records:
+        if row.get("table_index") == evidence.get("table_index") and row.get("cells") == evidence.get("cells"):
+            return row
+    return None
+
+
+def _same_value(a, b) -> bool:
+    if a is None or b is None:
+        return False
+    return abs(a - b) <= REL_TOL * max(abs(b), 1.0)
+
+
+def ground(record: dict, pages, table_records: Optional[List[dict]] = None) -> Optional[dict]:
+    """
+    Locate the record's evidence in the paper (see grounding.PageIndex).
+    Only rule-derived records citing a row of `table_records` are exempt:
+    they are checked against that row instead, and only the evidence of
+    properties the LLM filled in is located. Evidence that merely claims
+    to come from a table is searched for like any other.
+    """
+    if table_row(record, table_records) is not None:
+        filled = record.get("filled")
+        if not filled:
+            return None
+        return pages.locate(filled.get("evidence", {}).get("snippet", "") or "")
+    return pages.locate(record.get("evidence", {}).get("snippet", "") or "")
+
+
+def evaluate_record(
+    record: dict,
+    index: Optional[EvidenceIndex] = None,
+    pages=None,
+    grounding: Optional[dict] = None,
+    table_records: Optional[List[dict]] = None,
+) -> dict:
+    """
+    With `pages` (a grounding.PageIndex of the paper) the evidence snippet
+    itself is also located in the paper, and values are checked against
+    the text that was located rather than the snippet; values backed by a
+    snippet that is not in the paper count for nothing and the record
+    gets low confidence.
+
+    Values of rule-derived records (see agents.rules.RULE_TABLE_SOURCE)
+    are checked against the clean table row they cite, from
+    `table_records`; without that row none of them verifies. Properties
+    the LLM filled in are checked against its evidence.
+    """
+    if index is None:
+        index = evidence_index(record.get("evidence", {}).get("snippet", "") or "")
+    if grounding is None and pages is not None:
+        grounding = ground(record, pages, table_records)
+
+    from_table = record.get("evidence", {}).get("source") == RULE_TABLE_SOURCE
+    row = table_row(record, table_records) if from_table else None
+    filled = record.get("filled") or {}
+    filled_index = evidence_index(filled.get("evidence", {}).get("snippet", "") or "") if filled else None
+
+    # The grounding is of the filled evidence for rule-derived records
+    if grounding is not None:
+        located = evidence_index(grounding.get("text", "") if grounding["found"] else "")
+        if from_table:
+            filled_index = located
+        else:
+            index = located
+
+    # Mechanical records keep their values under "properties"
+    values = {k: v for k, v in record.items() if k != "properties"}
+    values.update(record.get("properties") or {})
 
     checks = {}
     score = 0
     max_score = 0
 
-    for key, value in record.items():
-        if key in ["alloy", "variant", "material_form", "evidence"]:
+    for key, value in values.items():
+        if key in SKIPPED_FIELDS:
             continue
 
         # Booleans → semantic
@@ -49,10 +264,18 @@ def evaluate_record(record: dict) -> dict:
             checks[key] = "semantic"
             continue
 
-        # Numeric values → must be verified
+        # Numeric values → must be verified, in the unit the field name
+        # implies (TYS_MPa, avg_grain_size_um), or as any number otherwise
         if isinstance(value, (int, float)):
             max_score += 1
-            if value_in_evidence(value, evidence):
+            unit = field_unit(key)
+            if key in filled.get("fields", ()):
+                verified = filled_index.contains(value, unit)
+            elif from_table:
+                verified = row is not None and _same_value(value, row.get(key))
+            else:
+                verified = index.contains(value, unit)
+            if verified:
                 checks[key] = "verified"
                 score += 1
             else:
@@ -70,8 +293,46 @@ def evaluate_record(record: dict) -> dict:
         "low"
     )
 
-    return {
+    result = {
         "checks": checks,
         "confidence": confidence,
         "verified_ratio": round(score / max_score, 2) if max_score > 0 else 0.0
     }
+
+    if grounding is not None:
+        result["grounding"] = grounding
+        if not grounding["found"]:
+            result["confidence"] = "low"
+    return result
+
+
+def evaluate_records(
+    records: Iterable[dict],
+    pages=None,
+    table_records: Optional[List[dict]] = None,
+) -> List[dict]:
+    """
+    evaluate_record over many records of one paper, indexing (and, with
+    `pages`, grounding) each distinct snippet once for the whole batch.
+    """
+    indexes = {}
+    groundings = {}
+    results = []
+    for record in records:
+        snippet = record.get("evidence", {}).get("snippet", "") or ""
+        if snippet not in indexes:
+            indexes[snippet] = EvidenceIndex(snippet)
+        grounding = None
+        if pages is not None:
+            # Rule-derived records are grounded by their table row and
+            # filled evidence, not by the snippet they share with others
+            if table_row(record, table_records) is not None:
+                grounding = ground(record, pages, table_records)
+            else:
+                if snippet not in groundings:
+                    groundings[snippet] = ground(record, pages)
+                grounding = groundings[snippet]
+        results.append(evaluate_record(
+            record, indexes[snippet], grounding=grounding, table_records=table_records,
+        ))
+    return results
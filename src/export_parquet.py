@@ -0,0 +1,316 @@
+import argparse
+import shutil
+from pathlib import Path
+from typing import Dict, Any, List, Iterable
+
+from config import EXPORT_DIR
+from evaluation.validator import evaluate_record
+from storage import get_store
+
+
+# Column types per exported table. Declared up front so every batch file
+# has the same schema, even when a column is entirely null in that batch.
+TABLES = {
+    "mechanical": [
+        ("paper_id", "string"),
+        ("record_index", "int32"),
+        ("alloy", "string"),
+        ("variant", "string"),
+        ("avg_grain_size_um", "float64"),
+        ("TYS_MPa", "float64"),
+        ("CYS_MPa", "float64"),
+        ("SD", "float64"),
+        ("UTS_MPa", "float64"),
+        ("fracture_strain_pct", "float64"),
+        ("evidence_source", "string"),
+        ("evidence_snippet", "string"),
+        ("confidence", "string"),
+        ("verified_ratio", "float64"),
+    ],
+    "compositions": [
+        ("paper_id", "string"),
+        ("alloy_index", "int32"),
+        ("alloy_name", "string"),
+        ("element", "string"),
+        ("percent", "float64"),
+        ("evidence_snippet", "string"),
+        ("confidence", "string"),
+        ("verified_ratio", "float64"),
+    ],
+    "processing_steps": [
+        ("paper_id", "string"),
+        ("route_index", "int32"),
+        ("step_index", "int32"),
+        ("material_form", "string"),
+        ("condition", "string"),
+        ("thickness_mm", "float64"),
+        ("step", "string"),
+        ("temperature_C", "float64"),
+        ("time_h", "float64"),
+        ("evidence_snippet", "string"),
+        ("confidence", "string"),
+        ("verified_ratio", "float64"),
+    ],
+    "microstructures": [
+        ("paper_id", "string"),
+        ("record_index", "int32"),
+        ("alloy", "string"),
+        ("material_form", "string"),
+        ("avg_grain_size_um", "float64"),
+        ("recrystallized", "bool"),
+        ("grain_morphology", "string"),
+        ("texture", "string"),
+        ("evidence_snippet", "string"),
+        ("confidence", "string"),
+        ("verified_ratio", "float64"),
+    ],
+}
+
+# Written to the export directory; only a directory carrying it is
+# cleared before a new export
+EXPORT_MARKER = ".parquet_export"
+
+MECH_PROPERTIES = ["avg_grain_size_um", "TYS_MPa", "CYS_MPa", "SD", "UTS_MPa", "fracture_strain_pct"]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Parquet export needs pyarrow: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+def _number(value) -> float | None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def _text(value) -> str | None:
+    return value if isinstance(value, str) else None
+
+
+def _snippet(item: Dict[str, Any]) -> str | None:
+    evidence = item.get("evidence")
+    return _text(evidence.get("snippet")) if isinstance(evidence, dict) else None
+
+
+def _scored(record: Dict[str, Any], validation: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    validation = validation or evaluate_record(record)
+    return {
+        "confidence": validation.get("confidence"),
+        "verified_ratio": validation.get("verified_ratio"),
+    }
+
+
+def mechanical_rows(
+    paper: str,
+    data: Dict[str, Any],
+    table_records: List[Dict[str, Any]] | None = None,
+) -> List[Dict[str, Any]]:
+    """Rule-derived records are scored against the clean table rows they cite."""
+    rows = []
+    for i, r in enumerate(data.get("records", [])):
+        props = r.get("properties") or {}
+        values = {k: _number(props.get(k)) for k in MECH_PROPERTIES}
+        evidence = r.get("evidence") or {}
+        rows.append({
+            "paper_id": paper,
+            "record_index": i,
+            "alloy": _text(r.get("alloy")),
+            "variant": _text(r.get("variant")),
+            **values,
+            "evidence_source": _text(evidence.get("source")),
+            "evidence_snippet": _snippet(r),
+            **_scored(r, evaluate_record(r, table_records=table_records)),
+        })
+    return rows
+
+
+def composition_rows(paper: str, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for i, alloy in enumerate(data.get("alloys", [])):
+        for part in alloy.get("composition", []):
+            percent = _number(part.get("percent"))
+            rows.append({
+                "paper_id": paper,
+                "alloy_index": i,
+                "alloy_name": _text(alloy.get("alloy_name")),
+                "element": _text(part.get("element")),
+                "percent": percent,
+                "evidence_snippet": _snippet(alloy),
+                # No stated value (the Mg balance) has nothing to verify
+                **(
+                    {"confidence": None, "verified_ratio": None} if percent is None else
+                    _scored({"percent": percent, "evidence": alloy.get("evidence") or {}})
+                ),
+            })
+    return rows
+
+
+def processing_rows(paper: str, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    rows = []
+    for i, route in enumerate(data.get("processing_routes", [])):
+        for j, step in enumerate(route.get("steps", [])):
+            values = {
+                "thickness_mm": _number(route.get("thickness_mm")),
+                "temperature_C": _number(step.get("temperature_C")),
+                "time_h": _number(step.get("time_h")),
+            }
+            rows.append({
+                "paper_id": paper,
+                "route_index": i,
+                "step_index": j,
+                "material_form": _text(route.get("material_form")),
+                "condition": _text(route.get("condition")),
+                "step": _text(step.get("step")),
+                **values,
+                "evidence_snippet": _snippet(route),
+                **_scored({**values, "evidence": route.get("evidence") or {}}),
+            })
+    return rows
+
+
+def microstructure_rows(
+    paper: str,
+    data: Dict[str, Any],
+    validated: List[Dict[str, Any]] | None = None,
+) -> List[Dict[str, Any]]:
+    """Uses Pipeline B's validation where it exists, scores the record otherwise."""
+    rows = []
+    for i, r in enumerate(data.get("microstructures", [])):
+        validation = validated[i]["validation"] if validated and i < len(validated) else None
+        recrystallized = r.get("recrystallized")
+        rows.append({
+            "paper_id": paper,
+            "record_index": i,
+            "alloy": _text(r.get("alloy")),
+            "material_form": _text(r.get("material_form")),
+            "avg_grain_size_um": _number(r.get("avg_grain_size_um")),
+            "recrystallized": recrystallized if isinstance(recrystallized, bool) else None,
+            "grain_morphology": _text(r.get("grain_morphology")),
+            "texture": _text(r.get("texture")),
+            "evidence_snippet": _snippet(r),
+            **_scored(r, validation),
+        })
+    return rows
+
+
+def paper_rows(store, paper: str) -> Dict[str, List[Dict[str, Any]]]:
+    def read(kind):
+        return store.read(paper, kind) if store.exists(paper, kind) else None
+
+    rows = {name: [] for name in TABLES}
+
+    if (data := read("mech_agent")) is not None:
+        rows["mechanical"] = mechanical_rows(paper, data, read("table1_clean"))
+    if (data := read("composition_agent")) is not None:
+        rows["compositions"] = composition_rows(paper, data)
+    if (data := read("processing_agent")) is not None:
+        rows["processing_steps"] = processing_rows(paper, data)
+    if (data := read("microstructure_agent")) is not None:
+        rows["microstructures"] = microstructure_rows(paper, data, read("validated"))
+
+    return rows
+
+
+def write_batch(out_dir: Path, batch: int, rows: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
+    """Write one Parquet file per table to <out_dir>/<table>/batch=<n>/."""
+    pa = _pyarrow()
+
+    written = {}
+    for name, columns in TABLES.items():
+        if not rows[name]:
+            continue
+
+        schema = pa.schema([(col, pa.type_for_alias(kind)) for col, kind in columns])
+        table = pa.Table.from_pylist(rows[name], schema=schema)
+
+        part_dir = out_dir / name / f"batch={batch:05d}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+        pa.parquet.write_table(table, part_dir / "part-0.parquet", compression="zstd")
+        written[name] = table.num_rows
+    return written
+
+
+def clear_export(out_dir: Path) -> None:
+    """
+    Remove the <table>/batch=*/ partitions of an earlier export from
+    `out_dir` and mark it as an export directory. A non-empty directory
+    without the marker was not written here and is left alone.
+    """
+    marker = out_dir / EXPORT_MARKER
+    if out_dir.exists() and any(out_dir.iterdir()) and not marker.exists():
+        raise FileExistsError(
+            f"{out_dir} is not empty and has no {EXPORT_MARKER} marker; "
+            "refusing to overwrite it, choose another --out"
+        )
+
+    for name in TABLES:
+        for part_dir in (out_dir / name).glob("batch=*"):
+            shutil.rmtree(part_dir)
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+
+
+def export(
+    store,
+    out_dir: Path,
+    batch_size: int = 500,
+    papers: Iterable[str] | None = None,
+) -> Dict[str, int]:
+    """
+    Flatten every paper's agent outputs into typed tables and write them
+    as Parquet, `batch_size` papers per partition, so memory stays bounded
+    by one batch regardless of corpus size. Returns row counts per table.
+    """
+    _pyarrow()
+
+    papers = store.papers() if papers is None else list(papers)
+    totals = {name: 0 for name in TABLES}
+
+    for batch, start in enumerate(range(0, len(papers), batch_size)):
+        rows = {name: [] for name in TABLES}
+        for paper in papers[start:start + batch_size]:
+            for name, paper_table in paper_rows(store, paper).items():
+                rows[name].extend(paper_table)
+
+        for name, count in write_batch(out_dir, batch, rows).items():
+            totals[name] += count
+        print(f"✅ Exported batch {batch} ({min(start + batch_size, len(papers))}/{len(papers)} papers)")
+
+    return totals
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export extracted records as Parquet tables")
+    parser.add_argument(
+        "--out", type=Path, default=EXPORT_DIR,
+        help=f"output directory (default: {EXPORT_DIR})",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=500,
+        help="papers per Parquet partition (default: 500)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # Batch boundaries shift as papers are added, so start from a clean tree
+    clear_export(args.out)
+
+    totals = export(get_store(), args.out, batch_size=args.batch_size)
+
+    print("\n📊 Rows: " + ", ".join(f"{name} {count}" for name, count in totals.items()))
+    print(f"✅ Parquet tables saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
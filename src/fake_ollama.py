@@ -0,0 +1,353 @@
+import argparse
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from agents.llm_cache import cache_key
+from agents.schemas import OUTPUT_ITEMS, output_schema
+from config import LLM_CACHE_PATH
+
+
+# A stand-in for the Ollama server, for load tests and runs without a
+# model. It speaks /api/chat (streamed or not) and /api/tags, answers
+# from recorded responses keyed like the LLM response cache, and makes
+# up schema-valid JSON for prompts it has no recording of. Latency,
+# token rate and errors are configurable and seeded, so a run can be
+# repeated:
+#
+#   python src/fake_ollama.py --port 11435 --latency 0.5 --token-rate 40
+#   OLLAMA_HOST=http://127.0.0.1:11435 python src/run_agents.py
+
+DEFAULT_MODELS = ["qwen2.5:3b"]
+
+# Approximate characters per token, for token counts and streaming
+CHARS_PER_TOKEN = 4
+
+# Synthetic values for fields whose name says what they hold
+FIELD_VALUES = {
+    "element": ["Al", "Zn", "Mn", "Ca", "Ce", "Nd", "Y", "Zr"],
+    "alloy": ["AZ31", "AZ61", "ZK60", "Mg-1Zn-0.2Ca", "WE43"],
+    "alloy_name": ["AZ31", "AZ61", "ZK60", "Mg-1Zn-0.2Ca", "WE43"],
+    "step": ["casting", "homogenization", "extrusion", "rolling", "annealing"],
+    "material_form": ["sheet", "bar", "plate", "casting"],
+    "source": ["text", "table"],
+}
+
+# Sentences of prose, not of the JSON examples in the instructions
+SENTENCE_RE = re.compile(r"[^.\n{}\"]{20,300}[.\n]")
+
+
+def load_recordings(path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Responses by cache key, from an LLM response cache database or a
+    JSONL file of {"key": ..., "response": ...} lines.
+    """
+    if path.suffix == ".jsonl":
+        recordings = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    recordings[entry["key"]] = entry["response"]
+        return recordings
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return {
+            key: json.loads(response)
+            for key, response in conn.execute("SELECT key, response FROM responses")
+        }
+    finally:
+        conn.close()
+
+
+def request_key(body: Dict[str, Any]) -> str:
+    """The key agents.llm caches this request under."""
+    extra = {"format": body["format"]} if body.get("format") is not None else {}
+    return cache_key(body["model"], body["messages"], body.get("options"), **extra)
+
+
+def request_schema(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    The structured-output schema, or without one (LLM_STRUCTURED_OUTPUT=0)
+    the agent schema for the output keys the prompt asks for.
+    """
+    if isinstance(body.get("format"), dict):
+        return body["format"]
+    prompt = "\n".join(m.get("content", "") for m in body["messages"])
+    keys = [key for key in OUTPUT_ITEMS if f'"{key}"' in prompt]
+    return output_schema(*keys) if keys else None
+
+
+class Synthesizer:
+    """Schema-valid JSON, seeded per request so replies are repeatable."""
+
+    def __init__(self, rng: random.Random, prompt: str, max_items: int):
+        self.rng = rng
+        self.max_items = max_items
+        # Snippets quote the prompt, as a real model's evidence would
+        self.sentences = [s.strip() for s in SENTENCE_RE.findall(prompt)] or ["synthetic evidence"]
+
+    def value(self, schema: Dict[str, Any], name: str = "") -> Any:
+        if "enum" in schema:
+            return self.rng.choice(schema["enum"])
+
+        types = schema.get("type", "object")
+        if isinstance(types, list):
+            # Nullable fields are null a quarter of the time
+            concrete = [t for t in types if t != "null"]
+            if not concrete or ("null" in types and self.rng.random() < 0.25):
+                return None
+            types = self.rng.choice(concrete)
+
+        if types == "object":
+            props = schema.get("properties", {})
+            return {key: self.value(sub, key) for key, sub in props.items()}
+        if types == "array":
+            count = self.rng.randint(0, self.max_items)
+            return [self.value(schema.get("items", {}), name) for _ in range(count)]
+        if types == "number":
+            return round(self.rng.uniform(0.1, 400.0), 1)
+        if types == "integer":
+            return self.rng.randint(0, 400)
+        if types == "boolean":
+            return self.rng.random() < 0.5
+        if name == "snippet":
+            return self.rng.choice(self.sentences)
+        if name in FIELD_VALUES:
+            return self.rng.choice(FIELD_VALUES[name])
+        return f"synthetic {name or 'value'}"
+
+
+class FakeOllama(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, args, recordings: Dict[str, Dict[str, Any]]):
+        super().__init__(address, Handler)
+        self.args = args
+        self.models = args.models
+        self.recordings = recordings
+        # Generations beyond --parallel wait, like Ollama's request queue
+        self.slots = threading.BoundedSemaphore(args.parallel) if args.parallel > 0 else None
+        self._rng = random.Random(args.seed)
+        self._lock = threading.Lock()
+        self.counts = {"requests": 0, "replayed": 0, "synthetic": 0, "errors": 0, "aborted": 0}
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counts[name] += 1
+
+    def draw(self) -> float:
+        with self._lock:
+            return self._rng.random()
+
+    def content(self, body: Dict[str, Any], key: str) -> Optional[str]:
+        recorded = self.recordings.get(key)
+        if recorded is not None:
+            self.count("replayed")
+            return recorded["message"]["content"]
+        if self.args.miss == "error":
+            return None
+
+        self.count("synthetic")
+        schema = request_schema(body)
+        if schema is None:
+            return "{}"
+        prompt = "\n".join(m.get("content", "") for m in body["messages"])
+        synthesizer = Synthesizer(random.Random(key), prompt, self.args.items)
+        return json.dumps(synthesizer.value(schema), ensure_ascii=False)
+
+    def prompt_delay(self, prompt_tokens: int) -> float:
+        delay = self.args.latency
+        if self.args.prompt_rate > 0:
+            delay += prompt_tokens / self.args.prompt_rate
+        if self.args.jitter > 0:
+            delay *= 1 + self.args.jitter * (2 * self.draw() - 1)
+        return max(0.0, delay)
+
+
+def _tokens(text: str) -> List[str]:
+    return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+class Handler(BaseHTTPRequestHandler):
+    server: FakeOllama
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/api/tags":
+            self.send_json(200, {"models": [
+                {"name": m, "model": m, "size": 0, "digest": "", "details": {}}
+                for m in self.server.models
+            ]})
+        elif path == "/api/version":
+            self.send_json(200, {"version": "0.0.0-fake"})
+        elif path == "/":
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"Ollama is running")
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def do_POST(self):
+        if self.path.split("?")[0] != "/api/chat":
+            self.send_json(404, {"error": "not found"})
+            return
+
+        server = self.server
+        server.count("requests")
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        model = body.get("model", "")
+        if model not in server.models and f"{model}:latest" not in server.models:
+            self.send_json(404, {"error": f"model '{model}' not found"})
+            return
+
+        if server.draw() < server.args.error_rate:
+            server.count("errors")
+            self.send_json(server.args.error_status, {"error": "injected failure"})
+            return
+
+        key = request_key(body)
+        content = server.content(body, key)
+        if content is None:
+            server.count("errors")
+            self.send_json(500, {"error": f"no recorded response for {key[:12]}"})
+            return
+
+        if server.slots is not None:
+            server.slots.acquire()
+        try:
+            self.generate(body, model, content)
+        finally:
+            if server.slots is not None:
+                server.slots.release()
+
+    def generate(self, body: Dict[str, Any], model: str, content: str) -> None:
+        server = self.server
+        start = time.perf_counter()
+
+        prompt_chars = sum(len(m.get("content", "")) for m in body["messages"])
+        prompt_tokens = max(1, prompt_chars // CHARS_PER_TOKEN)
+        time.sleep(server.prompt_delay(prompt_tokens))
+        prompt_eval_s = time.perf_counter() - start
+
+        tokens = _tokens(content)
+        per_token = 1 / server.args.token_rate if server.args.token_rate > 0 else 0.0
+
+        def final(eval_s: float) -> Dict[str, Any]:
+            return {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int((time.perf_counter() - start) * 1e9),
+                "load_duration": 0,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prompt_eval_s * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int(eval_s * 1e9),
+            }
+
+        if not body.get("stream", True):
+            time.sleep(per_token * len(tokens))
+            response = final(time.perf_counter() - start - prompt_eval_s)
+            response["message"] = {"role": "assistant", "content": content}
+            self.send_json(200, response)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for token in tokens:
+                time.sleep(per_token)
+                chunk = {
+                    "model": model,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "message": {"role": "assistant", "content": token},
+                    "done": False,
+                }
+                self.wfile.write(json.dumps(chunk).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            response = final(time.perf_counter() - start - prompt_eval_s)
+            response["message"] = {"role": "assistant", "content": ""}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped generation early
+            server.count("aborted")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Ollama chat API without a model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS, help="models to list and accept")
+    parser.add_argument(
+        "--replay", nargs="*", type=Path, default=None,
+        help=f"recorded responses: LLM cache databases or JSONL files (no paths: {LLM_CACHE_PATH.name})",
+    )
+    parser.add_argument(
+        "--miss", choices=["synthetic", "error"], default="synthetic",
+        help="answer to prompts without a recording (default: synthetic)",
+    )
+    parser.add_argument("--items", type=int, default=3, help="max items per synthetic array (default: 3)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first token (default: 0)")
+    parser.add_argument("--prompt-rate", type=float, default=0.0, help="prompt tokens per second on top of --latency (default: instant)")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="generated tokens per second (default: instant)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative spread of the prompt delay, 0-1 (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail (default: 0)")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures (default: 500)")
+    parser.add_argument("--parallel", type=int, default=4, help="generations at once, like OLLAMA_NUM_PARALLEL; 0 is unbounded (default: 4)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for jitter and failures (default: 0)")
+    return parser.parse_args(argv)
+
+
+def make_server(argv=None) -> FakeOllama:
+    args = parse_args(argv)
+
+    recordings = {}
+    if args.replay is not None:
+        for path in args.replay or [LLM_CACHE_PATH]:
+            recordings.update(load_recordings(path))
+
+    return FakeOllama((args.host, args.port), args, recordings)
+
+
+def main(argv=None):
+    server = make_server(argv)
+    host, port = server.server_address[:2]
+    print(f"🦙 Fake Ollama on http://{host}:{port} ({len(server.recordings)} recorded responses)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.counts, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import multiprocessing as mp
+import time
+import traceback
+from collections import deque
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional
+
+from config import TABLE_PAGES, TABLE_BACKEND, STOP_AT_REFERENCES
+from ingest import cache
+from ingest.pdf_reader import iter_pdf_pages, open_pdf
+from ingest.section_splitter import SECTION_HEADERS, split_sections_with_index
+from ingest.table_classifier import classify_tables
+from ingest.table_extractor import (
+    CAMELOT_FLAVOR, extract_tables_from_pdf, page_captions, tag_table_pages,
+)
+import metrics
+from storage import get_store
+
+
+# "read" is PyMuPDF text extraction and "text" the section splitting and
+# table page selection it is interleaved with in one streaming pass over
+# the pages; "tables" is the table engine (see TABLE_BACKEND)
+STAGES = ["cache", "read", "text", "tables", "write"]
+
+# How often the parent wakes up to check for timed-out workers
+_POLL_INTERVAL_S = 0.5
+
+
+def ingest_params() -> Dict[str, Any]:
+    """Parameters that change ingest outputs; part of the cache key."""
+    return {
+        "section_headers": SECTION_HEADERS,
+        "table_pages": TABLE_PAGES,
+        "table_backend": TABLE_BACKEND,
+        "table_flavor": CAMELOT_FLAVOR,
+        "stop_at_references": STOP_AT_REFERENCES,
+    }
+
+
+def ingest_paper(pdf_path: Path, output_dir: Path, force: bool = False) -> Dict[str, Any]:
+    """
+    Run stages 1-4 for a single PDF and write its artifacts to the store
+    under `output_dir`. Returns a small result dict with per-stage wall
+    time in seconds.
+
+    Papers whose PDF bytes, extractor versions and parameters match the
+    previous ingest manifest are skipped unless `force` is set.
+    """
+    paper_name = pdf_path.stem
+    store = get_store(root=output_dir)
+
+    timings = {}
+    cpu0 = time.process_time()
+
+    t0 = time.perf_counter()
+    params = ingest_params()
+    manifest = cache.load_manifest(store, paper_name)
+    pdf_sha256 = cache.source_sha256(pdf_path, manifest)
+    key = cache.cache_key(pdf_sha256, params)
+    timings["cache"] = time.perf_counter() - t0
+
+    if not force and cache.is_fresh(manifest, key, store, paper_name):
+        return {
+            "paper": paper_name,
+            "status": "cached",
+            "timings": timings,
+            "cpu_s": time.process_time() - cpu0,
+        }
+
+    # The PDF is parsed once: pages are streamed from it for the text
+    # stages and the PyMuPDF table engine reuses the open document.
+    # Only one page's text is held besides the sections.
+    doc = open_pdf(pdf_path)
+    try:
+        t0 = time.perf_counter()
+        num_pages = 0
+        candidate_pages = []
+        captions = {}
+        read_s = 0.0
+
+        def pages():
+            nonlocal num_pages, read_s
+            page_iter = iter(iter_pdf_pages(pdf_path, doc=doc))
+            while True:
+                t = time.perf_counter()
+                page = next(page_iter, None)
+                read_s += time.perf_counter() - t
+                if page is None:
+                    break
+                num_pages += 1
+                captions[page["page"]] = page_captions(page["text"])
+                yield page
+
+        page_stream = pages()
+        if params["table_pages"] == "auto":
+            page_stream = tag_table_pages(page_stream, candidate_pages)
+
+        sections, section_index = split_sections_with_index(
+            {"file_name": pdf_path.name, "pages": page_stream},
+            stop_at_references=params["stop_at_references"],
+        )
+        timings["read"] = read_s
+        timings["text"] = time.perf_counter() - t0 - read_s
+
+        t0 = time.perf_counter()
+        table_pages = params["table_pages"]
+        if table_pages == "auto":
+            table_pages = ",".join(str(p) for p in candidate_pages)
+        tables = classify_tables(extract_tables_from_pdf(pdf_path, pages=table_pages, doc=doc), captions)
+        timings["tables"] = time.perf_counter() - t0
+    finally:
+        doc.close()
+
+    t0 = time.perf_counter()
+    outputs = {
+        "sections": store.write(paper_name, "sections", sections),
+        "tables": store.write(paper_name, "tables", tables),
+        "section_index": store.write(paper_name, "section_index", section_index),
+    }
+
+    cache.write_manifest(pdf_path, store, paper_name, pdf_sha256, key, params, outputs)
+    timings["write"] = time.perf_counter() - t0
+
+    return {
+        "paper": paper_name,
+        "status": "ok",
+        "num_pages": num_pages,
+        "num_tables": len(tables),
+        "table_pages": table_pages,
+        "timings": timings,
+        "cpu_s": time.process_time() - cpu0,
+    }
+
+
+def _worker_main(conn, output_dir: str, force: bool) -> None:
+    # Each worker owns one end of a pipe, so killing a stuck worker
+    # never corrupts a queue shared with the other workers.
+    while True:
+        try:
+            pdf_path = conn.recv()
+        except EOFError:
+            break
+        if pdf_path is None:
+            break
+
+        try:
+            result = ingest_paper(Path(pdf_path), Path(output_dir), force=force)
+        except Exception as e:
+            result = {
+                "paper": Path(pdf_path).stem,
+                "status": "failed",
+                "error": f"{type(e).__name__}: {e}",
+                "traceback": traceback.format_exc(),
+            }
+        conn.send(result)
+
+
+def _spawn_worker(ctx, output_dir: Path, force: bool) -> Dict[str, Any]:
+    parent_conn, child_conn = ctx.Pipe()
+    process = ctx.Process(
+        target=_worker_main,
+        args=(child_conn, str(output_dir), force),
+        daemon=True,
+    )
+    process.start()
+    child_conn.close()
+    return {"process": process, "conn": parent_conn, "task": None, "started": None}
+
+
+def _stop_worker(slot: Dict[str, Any], kill: bool = False) -> None:
+    process = slot["process"]
+    if kill:
+        process.terminate()
+    else:
+        try:
+            slot["conn"].send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    process.join(timeout=5)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    slot["conn"].close()
+
+
+def run_batch(
+    pdfs: List[Path],
+    output_dir: Path,
+    workers: int,
+    timeout: Optional[float] = None,
+    force: bool = False,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Ingest PDFs on a pool of worker processes.
+
+    A paper that raises, crashes its worker or runs longer than `timeout`
+    seconds is recorded as failed and the worker is replaced; the rest of
+    the batch carries on. Unchanged papers come back as "cached".
+    """
+    ctx = mp.get_context()
+    pending = deque(pdfs)
+    results = []
+
+    def finish(slot, result):
+        result.setdefault("source", str(slot["task"]))
+        result["elapsed"] = time.monotonic() - slot["started"]
+        results.append(result)
+        record_ingest(result)
+        slot["task"] = None
+        slot["started"] = None
+        if on_result is not None:
+            on_result(result)
+
+    slots = [_spawn_worker(ctx, output_dir, force) for _ in range(max(1, min(workers, len(pdfs))))]
+
+    try:
+        while pending or any(s["task"] is not None for s in slots):
+            for slot in slots:
+                if slot["task"] is None and pending:
+                    slot["task"] = pending.popleft()
+                    slot["started"] = time.monotonic()
+                    slot["conn"].send(str(slot["task"]))
+
+            busy = [s for s in slots if s["task"] is not None]
+            ready = wait(
+                [s["conn"] for s in busy] + [s["process"].sentinel for s in busy],
+                timeout=_POLL_INTERVAL_S,
+            )
+
+            for i, slot in enumerate(slots):
+                if slot["task"] is None:
+                    continue
+
+                paper = Path(slot["task"]).stem
+
+                if slot["conn"] in ready:
+                    try:
+                        finish(slot, slot["conn"].recv())
+                        continue
+                    except EOFError:
+                        pass
+
+                if slot["conn"] in ready or slot["process"].sentinel in ready:
+                    slot["process"].join()
+                    finish(slot, {
+                        "paper": paper,
+                        "status": "crashed",
+                        "error": f"worker exited with code {slot['process'].exitcode}",
+                    })
+                    _stop_worker(slot, kill=True)
+                    slots[i] = _spawn_worker(ctx, output_dir, force)
+                    continue
+
+                if timeout and time.monotonic() - slot["started"] > timeout:
+                    finish(slot, {
+                        "paper": paper,
+                        "status": "timeout",
+                        "error": f"exceeded {timeout:g}s",
+                    })
+                    _stop_worker(slot, kill=True)
+                    slots[i] = _spawn_worker(ctx, output_dir, force)
+    finally:
+        for slot in slots:
+            _stop_worker(slot, kill=slot["task"] is not None)
+
+    return results
+
+
+def record_ingest(result: Dict[str, Any]) -> None:
+    """Metrics for one ingested paper; workers report timings, the parent records them."""
+    paper = result["paper"]
+    for stage, seconds in result.get("timings", {}).items():
+        metrics.record_stage(f"ingest.{stage}", seconds, paper=paper)
+    metrics.record_stage(
+        "ingest", result["elapsed"], result.get("cpu_s"), paper=paper, status=result["status"],
+        num_pages=result.get("num_pages"), num_tables=result.get("num_tables"),
+    )
+
+
+def summarize_run(results: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    status_counts = {}
+    for r in results:
+        status_counts[r["status"]] = status_counts.get(r["status"], 0) + 1
+
+    stage_totals = {stage: 0.0 for stage in STAGES}
+    for r in results:
+        for stage, seconds in r.get("timings", {}).items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+
+    slowest = sorted(results, key=lambda r: r.get("elapsed", 0.0), reverse=True)[:5]
+
+    return {
+        "papers": len(results),
+        "status": status_counts,
+        "wall_time_s": round(wall_time, 3),
+        "papers_per_s": round(len(results) / wall_time, 3) if wall_time > 0 else 0.0,
+        "stage_wall_time_s": {k: round(v, 3) for k, v in stage_totals.items()},
+        "slowest": [
+            {"paper": r["paper"], "elapsed_s": round(r.get("elapsed", 0.0), 3)}
+            for r in slowest
+        ],
+        "failures": [
+            {"paper": r["paper"], "status": r["status"], "error": r.get("error")}
+            for r in results if r["status"] not in ("ok", "cached")
+        ],
+    }
@@ -0,0 +1,101 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+# Bump when a change to the ingest code alters its outputs for the same PDF
+INGEST_VERSION = "3"
+
+_HASH_CHUNK = 1 << 20
+
+
+@lru_cache(maxsize=None)
+def extractor_versions() -> Dict[str, str]:
+    versions = {"ingest": INGEST_VERSION}
+    for dist in ["PyMuPDF", "camelot-py"]:
+        try:
+            versions[dist] = metadata.version(dist)
+        except metadata.PackageNotFoundError:
+            versions[dist] = "unknown"
+    return versions
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(pdf_sha256: str, params: Dict[str, Any]) -> str:
+    payload = json.dumps(
+        {"pdf": pdf_sha256, "versions": extractor_versions(), "params": params},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_manifest(store, paper_name: str) -> Optional[Dict[str, Any]]:
+    try:
+        return store.read(paper_name, "ingest_manifest")
+    except (OSError, ValueError):
+        return None
+
+
+def source_sha256(pdf_path: Path, manifest: Optional[Dict[str, Any]]) -> str:
+    """
+    Hash of the PDF bytes. If size and mtime match the previous manifest
+    the recorded hash is reused, so unchanged files are never re-read.
+    """
+    stat = pdf_path.stat()
+    if manifest:
+        source = manifest.get("source", {})
+        if source.get("bytes") == stat.st_size and source.get("mtime_ns") == stat.st_mtime_ns:
+            return source["sha256"]
+    return file_sha256(pdf_path)
+
+
+def is_fresh(manifest: Optional[Dict[str, Any]], key: str, store, paper_name: str) -> bool:
+    if not manifest or manifest.get("cache_key") != key:
+        return False
+
+    for kind, output in manifest.get("outputs", {}).items():
+        info = store.info(paper_name, kind)
+        if info is None or info["bytes"] != output["bytes"]:
+            return False
+    return True
+
+
+def write_manifest(
+    pdf_path: Path,
+    store,
+    paper_name: str,
+    pdf_sha256: str,
+    key: str,
+    params: Dict[str, Any],
+    outputs: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """`outputs` maps each artifact kind to the digest returned by store.write."""
+    stat = pdf_path.stat()
+    manifest = {
+        "paper": paper_name,
+        "source": {
+            "path": str(pdf_path.resolve()),
+            "sha256": pdf_sha256,
+            "bytes": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        },
+        "cache_key": key,
+        "versions": extractor_versions(),
+        "params": params,
+        "outputs": outputs,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+    store.write(paper_name, "ingest_manifest", manifest)
+    return manifest
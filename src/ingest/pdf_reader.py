@@ -1,20 +1,54 @@
 import fitz # PyMuPDF
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional
 
 
-def extract_pdf_text_by_page(pdf_path: Path) -> Dict[str, Any]:
-    doc = fitz.open(pdf_path)
+def open_pdf(pdf_path: Path) -> fitz.Document:
+    return fitz.open(pdf_path)
+
+
+def iter_pdf_pages(
+    pdf_path: Path,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+    doc: Optional[fitz.Document] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield {"page", "text"} one page at a time (1-based, inclusive range),
+    so only the current page's text is held in memory. The document is
+    closed when the generator is exhausted or closed early, unless an
+    already open `doc` was passed in; that one stays open for the caller.
+    """
+    owned = doc is None
+    if owned:
+        doc = open_pdf(pdf_path)
+    try:
+        last = doc.page_count if last_page is None else min(last_page, doc.page_count)
+        for i in range(max(first_page, 1) - 1, last):
+            page = doc.load_page(i)
+            yield {
+                "page": i + 1,
+                "text": page.get_text("text").strip()
+            }
+    finally:
+        if owned:
+            doc.close()
 
-    pages = []
-    for i in range(doc.page_count):
-        page = doc.load_page(i)
-        pages.append({
-            "page": i + 1,
-            "text": page.get_text("text").strip()
-        })
 
-    doc.close()
+def stream_pdf_text(
+    pdf_path: Path,
+    first_page: int = 1,
+    last_page: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Like extract_pdf_text_by_page, but "pages" is a lazy iterator."""
+    return {
+        "file_name": pdf_path.name,
+        "pages": iter_pdf_pages(pdf_path, first_page, last_page)
+    }
+
+
+def extract_pdf_text_by_page(pdf_path: Path) -> Dict[str, Any]:
+    pages = list(iter_pdf_pages(pdf_path))
 
     return {
         "file_name": pdf_path.name,
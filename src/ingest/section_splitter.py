@@ -1,5 +1,5 @@
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 
 
 SECTION_HEADERS = [
@@ -14,24 +14,98 @@ SECTION_HEADERS = [
     "references"
 ]
 
+# A header is one of SECTION_HEADERS at the start of a line, optionally
+# numbered ("2.", "3.1", "IV.") and optionally followed by a short title
+# ("Materials and Methods", "Results and discussion").
+HEADER_RE = re.compile(
+    r"^[ \t]*(?:(?:\d+(?:\.\d+)*|[IVX]+)\.?[ \t]+)?"
+    r"(" + "|".join(SECTION_HEADERS) + r")s?\b"
+    r"(?P<rest>[^\n]*)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+MAX_TITLE_EXTRA_WORDS = 4
 
-def split_sections(pdf_text: Dict[str, Any]) -> Dict[str, str]:
-    full_text = "\n".join(p["text"] for p in pdf_text["pages"])
-    lowered = full_text.lower()
 
+def is_header(match: re.Match) -> bool:
+    """Reject body-text lines that merely start with a header word."""
+    if not match.group(1)[0].isupper():
+        return False
+
+    # Abstracts are often run-in: "Abstract The two alloys ..."
+    if match.group(1).lower() == "abstract":
+        return True
+
+    rest = match.group("rest").strip()
+    if not rest or rest[0] in ".:—–-":
+        return True
+    return len(rest.split()) <= MAX_TITLE_EXTRA_WORDS and rest[-1] not in ".,;"
+
+
+def split_sections_with_index(
+    pdf_text: Dict[str, Any],
+    stop_at_references: bool = False,
+) -> Tuple[Dict[str, str], Dict[str, Dict[str, int]]]:
+    """
+    Single pass over the pages. Each section runs from its header to the
+    next header of a different section; the first occurrence of a header
+    wins and nothing after "references" starts a new section.
+
+    "pages" may be a lazy iterator (see pdf_reader.stream_pdf_text). With
+    `stop_at_references`, reading stops at the end of the page where the
+    references start, so the reference list is only partially kept.
+
+    Returns the section texts and a positional index mapping each section
+    to its character span in the "\\n"-joined page text and its page range.
+    """
     sections = {}
-    for i, sec in enumerate(SECTION_HEADERS):
-        start = lowered.find(sec)
-        if start == -1:
-            continue
+    index = {}
+
+    current = None
+    parts = []
+    offset = 0
+    prev_page = None
+
+    def close(end: int, page_end: int):
+        sections[current] = "".join(parts).strip()
+        index[current]["end"] = end
+        index[current]["page_end"] = page_end
+
+    pages = pdf_text["pages"]
+    for page in pages:
+        text = page["text"]
+        pos = 0
+
+        for m in HEADER_RE.finditer(text):
+            key = m.group(1).lower()
+            if key in index or "references" in index or not is_header(m):
+                continue
+
+            if current is not None:
+                parts.append(text[pos:m.start()])
+                close(offset + m.start(), page["page"] if m.start() > 0 else prev_page)
+
+            current = key
+            parts = []
+            pos = m.start(1)
+            index[key] = {"start": offset + pos, "page_start": page["page"]}
+
+        if current is not None:
+            parts.append(text[pos:] + "\n")
+
+        offset += len(text) + 1
+        prev_page = page["page"]
+
+        if stop_at_references and "references" in index:
+            if hasattr(pages, "close"):
+                pages.close()
+            break
+
+    if current is not None:
+        close(max(offset - 1, 0), prev_page)
 
-        end = len(lowered)
-        for next_sec in SECTION_HEADERS[i + 1:]:
-            pos = lowered.find(next_sec, start + 10)
-            if pos != -1:
-                end = pos
-                break
+    return sections, index
 
-        sections[sec] = full_text[start:end].strip()
 
+def split_sections(pdf_text: Dict[str, Any], stop_at_references: bool = False) -> Dict[str, str]:
+    sections, _ = split_sections_with_index(pdf_text, stop_at_references)
     return sections
@@ -0,0 +1,132 @@
+import re
+from typing import Dict, Any, List
+
+from ingest.table_cleaner import MAX_HEADER_ROWS
+
+
+LABELS = ["mechanical", "composition", "processing"]
+
+# Header and caption vocabulary per label. Lower-case words match any
+# case; abbreviations and element symbols are matched case-sensitively so
+# "Y" (yttrium) does not fire on "y" and "SD" not on "sd".
+VOCAB = {
+    "mechanical": {
+        "words": {
+            "mechanical", "yield", "tensile", "compressive", "strength", "ultimate",
+            "elongation", "fracture", "strain", "hardness", "modulus", "ductility",
+            "asymmetry", "grain",
+        },
+        "symbols": {"TYS", "CYS", "YS", "UTS", "SD", "HV", "El", "EL", "RD", "TD", "ED"},
+    },
+    "composition": {
+        "words": {"composition", "compositions", "chemical", "nominal", "balance", "bal", "wt"},
+        "symbols": {
+            "Mg", "Al", "Zn", "Mn", "Ce", "Zr", "Y", "Nd", "Ca", "Si", "Fe", "Cu", "Ni",
+            "Gd", "Li", "Sn", "Ag", "Sr", "La", "Th", "Be",
+        },
+    },
+    "processing": {
+        "words": {
+            "processing", "temperature", "time", "annealing", "annealed", "extrusion",
+            "extruded", "rolling", "rolled", "homogenization", "aging", "ageing", "ratio",
+            "speed", "reduction", "pass", "passes", "treatment", "heat", "cooling",
+        },
+        "symbols": set(),
+    },
+}
+
+# Unit tokens in cells, scored over the whole table
+UNIT_PATTERNS = {
+    "mechanical": re.compile(r"[MG]Pa\b|[μµu]m\b"),
+    "composition": re.compile(r"\b(?:wt|at)\.?\s*%|\bbal\.?(?:ance)?\b", re.IGNORECASE),
+    "processing": re.compile(r"°\s*C\b|\bK\b|\bs\s*[-−]\s*1\b|\bmm\s*/\s*s\b|\b(?:min|h)\b"),
+}
+
+TOKEN_RE = re.compile(r"[A-Za-zμµ]+")
+NUMBER_RE = re.compile(r"^\s*[-+−]?\d+(?:[.,]\d+)?\s*(?:\([^)]*\)|±\s*\S+)?\s*%?\s*$")
+# Cells that stand in for a number: "-", "bal.", "n.d."
+PLACEHOLDER_RE = re.compile(
+    r"^\s*(?:[-–—]|bal\.?|balance|n\.?\s*d\.?|<\s*\d+(?:[.,]\d+)?)\s*$", re.IGNORECASE
+)
+
+HEADER_WEIGHT = 2.0
+CAPTION_WEIGHT = 3.0
+UNIT_WEIGHT = 1.0
+MAX_UNIT_HITS = 5
+
+# Below this share of numeric cells a "table" is usually wrapped prose
+MIN_NUMERIC_DENSITY = 0.25
+MIN_SCORE = 4.0
+
+
+def vocab_hits(text: str, label: str) -> int:
+    vocab = VOCAB[label]
+    hits = 0
+    for token in TOKEN_RE.findall(text):
+        if token in vocab["symbols"] or token.lower() in vocab["words"]:
+            hits += 1
+    return hits
+
+
+def numeric_density(rows: List[List[str]]) -> float:
+    cells = [c for r in rows for c in r if c and c.strip()]
+    if not cells:
+        return 0.0
+    return sum(bool(NUMBER_RE.match(c) or PLACEHOLDER_RE.match(c)) for c in cells) / len(cells)
+
+
+def classify_table(table: Dict[str, Any], captions: List[str] = ()) -> Dict[str, Any]:
+    """
+    Score a Camelot table for each label from its header vocabulary, unit
+    tokens and caption text, and tag it with the best label, or "other"
+    when nothing scores high enough or the table is mostly text.
+    """
+    rows = table["rows"]
+    header_text = " ".join(" ".join(r) for r in rows[:MAX_HEADER_ROWS])
+    body_text = " ".join(" ".join(r) for r in rows)
+    caption_text = " ".join(captions)
+
+    scores = {}
+    for label in LABELS:
+        units = len(UNIT_PATTERNS[label].findall(body_text))
+        scores[label] = round(
+            HEADER_WEIGHT * vocab_hits(header_text, label)
+            + CAPTION_WEIGHT * vocab_hits(caption_text, label)
+            + UNIT_WEIGHT * min(units, MAX_UNIT_HITS),
+            2,
+        )
+
+    density = numeric_density(rows)
+    best = max(LABELS, key=lambda label: scores[label])
+    if density < MIN_NUMERIC_DENSITY or scores[best] < MIN_SCORE:
+        best = "other"
+
+    return {"label": best, "scores": scores, "numeric_density": round(density, 3)}
+
+
+def classify_tables(
+    tables: List[Dict[str, Any]],
+    captions: Dict[int, List[str]] | None = None,
+) -> List[Dict[str, Any]]:
+    """
+    Annotate each table in place with "label", "scores", "numeric_density"
+    and "caption". A page with as many captions as tables pairs them in
+    order; otherwise every caption of the page is used, or those of the
+    page before when its own page has none (captions often sit just above
+    a page break).
+    """
+    captions = captions or {}
+
+    by_page = {}
+    for t in tables:
+        by_page.setdefault(int(t["page"]), []).append(t)
+
+    for page, page_tables in by_page.items():
+        page_captions = captions.get(page) or captions.get(page - 1, [])
+        paired = len(page_captions) == len(page_tables)
+        for k, t in enumerate(page_tables):
+            table_captions = [page_captions[k]] if paired else page_captions
+            t["caption"] = " ".join(table_captions)
+            t.update(classify_table(t, table_captions))
+    return tables
+
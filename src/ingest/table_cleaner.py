@@ -0,0 +1,199 @@
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+import pandas as pd
+
+
+# Header vocabulary, checked in order: the first pattern that matches a
+# header cell names its column. CYS comes before TYS so "compressive
+# yield strength" is not read as a tensile yield strength.
+COLUMN_PATTERNS = [
+    ("alloy", re.compile(r"alloy|material|grade", re.IGNORECASE)),
+    ("variant", re.compile(
+        r"variant|condition|state|direction|orientation|sample|specimen|loading", re.IGNORECASE
+    )),
+    ("avg_grain_size_um", re.compile(r"grain\s*size|\bGS\b|\bd\s*\(\s*[µμu]m", re.IGNORECASE)),
+    ("CYS_MPa", re.compile(r"\bCYS\b|compressive\s+yield", re.IGNORECASE)),
+    ("TYS_MPa", re.compile(
+        r"\bT?YS\b|tensile\s+yield|yield\s+strength|\bR\s*p\s*0[.,]2|σ\s*0[.,]2", re.IGNORECASE
+    )),
+    ("SD", re.compile(r"\bSD\b|strength\s+differential")),
+    ("UTS_MPa", re.compile(r"\bUTS\b|ultimate|tensile\s+strength|\bR\s*m\b", re.IGNORECASE)),
+    ("fracture_strain_pct", re.compile(
+        r"fracture\s+strain|elongation|strain\s+to\s+failure|\bEL\b|\bA\s*\(\s*%", re.IGNORECASE
+    )),
+]
+PROPERTY_FIELDS = [
+    "avg_grain_size_um", "TYS_MPa", "CYS_MPa", "SD", "UTS_MPa", "fracture_strain_pct",
+]
+
+# Bump when clean records change for the same tables, so the pipeline's
+# clean_tables stage re-runs
+CLEANER_VERSION = "2"
+
+# A table is treated as a mechanical-property table when its header names
+# at least this many property columns
+MIN_PROPERTY_COLUMNS = 2
+# Headers are searched for in the first rows only; Camelot's stream mode
+# often splits one header over two rows ("Av. grain" / "size (µm)")
+MAX_HEADER_ROWS = 6
+
+# "15", "22.2 (1.5)", "170 ± 3", "0,95"
+VALUE_STD_RE = (
+    r"^\s*(?P<value>[-+]?\d+(?:[.,]\d+)?)"
+    r"\s*(?:\(\s*±?\s*(?P<std>\d+(?:[.,]\d+)?)\s*\)|±\s*(?P<pm>\d+(?:[.,]\d+)?))?"
+)
+
+
+def field_for(text: str) -> Optional[str]:
+    for field, pattern in COLUMN_PATTERNS:
+        if pattern.search(text):
+            return field
+    return None
+
+
+def map_columns(cells: List[str]) -> Dict[str, int]:
+    """Field name -> column index for a (possibly merged) header row."""
+    columns = {}
+    for j, cell in enumerate(cells):
+        field = field_for(cell)
+        if field is not None and field not in columns:
+            columns[field] = j
+
+    # Row labels are usually the alloy even when the column is unlabelled
+    if "alloy" not in columns and 0 not in columns.values():
+        columns["alloy"] = 0
+    return columns
+
+
+def detect_header(rows: List[List[str]]) -> Optional[Tuple[int, Dict[str, int]]]:
+    """
+    Find the first header row naming at least MIN_PROPERTY_COLUMNS property
+    columns, merging it with the next row when that names more of them.
+    Returns the index of the first data row and the column mapping.
+    """
+    def property_count(columns):
+        return sum(field in PROPERTY_FIELDS for field in columns)
+
+    width = max((len(r) for r in rows), default=0)
+    for i in range(min(len(rows), MAX_HEADER_ROWS)):
+        # The first header row must name a property itself, so a caption
+        # line is never merged into the header below it
+        if property_count(map_columns(rows[i])) == 0:
+            continue
+
+        best = None
+        for span in (1, 2):
+            if i + span > len(rows):
+                break
+            cells = [
+                " ".join(r[j] if j < len(r) else "" for r in rows[i:i + span])
+                for j in range(width)
+            ]
+            columns = map_columns(cells)
+            if best is None or property_count(columns) > property_count(best[1]):
+                best = (i + span, columns)
+
+        if best is not None and property_count(best[1]) >= MIN_PROPERTY_COLUMNS:
+            return best
+    return None
+
+
+def _number(value) -> Optional[float | int]:
+    if pd.isna(value):
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _text(value) -> Optional[str]:
+    if not isinstance(value, str):
+        return None
+    return value or None
+
+
+def clean_tables(tables: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Normalize every mechanical-property table in a paper's `_tables.json`
+    into one record per row. All cells are parsed in a single vectorized
+    pass; "value (std)" and "value ± std" keep the std separately. Each
+    record keeps the table_index, page, caption and raw cells of its row.
+
+    Tables annotated by the table classifier are only cleaned when tagged
+    "mechanical"; older, unannotated tables are all tried.
+    """
+    tables = [t for t in tables if t.get("label", "mechanical") == "mechanical"]
+
+    fields = ["alloy", "variant"] + PROPERTY_FIELDS
+    columns_out = {field: [] for field in fields}
+    table_index = []
+    # Where each row comes from, carried along so records can cite it
+    sources = []
+
+    for t in tables:
+        header = detect_header(t["rows"])
+        if header is None:
+            continue
+
+        start, columns = header
+        for r in t["rows"][start:]:
+            for field in fields:
+                j = columns.get(field)
+                columns_out[field].append(r[j] if j is not None and j < len(r) else "")
+            table_index.append(t["table_index"])
+            sources.append({
+                "page": int(t["page"]) if t.get("page") is not None else None,
+                "caption": t.get("caption"),
+                "cells": list(r),
+            })
+
+    if not table_index:
+        return []
+
+    data = pd.DataFrame(columns_out, dtype=object)
+    data["table_index"] = table_index
+    for field in ["alloy", "variant"]:
+        data[field] = data[field].astype(str).str.strip()
+
+    # An empty alloy cell continues the alloy of the row above
+    data["alloy"] = (
+        data["alloy"].where(data["alloy"] != "").groupby(data["table_index"]).ffill()
+    )
+
+    cells = (
+        data[PROPERTY_FIELDS].stack().astype(str)
+        .str.replace("−", "-", regex=False)
+        .str.extract(VALUE_STD_RE)
+    )
+
+    def to_numeric(column):
+        parsed = pd.to_numeric(column.str.replace(",", ".", regex=False), errors="coerce")
+        return parsed.unstack().reindex(index=data.index, columns=PROPERTY_FIELDS)
+
+    values = to_numeric(cells["value"])
+    std = to_numeric(cells["std"].fillna(cells["pm"]))
+
+    # Footnotes, units rows and repeated headers carry no numbers
+    keep = values.notna().any(axis=1) & data["alloy"].notna()
+
+    rows = zip(
+        data["alloy"][keep].tolist(),
+        data["variant"][keep].tolist(),
+        values[keep].to_numpy().tolist(),
+        std[keep].to_numpy().tolist(),
+        data["table_index"][keep].tolist(),
+        [source for source, k in zip(sources, keep.tolist()) if k],
+    )
+
+    records = []
+    for alloy, variant, row_values, row_std, index, source in rows:
+        record = {"alloy": _text(alloy), "variant": _text(variant)}
+        record.update(zip(PROPERTY_FIELDS, map(_number, row_values)))
+        record["std"] = {
+            field: _number(v) for field, v in zip(PROPERTY_FIELDS, row_std) if not pd.isna(v)
+        }
+        record["table_index"] = int(index)
+        record.update(source)
+        records.append(record)
+
+    return records
@@ -1,18 +1,300 @@
+import bisect
+import importlib.util
+import re
 from pathlib import Path
-from typing import List, Dict, Any
-import pandas as pd
-import camelot
+from typing import List, Dict, Any, Iterable, Iterator, Optional
 
+from config import TABLE_BACKEND
+from ingest.pdf_reader import open_pdf
 
-def extract_tables_from_pdf(pdf_path: Path, pages: str = "all") -> List[Dict[str, Any]]:
-    tables = camelot.read_pdf(str(pdf_path), pages=pages, flavor="stream")
 
-    results = []
-    for i, t in enumerate(tables):
-        results.append({
-            "table_index": i,
-            "page": t.page,
-            "rows": t.df.values.tolist()
-        })
+CAMELOT_FLAVOR = "stream"
+CAMELOT_AVAILABLE = importlib.util.find_spec("camelot") is not None
+
+TABLE_BACKENDS = ["pymupdf", "camelot", "auto"]
+# Smaller "tables" are stray aligned text
+MIN_TABLE_ROWS = 2
+MIN_TABLE_COLS = 2
+# Tables laid out by alignment only (the usual journal style, with a few
+# horizontal rules): a horizontal gap wider than this many line heights
+# separates two cells, a vertical one wider than MAX_ROW_GAP ends the table
+COLUMN_GAP = 0.8
+MAX_ROW_GAP = 2.5
+# Two-column body text also splits into "cells"; table cells are short
+MAX_MEDIAN_CELL_CHARS = 30
+
+TABLE_CAPTION_RE = re.compile(r"^\s*Tab(?:le|\.)\s*(\d+|[IVX]+)\b", re.IGNORECASE | re.MULTILINE)
+NUMBER_RE = re.compile(r"[-+]?\d+(?:[.,]\d+)?")
+
+# A run of this many consecutive numeric lines is treated as a table body
+MIN_NUMERIC_RUN = 6
+# Captions this close to the bottom of a page usually belong to a table
+# that starts on the next page
+CAPTION_TAIL_LINES = 5
+
+
+def is_numeric_line(line: str) -> bool:
+    """
+    PyMuPDF emits table cells as short lines ("15 (1)", "170") or as rows
+    of several numbers; body text lines are long and mostly letters.
+    """
+    line = line.strip()
+    if not line:
+        return False
+
+    numbers = NUMBER_RE.findall(line)
+    if not numbers:
+        return False
+
+    letters = sum(c.isalpha() for c in line)
+    if len(line) <= 20:
+        return letters <= len(line) // 2
+    return len(numbers) >= 3 and letters <= len(line) // 3
+
+
+def page_table_hints(text: str) -> Dict[str, bool]:
+    lines = text.splitlines()
+
+    has_caption = False
+    caption_at_bottom = False
+    for m in TABLE_CAPTION_RE.finditer(text):
+        has_caption = True
+        line_no = text.count("\n", 0, m.start())
+        if line_no >= len(lines) - CAPTION_TAIL_LINES:
+            caption_at_bottom = True
+
+    run = 0
+    has_numeric_block = False
+    for line in lines:
+        run = run + 1 if is_numeric_line(line) else 0
+        if run >= MIN_NUMERIC_RUN:
+            has_numeric_block = True
+            break
+
+    return {
+        "caption": has_caption,
+        "caption_at_bottom": caption_at_bottom,
+        "numeric_block": has_numeric_block,
+    }
+
+
+def page_captions(text: str) -> List[str]:
+    """The "Table N ..." caption lines on a page."""
+    captions = []
+    for m in TABLE_CAPTION_RE.finditer(text):
+        end = text.find("\n", m.end())
+        captions.append(text[m.start():end if end != -1 else len(text)].strip())
+    return captions
+
+
+def tag_table_pages(
+    pages: Iterable[Dict[str, Any]],
+    selected: List[int],
+) -> Iterator[Dict[str, Any]]:
+    """
+    Pass pages through unchanged while appending the numbers of pages
+    worth handing to the table engine to `selected`, so table pages can be picked
+    during the same streaming pass that splits sections.
+    """
+    carry_over = False
+    for p in pages:
+        hints = page_table_hints(p["text"])
+        if hints["caption"] or hints["numeric_block"] or carry_over:
+            selected.append(p["page"])
+        carry_over = hints["caption_at_bottom"]
+        yield p
+
+
+def select_table_pages(pages: Iterable[Dict[str, Any]]) -> List[int]:
+    """
+    Cheap pre-pass over the PyMuPDF page texts that picks the pages worth
+    handing to the table engine: pages with a "Table N" caption or a block of
+    column-aligned numbers, plus the page after a caption that sits at
+    the very bottom of its page.
+    """
+    selected = []
+    for _ in tag_table_pages(pages, selected):
+        pass
+    return selected
+
+
+def parse_pages(pages: str, page_count: int) -> List[int]:
+    """Camelot-style page spec ("all", "1,3,4-6") as 1-based page numbers."""
+    if pages == "all":
+        return list(range(1, page_count + 1))
+
+    numbers = []
+    for part in pages.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            end = page_count if end == "end" else int(end)
+            numbers.extend(range(int(start), min(end, page_count) + 1))
+        elif int(part) <= page_count:
+            numbers.append(int(part))
+    return sorted(set(numbers))
+
+
+def _clean_rows(rows: List[List[Optional[str]]]) -> List[List[str]]:
+    rows = [[" ".join((cell or "").split()) for cell in row] for row in rows]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return []
 
+    # Drop columns that are empty in every row
+    keep = [j for j in range(max(len(r) for r in rows)) if any(j < len(r) and r[j] for r in rows)]
+    return [[r[j] if j < len(r) else "" for j in keep] for r in rows]
+
+
+def _is_table(rows: List[List[str]]) -> bool:
+    if len(rows) < MIN_TABLE_ROWS or max(len(r) for r in rows) < MIN_TABLE_COLS:
+        return False
+    lengths = sorted(len(c) for r in rows for c in r if c)
+    return bool(lengths) and lengths[len(lengths) // 2] <= MAX_MEDIAN_CELL_CHARS
+
+
+def _visual_lines(words) -> List[Dict[str, Any]]:
+    """PyMuPDF words ((x0, y0, x1, y1, text, ...)) grouped into lines by baseline."""
+    lines = []
+    for w in sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0])):
+        y = (w[1] + w[3]) / 2
+        height = w[3] - w[1]
+        if lines and abs(lines[-1]["y"] - y) <= height / 2:
+            lines[-1]["words"].append(w)
+        else:
+            lines.append({"y": y, "height": height, "words": [w]})
+
+    for line in lines:
+        # Cells: runs of words separated by less than a column gap
+        cells = []
+        for w in sorted(line["words"], key=lambda w: w[0]):
+            if cells and w[0] - cells[-1][1] <= COLUMN_GAP * line["height"]:
+                cells[-1][1] = w[2]
+                cells[-1][2] += " " + w[4]
+            else:
+                cells.append([w[0], w[2], w[4]])
+        line["cells"] = cells
+    return lines
+
+
+def aligned_text_tables(page) -> List[List[List[str]]]:
+    """
+    Tables found from text geometry alone: runs of consecutive lines that
+    split into two or more cells. Columns come from the x-extents of the
+    cells in the lines with the most cells, so a header spanning several
+    columns does not merge them; every cell goes to the column its
+    centre falls in.
+    """
+    lines = _visual_lines(page.get_text("words"))
+
+    regions, current = [], []
+    for line in lines:
+        gap = line["y"] - current[-1]["y"] if current else 0
+        if len(line["cells"]) >= MIN_TABLE_COLS and gap <= MAX_ROW_GAP * line["height"]:
+            current.append(line)
+            continue
+        if len(current) >= MIN_TABLE_ROWS:
+            regions.append(current)
+        current = [line] if len(line["cells"]) >= MIN_TABLE_COLS else []
+    if len(current) >= MIN_TABLE_ROWS:
+        regions.append(current)
+
+    tables = []
+    for region in regions:
+        widest = max(len(line["cells"]) for line in region)
+        spans = sorted(
+            (c[0], c[1]) for line in region if len(line["cells"]) == widest for c in line["cells"]
+        )
+        columns = []
+        for x0, x1 in spans:
+            if columns and x0 <= columns[-1][1]:
+                columns[-1][1] = max(columns[-1][1], x1)
+            else:
+                columns.append([x0, x1])
+        bounds = [(a[1] + b[0]) / 2 for a, b in zip(columns, columns[1:])]
+
+        rows = []
+        for line in region:
+            row = [""] * len(columns)
+            for x0, x1, text in line["cells"]:
+                j = bisect.bisect(bounds, (x0 + x1) / 2)
+                row[j] = f"{row[j]} {text}".strip()
+            rows.append(row)
+
+        rows = _clean_rows(rows)
+        if _is_table(rows):
+            tables.append(rows)
+    return tables
+
+
+def page_tables_pymupdf(page) -> List[List[List[str]]]:
+    """
+    Rows of each table on a page: ruled tables through PyMuPDF's
+    find_tables, otherwise tables laid out by text alignment.
+    """
+    tables = [_clean_rows(t.extract()) for t in page.find_tables(strategy="lines").tables]
+    tables = [rows for rows in tables if rows and _is_table(rows)]
+    return tables or aligned_text_tables(page)
+
+
+def extract_tables_pymupdf(doc, page_numbers: Iterable[int]) -> List[Dict[str, Any]]:
+    """Tables on the given 1-based pages of an open PyMuPDF document."""
+    results = []
+    for number in page_numbers:
+        for rows in page_tables_pymupdf(doc.load_page(number - 1)):
+            results.append({"page": number, "rows": rows, "engine": "pymupdf"})
     return results
+
+
+def extract_tables_camelot(pdf_path: Path, pages: str = "all") -> List[Dict[str, Any]]:
+    # Camelot pulls in OpenCV and pandas; only import it when it is used
+    import camelot
+
+    tables = camelot.read_pdf(str(pdf_path), pages=pages, flavor=CAMELOT_FLAVOR)
+    return [
+        {"page": int(t.page), "rows": t.df.values.tolist(), "engine": "camelot"}
+        for t in tables
+    ]
+
+
+def extract_tables_from_pdf(
+    pdf_path: Path,
+    pages: str = "all",
+    backend: str = TABLE_BACKEND,
+    doc=None,
+) -> List[Dict[str, Any]]:
+    """
+    Tables as {"table_index", "page", "rows", "engine"} with the selected
+    backend: "pymupdf" reads them from the document's own text geometry
+    (reusing `doc` if the caller already has the PDF open), "camelot"
+    re-parses the PDF with Camelot, and "auto" uses PyMuPDF and falls
+    back to Camelot only for the pages where it found nothing.
+    """
+    if not pages:
+        return []
+    if backend not in TABLE_BACKENDS:
+        raise ValueError(f"Unknown table backend: {backend!r}")
+
+    if backend == "camelot":
+        results = extract_tables_camelot(pdf_path, pages)
+    else:
+        owned = doc is None
+        if owned:
+            doc = open_pdf(pdf_path)
+        try:
+            page_numbers = parse_pages(pages, doc.page_count)
+            results = extract_tables_pymupdf(doc, page_numbers)
+        finally:
+            if owned:
+                doc.close()
+
+        if backend == "auto":
+            found = {t["page"] for t in results}
+            missing = [p for p in page_numbers if p not in found]
+            if missing and CAMELOT_AVAILABLE:
+                results += extract_tables_camelot(pdf_path, ",".join(map(str, missing)))
+            results.sort(key=lambda t: t["page"])
+
+    return [{"table_index": i, **t} for i, t in enumerate(results)]
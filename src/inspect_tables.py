@@ -1,32 +1,55 @@
-import json
-from pathlib import Path
+import argparse
+
+from ingest.table_classifier import classify_tables
+from storage import get_store
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Preview the extracted tables of a paper")
+    parser.add_argument("paper", help="paper name (PDF file name without .pdf)")
+    parser.add_argument(
+        "--label", choices=["mechanical", "composition", "processing", "other"],
+        help="only show tables with this label",
+    )
+    parser.add_argument("--rows", type=int, default=6, help="rows to preview per table (default: 6)")
+    return parser.parse_args()
 
-TABLES_JSON = Path("output/Steglich_Tian_Bohlen_Kuwabara_ExpMech2014_tables.json")
 
 def main():
-    if not TABLES_JSON.exists():
-        print(f"❌ Tables JSON not found: {TABLES_JSON}")
+    args = parse_args()
+    store = get_store()
+
+    if not store.exists(args.paper, "tables"):
+        print(f"❌ Tables not found for: {args.paper}")
         return
 
-    with open(TABLES_JSON, "r", encoding="utf-8") as f:
-        tables = json.load(f)
+    tables = store.read(args.paper, "tables")
+
+    # Tables ingested before classification was added carry no label
+    unlabelled = [t for t in tables if "label" not in t]
+    if unlabelled:
+        classify_tables(unlabelled)
 
     print(f"✅ Total tables found: {len(tables)}\n")
 
     for t in tables:
-        idx = t["table_index"]
-        page = t["page"]
-        rows = t["rows"]
+        if args.label and t["label"] != args.label:
+            continue
 
-        # Print only first few rows to preview
-        preview_rows = rows[:6]
+        scores = ", ".join(f"{k} {v}" for k, v in t["scores"].items())
 
         print("=" * 80)
-        print(f"📌 Table Index: {idx} | Page: {page}")
-        print("Preview (first 6 rows):")
-
-        for r in preview_rows:
+        print(
+            f"📌 Table Index: {t['table_index']} | Page: {t['page']} | Engine: {t.get('engine', 'camelot')} "
+            f"| Label: {t['label']} ({scores})"
+        )
+        if t.get("caption"):
+            print(f"Caption: {t['caption']}")
+        print(f"Preview (first {args.rows} rows):")
+
+        for r in t["rows"][:args.rows]:
             print(r)
 
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
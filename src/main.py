@@ -1,38 +1,76 @@
+import argparse
 import json
-from pathlib import Path
+import time
+from datetime import datetime
 from tqdm import tqdm
 
-from config import RAW_PDF_DIR, OUTPUT_DIR
-from ingest.pdf_reader import extract_pdf_text_by_page
-from ingest.section_splitter import split_sections
-from ingest.table_extractor import extract_tables_from_pdf
+from config import RAW_PDF_DIR, OUTPUT_DIR, RUNS_DIR, INGEST_WORKERS, INGEST_TIMEOUT_S
+from ingest.batch import run_batch, summarize_run
+import metrics
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline A: PDF ingestion")
+    parser.add_argument(
+        "--workers", type=int, default=INGEST_WORKERS,
+        help=f"number of worker processes (default: {INGEST_WORKERS})",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=INGEST_TIMEOUT_S,
+        help=f"per-paper timeout in seconds, 0 to disable (default: {INGEST_TIMEOUT_S})",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="re-extract every PDF even if its cached outputs are up to date",
+    )
+    return parser.parse_args()
 
 
 def main():
-    pdfs = list(RAW_PDF_DIR.glob("*.pdf"))
+    args = parse_args()
+
+    pdfs = sorted(RAW_PDF_DIR.glob("*.pdf"))
 
     if not pdfs:
         print("❌ No PDFs found in data/raw_pdfs")
         return
 
-    for pdf_path in tqdm(pdfs, desc="Processing PDFs"):
-        paper_name = pdf_path.stem
-        paper_out = OUTPUT_DIR / paper_name
-        paper_out.mkdir(parents=True, exist_ok=True)
+    print(f"📄 Processing {len(pdfs)} PDFs with {args.workers} workers")
+    metrics.start_http_server()
+
+    progress = tqdm(total=len(pdfs), desc="Processing PDFs")
 
-        print(f"\n📄 Processing {paper_name}")
+    def on_result(result):
+        if result["status"] == "ok":
+            tqdm.write(f"✅ Saved outputs for {result['paper']}")
+        elif result["status"] == "cached":
+            tqdm.write(f"♻️  Unchanged, skipped {result['paper']}")
+        else:
+            tqdm.write(f"❌ {result['paper']}: {result['status']} ({result.get('error')})")
+        progress.update(1)
 
-        pdf_text = extract_pdf_text_by_page(pdf_path)
-        sections = split_sections(pdf_text)
-        tables = extract_tables_from_pdf(pdf_path)
+    start = time.perf_counter()
+    results = run_batch(
+        pdfs,
+        OUTPUT_DIR,
+        workers=args.workers,
+        timeout=args.timeout or None,
+        force=args.force,
+        on_result=on_result,
+    )
+    progress.close()
 
-        with open(paper_out / f"{paper_name}_sections.json", "w", encoding="utf-8") as f:
-            json.dump(sections, f, indent=2, ensure_ascii=False)
+    summary = summarize_run(results, time.perf_counter() - start)
 
-        with open(paper_out / f"{paper_name}_tables.json", "w", encoding="utf-8") as f:
-            json.dump(tables, f, indent=2, ensure_ascii=False)
+    summary_path = RUNS_DIR / f"ingest_{datetime.now():%Y%m%d_%H%M%S}.json"
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
 
-        print(f"✅ Saved outputs to {paper_out}")
+    print(
+        f"\n📊 {summary['papers']} papers in {summary['wall_time_s']}s "
+        f"({summary['papers_per_s']} papers/s) — {summary['status']}"
+    )
+    print(f"⏱️  Stage wall time: {summary['stage_wall_time_s']}")
+    print(f"✅ Run summary saved to {summary_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,337 @@
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from config import RUNS_DIR, METRICS_LOG, METRICS_PORT
+
+
+# Lightweight instrumentation: stage timings and LLM token counts are
+# aggregated in-process (exposed in Prometheus text format when
+# METRICS_PORT is set) and every event is appended to a JSONL run log in
+# RUNS_DIR. Per-paper detail only goes to the log, so the Prometheus
+# series stay low-cardinality.
+
+# Seconds; covers a cached section read up to a slow paper's LLM calls
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+METRICS = {
+    "matextract_stage_seconds": ("histogram", "Wall time per stage run"),
+    "matextract_stage_cpu_seconds_total": ("counter", "CPU time spent in stage runs"),
+    "matextract_stage_runs_total": ("counter", "Stage runs by outcome"),
+    "matextract_llm_requests_total": ("counter", "LLM requests, including response cache hits"),
+    "matextract_llm_request_seconds": ("histogram", "Wall time per LLM request (excluding cache hits)"),
+    "matextract_llm_prompt_tokens_total": ("counter", "Prompt tokens evaluated by Ollama"),
+    "matextract_llm_completion_tokens_total": ("counter", "Completion tokens generated by Ollama"),
+    "matextract_llm_prompt_eval_seconds_total": ("counter", "Ollama time spent on prompt evaluation"),
+    "matextract_llm_eval_seconds_total": ("counter", "Ollama time spent generating"),
+    "matextract_llm_load_seconds_total": ("counter", "Ollama time spent loading models"),
+    "matextract_llm_host_requests_total": ("counter", "Requests per Ollama host by outcome"),
+    "matextract_llm_host_ejections_total": ("counter", "Times an Ollama host was taken out of rotation"),
+}
+
+# Paper and stage of the code currently running; LLM calls are
+# attributed to them. Set by timed() and carried per thread.
+_context: ContextVar[Dict[str, Optional[str]]] = ContextVar("metrics_context", default={})
+
+
+class Registry:
+    """Counters and histograms keyed by metric name and label values."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], List[float]] = {}
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1.0) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, labels: Dict[str, str], value: float) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            h = self._histograms.setdefault(key, [0.0] * (len(BUCKETS) + 2))
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: list(v) for k, v in self._histograms.items()}
+
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            series = histograms if kind == "histogram" else counters
+            keys = sorted(k for k in series if k[0] == name)
+            if not keys:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key in keys:
+                labels = key[1]
+                if kind == "counter":
+                    lines.append(f"{name}{fmt(labels)} {series[key]:g}")
+                    continue
+                h = series[key]
+                for bound, count in zip(BUCKETS, h):
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', f'{bound:g}')])} {count:g}")
+                lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {h[-1]:g}")
+                lines.append(f"{name}_sum{fmt(labels)} {h[-2]:g}")
+                lines.append(f"{name}_count{fmt(labels)} {h[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RunLog:
+    """Append-only JSONL event log, one file per process run, opened on first use."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path: Optional[Path] = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def write(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self.path = self.directory / f"metrics_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}.jsonl"
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line)
+
+
+registry = Registry()
+run_log = RunLog(RUNS_DIR)
+
+
+def emit(event: Dict[str, Any]) -> None:
+    if METRICS_LOG:
+        run_log.write({"ts": round(time.time(), 3), **event})
+
+
+def record_stage(
+    stage: str,
+    wall_s: float,
+    cpu_s: Optional[float] = None,
+    paper: Optional[str] = None,
+    status: str = "ok",
+    **fields,
+) -> None:
+    registry.observe("matextract_stage_seconds", {"stage": stage}, wall_s)
+    registry.inc("matextract_stage_runs_total", {"stage": stage, "status": status})
+    if cpu_s is not None:
+        registry.inc("matextract_stage_cpu_seconds_total", {"stage": stage}, cpu_s)
+    emit({
+        "type": "stage",
+        "paper": paper,
+        "stage": stage,
+        "status": status,
+        "wall_s": round(wall_s, 4),
+        "cpu_s": round(cpu_s, 4) if cpu_s is not None else None,
+        **fields,
+    })
+
+
+@contextmanager
+def timed(stage: str, paper: Optional[str] = None, **fields):
+    """
+    Time the block as one run of `stage` for `paper`: wall time, CPU time
+    of the calling thread and outcome ("failed" if it raises). LLM calls
+    made inside are attributed to the same paper and stage.
+    """
+    token = _context.set({"paper": paper, "stage": stage})
+    wall0, cpu0 = time.perf_counter(), time.thread_time()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "failed"
+        raise
+    finally:
+        _context.reset(token)
+        record_stage(
+            stage, time.perf_counter() - wall0, time.thread_time() - cpu0,
+            paper=paper, status=status, **fields,
+        )
+
+
+def _field(response, name: str):
+    if response is None:
+        return None
+    if hasattr(response, "get"):
+        return response.get(name)
+    return getattr(response, name, None)
+
+
+def record_llm(model: str, response, wall_s: float, cached: bool = False, **fields) -> None:
+    """
+    Token counts and durations of one Ollama response (the final chunk
+    when streaming). Ollama reports durations in nanoseconds.
+    """
+    context = _context.get()
+    stage = context.get("stage") or "unknown"
+    labels = {"model": model, "stage": stage}
+
+    registry.inc("matextract_llm_requests_total", {**labels, "cached": str(cached).lower()})
+    event = {
+        "type": "llm",
+        "paper": context.get("paper"),
+        "stage": stage,
+        "model": model,
+        "cached": cached,
+        "wall_s": round(wall_s, 4),
+        **fields,
+    }
+
+    if not cached:
+        registry.observe("matextract_llm_request_seconds", labels, wall_s)
+
+        prompt_tokens = _field(response, "prompt_eval_count")
+        completion_tokens = _field(response, "eval_count")
+        eval_s = (_field(response, "eval_duration") or 0) / 1e9
+        prompt_eval_s = (_field(response, "prompt_eval_duration") or 0) / 1e9
+        load_s = (_field(response, "load_duration") or 0) / 1e9
+
+        if prompt_tokens:
+            registry.inc("matextract_llm_prompt_tokens_total", labels, prompt_tokens)
+        if completion_tokens:
+            registry.inc("matextract_llm_completion_tokens_total", labels, completion_tokens)
+        registry.inc("matextract_llm_prompt_eval_seconds_total", labels, prompt_eval_s)
+        registry.inc("matextract_llm_eval_seconds_total", labels, eval_s)
+        registry.inc("matextract_llm_load_seconds_total", labels, load_s)
+
+        event.update({
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "prompt_eval_s": round(prompt_eval_s, 4),
+            "eval_s": round(eval_s, 4),
+            "load_s": round(load_s, 4),
+            "tokens_per_s": round(completion_tokens / eval_s, 2) if completion_tokens and eval_s else None,
+            "prompt_tokens_per_s": round(prompt_tokens / prompt_eval_s, 2) if prompt_tokens and prompt_eval_s else None,
+        })
+
+    emit(event)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_http_server(port: int = METRICS_PORT, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics for Prometheus on a daemon thread; port 0 disables it."""
+    global _server
+    if not port or _server is not None:
+        return _server
+    _server = ThreadingHTTPServer((host, port), _Handler)
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return _server
+
+
+def percentile(values: List[float], q: float) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(q) - 1]
+
+
+def summarize_log(path: Path, budget_s: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Per-stage wall time percentiles, per-model token throughput and, with
+    `budget_s`, the papers whose total stage time exceeds it.
+    """
+    stages, models, papers = {}, {}, {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            if event["type"] == "stage":
+                stages.setdefault(event["stage"], []).append(event["wall_s"])
+                if event.get("paper") and "." not in event["stage"]:
+                    papers[event["paper"]] = papers.get(event["paper"], 0.0) + event["wall_s"]
+            elif event["type"] == "llm" and not event["cached"]:
+                m = models.setdefault(event["model"], {
+                    "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "eval_s": 0.0,
+                })
+                m["requests"] += 1
+                m["prompt_tokens"] += event.get("prompt_tokens") or 0
+                m["completion_tokens"] += event.get("completion_tokens") or 0
+                m["eval_s"] += event.get("eval_s") or 0.0
+
+    for m in models.values():
+        m["tokens_per_s"] = round(m["completion_tokens"] / m["eval_s"], 2) if m["eval_s"] else None
+        m["eval_s"] = round(m["eval_s"], 3)
+
+    summary = {
+        "stages": {
+            name: {
+                "runs": len(values),
+                "total_s": round(sum(values), 3),
+                "p50_s": round(percentile(sorted(values), 50), 3),
+                "p95_s": round(percentile(sorted(values), 95), 3),
+                "max_s": round(max(values), 3),
+            }
+            for name, values in stages.items()
+        },
+        "models": models,
+    }
+    if budget_s is not None:
+        summary["over_budget"] = sorted(
+            ({"paper": p, "wall_s": round(s, 3)} for p, s in papers.items() if s > budget_s),
+            key=lambda r: r["wall_s"], reverse=True,
+        )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a metrics run log")
+    parser.add_argument("log", type=Path, nargs="?", help="metrics_*.jsonl (default: the latest in runs/)")
+    parser.add_argument("--budget", type=float, help="list papers whose stages took longer than this many seconds")
+    args = parser.parse_args()
+
+    path = args.log or max(RUNS_DIR.glob("metrics_*.jsonl"), default=None, key=lambda p: p.stat().st_mtime)
+    if path is None:
+        print("❌ No metrics logs in runs/")
+        return
+    print(json.dumps(summarize_log(path, args.budget), indent=2))
+
+
+if __name__ == "__main__":
+    main()
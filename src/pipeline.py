@@ -0,0 +1,614 @@
+import argparse
+import hashlib
+import inspect
+import json
+import queue
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Callable, Iterable, Optional
+
+from agents import (
+    composition_agent, mechanical_properties_agent, microstructure_agent, processing_agent,
+)
+from agents.llm import aborted
+from agents.ollama_pool import pool_capacity
+from agents.scheduler import AGENTS
+from agents.triage import TRIAGE_VERSION, routed_sections, skipped_output, triage_paper
+from config import (
+    RAW_PDF_DIR, OUTPUT_DIR, RUNS_DIR, INGEST_WORKERS, INGEST_TIMEOUT_S,
+    RULES_FAST_PATH, LLM_STRUCTURED_OUTPUT, TRIAGE,
+)
+from ingest import cache
+from ingest.batch import ingest_params, run_batch
+from ingest.table_cleaner import CLEANER_VERSION, clean_tables
+import metrics
+from run_pipeline_b import validate_paper
+from storage import KINDS, get_store
+
+
+# The pipeline as a graph of per-paper stages. A stage reads the artifact
+# kinds in "inputs" and returns the ones in "outputs" it has something
+# for; the runner loads the inputs, writes the outputs and records what
+# it ran on in the paper's "pipeline_state" artifact. A stage whose
+# inputs and outputs are unchanged since its last successful run is not
+# run again, so an interrupted run resumes where it stopped.
+#
+# "pool" is where a stage runs: "ingest" on ingest.batch's worker
+# processes (with its timeouts), "llm" on the threads that keep every
+# Ollama host's OLLAMA_NUM_PARALLEL requests in flight, "local" on one
+# thread.
+# "params" returns the settings that change a stage's outputs; they are
+# part of its fingerprint.
+
+# Inputs that come from outside the store
+SOURCES = {
+    "pdf": lambda paper: _file_info(RAW_PDF_DIR / f"{paper}.pdf"),
+}
+
+POOLS = ["ingest", "llm", "local"]
+
+AGENT_MODULES = {
+    "mechanical": mechanical_properties_agent,
+    "composition": composition_agent,
+    "processing": processing_agent,
+    "microstructure": microstructure_agent,
+}
+
+
+def _file_info(path) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return {"bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _agent_stage(name: str) -> Dict[str, Any]:
+    spec = AGENTS[name]
+    run_agent = spec["run"]
+
+    def run(store, paper: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        sections = routed_sections(inputs.get("triage"), name, inputs["sections"])
+        if sections is None:
+            return {spec["output"]: skipped_output(name, inputs["sections"], inputs.get("table1_clean"))}
+        return {spec["output"]: run_agent(store, paper, sections)}
+
+    return {
+        # With triage off the decision is not read, so not waited for
+        "inputs": spec["requires"] + (["triage"] if TRIAGE else []),
+        "outputs": [spec["output"]],
+        "pool": "llm",
+        "run": run,
+        "agent_run": run_agent,
+        "params": lambda: {
+            "model": AGENT_MODULES[name].MODEL_NAME,
+            "rules_fast_path": RULES_FAST_PATH,
+            "structured_output": LLM_STRUCTURED_OUTPUT,
+            "triage": TRIAGE,
+        },
+    }
+
+
+def _clean_tables(store, paper: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    # Written even when empty, so a paper whose mechanical table is gone
+    # does not keep the records cleaned from an earlier extraction
+    return {"table1_clean": clean_tables(inputs["tables"])}
+
+
+def _triage(store, paper: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    return {"triage": triage_paper(inputs["sections"], inputs["tables"])}
+
+
+def _validate(store, paper: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    return {"validated": validate_paper(store, paper, inputs["microstructure_agent"])}
+
+
+STAGES = {
+    "ingest": {
+        "inputs": ["pdf"],
+        "outputs": ["sections", "section_index", "tables", "ingest_manifest"],
+        "pool": "ingest",
+        # Runs through ingest.batch.run_batch, see run_pipeline
+        "run": None,
+        "params": lambda: {"params": ingest_params(), "versions": cache.extractor_versions()},
+    },
+    "clean_tables": {
+        "inputs": ["tables"],
+        "outputs": ["table1_clean"],
+        "pool": "local",
+        "run": _clean_tables,
+        "params": lambda: {"version": CLEANER_VERSION},
+    },
+    "triage": {
+        "inputs": ["sections", "tables"],
+        "outputs": ["triage"],
+        "pool": "local",
+        "run": _triage,
+        "params": lambda: {"version": TRIAGE_VERSION},
+    },
+    "mechanical": _agent_stage("mechanical"),
+    "composition": _agent_stage("composition"),
+    "processing": _agent_stage("processing"),
+    "microstructure": _agent_stage("microstructure"),
+    "validate": {
+        "inputs": ["microstructure_agent"],
+        "outputs": ["validated"],
+        "pool": "local",
+        "run": _validate,
+        "params": lambda: {},
+    },
+}
+
+
+def _check_call(name: str, run: Callable, params: List[str]) -> None:
+    try:
+        inspect.signature(run).bind(*params)
+    except TypeError as e:
+        raise TypeError(
+            f"Stage {name!r}: {run.__qualname__}{inspect.signature(run)} "
+            f"cannot be called as ({', '.join(params)}): {e}"
+        ) from None
+
+
+def check_stages(stages: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    Validate the stage graph before anything runs and return the stages
+    in dependency order. Every input must be a source or the output of
+    exactly one stage, outputs must be known artifact kinds, the graph
+    must be acyclic and every stage must be callable the way the runner
+    (and, for agents, the scheduler) calls it.
+    """
+    producers = {}
+    for name, spec in stages.items():
+        if spec["pool"] not in POOLS:
+            raise ValueError(f"Stage {name!r}: unknown pool {spec['pool']!r}")
+        for kind in spec["outputs"]:
+            if kind not in KINDS:
+                raise ValueError(f"Stage {name!r}: unknown artifact kind {kind!r}")
+            if kind in producers:
+                raise ValueError(f"Stage {name!r}: {kind!r} is already produced by {producers[kind]!r}")
+            producers[kind] = name
+
+        if spec["pool"] == "ingest":
+            if spec["run"] is not None:
+                raise ValueError(f"Stage {name!r}: ingest stages run through run_batch")
+        else:
+            _check_call(name, spec["run"], ["store", "paper", "inputs"])
+        if "agent_run" in spec:
+            _check_call(name, spec["agent_run"], ["store", "paper", "sections"])
+
+    upstream = {}
+    for name, spec in stages.items():
+        upstream[name] = set()
+        for kind in spec["inputs"]:
+            if kind in SOURCES:
+                continue
+            if kind not in producers:
+                raise ValueError(f"Stage {name!r}: no stage produces input {kind!r}")
+            upstream[name].add(producers[kind])
+        if spec["pool"] == "ingest" and upstream[name]:
+            raise ValueError(f"Stage {name!r}: ingest stages can only read sources")
+
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Stage graph has a cycle through {name!r}")
+        visiting.add(name)
+        for dep in sorted(upstream[name]):
+            visit(dep)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+def upstream_stages(stages: Dict[str, Dict[str, Any]]) -> Dict[str, set]:
+    producers = {kind: name for name, spec in stages.items() for kind in spec["outputs"]}
+    return {
+        name: {producers[k] for k in spec["inputs"] if k in producers}
+        for name, spec in stages.items()
+    }
+
+
+def fingerprint(store, paper: str, name: str, spec: Dict[str, Any]) -> Optional[str]:
+    """Hash of a stage's parameters and input artifacts; None if an input is missing."""
+    inputs = {}
+    for kind in spec["inputs"]:
+        info = SOURCES[kind](paper) if kind in SOURCES else store.info(paper, kind)
+        if info is None:
+            return None
+        inputs[kind] = info
+
+    payload = json.dumps(
+        {"stage": name, "params": spec["params"](), "inputs": inputs},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_fresh(store, paper: str, record: Optional[Dict[str, Any]], key: str) -> bool:
+    """The last run finished on the same inputs and its outputs are untouched."""
+    if not record or record.get("status") not in ("ok", "cached") or record.get("fingerprint") != key:
+        return False
+    return all(store.info(paper, kind) == info for kind, info in record["outputs"].items())
+
+
+def state_record(
+    status: str,
+    key: Optional[str] = None,
+    outputs: Optional[Dict[str, Any]] = None,
+    elapsed: float = 0.0,
+    error: Optional[str] = None,
+) -> Dict[str, Any]:
+    """A stage's entry in "pipeline_state"; is_fresh checks it on the next run."""
+    return {
+        "status": status,
+        "fingerprint": key if status in ("ok", "cached") else None,
+        "outputs": outputs or {},
+        "elapsed_s": round(elapsed, 3),
+        "error": error,
+        "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def load_state(store, paper: str) -> Dict[str, Any]:
+    try:
+        return store.read(paper, "pipeline_state")
+    except (OSError, ValueError):
+        return {}
+
+
+def find_papers(store) -> List[str]:
+    """Papers with a PDF to ingest or artifacts already in the store."""
+    return sorted({p.stem for p in RAW_PDF_DIR.glob("*.pdf")} | set(store.papers()))
+
+
+def _run_stage(name: str, spec: Dict[str, Any], store, paper: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        with metrics.timed(name, paper):
+            data = spec["run"](store, paper, inputs)
+        unknown = set(data) - set(spec["outputs"])
+        if unknown:
+            raise ValueError(f"undeclared outputs {sorted(unknown)}")
+        for kind, value in data.items():
+            store.write(paper, kind, value)
+        # A truncated LLM output is kept but not fresh, so it is redone
+        truncated = [f"{kind}: {aborted(value)}" for kind, value in data.items() if aborted(value)]
+        if truncated:
+            result = {"status": "failed", "error": "generation aborted (" + "; ".join(truncated) + ")"}
+        else:
+            result = {"status": "ok", "data": data}
+    except Exception as e:
+        traceback.print_exc()
+        result = {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+    result["elapsed"] = time.perf_counter() - start
+    return result
+
+
+def plan(store, papers: Iterable[str], stages: Optional[List[str]] = None, force: bool = False):
+    """
+    What a run would do per paper and stage, without running anything:
+    "run", "fresh", "kept" (inputs gone, outputs kept) or "blocked".
+    Stages downstream of one that runs are "run" as well.
+    """
+    order = check_stages(STAGES)
+    selected = [s for s in order if stages is None or s in stages]
+    upstream = upstream_stages(STAGES)
+
+    plans = {}
+    for paper in papers:
+        state = load_state(store, paper)
+        decisions = {}
+        for name in selected:
+            spec = STAGES[name]
+            key = fingerprint(store, paper, name, spec)
+            if any(decisions.get(dep) == "run" for dep in upstream[name]):
+                decisions[name] = "run"
+            elif any(decisions.get(dep) == "blocked" for dep in upstream[name]):
+                decisions[name] = "blocked"
+            elif key is None:
+                kept = any(store.exists(paper, kind) for kind in spec["outputs"])
+                decisions[name] = "kept" if kept else "blocked"
+            elif not force and is_fresh(store, paper, state.get(name), key):
+                decisions[name] = "fresh"
+            else:
+                decisions[name] = "run"
+        plans[paper] = decisions
+    return plans
+
+
+def run_pipeline(
+    store,
+    papers: Iterable[str],
+    stages: Optional[List[str]] = None,
+    concurrency: int = pool_capacity(),
+    workers: int = INGEST_WORKERS,
+    timeout: Optional[float] = INGEST_TIMEOUT_S,
+    force: bool = False,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run the selected stages (default: all) for every paper.
+
+    Stages of a paper start as soon as the stages they depend on have
+    finished, so the agents of one paper run concurrently with each other
+    and with the ingestion of the next papers. Up-to-date stages are
+    skipped ("fresh"); a stage whose inputs are missing is "blocked", or
+    "kept" if its outputs are still there. After a failure the paper's
+    downstream stages are "skipped". Stages left out of `stages` are
+    treated as done: their outputs are used as they are.
+    """
+    order = check_stages(STAGES)
+    selected = [s for s in order if stages is None or s in stages]
+    upstream = upstream_stages(STAGES)
+
+    papers = list(papers)
+    state = {paper: load_state(store, paper) for paper in papers}
+    waiting = {paper: list(selected) for paper in papers}
+    running = {paper: set() for paper in papers}
+    stopped = {paper: set() for paper in papers}
+    inputs_cache = {paper: {} for paper in papers}
+
+    ready = {pool: deque() for pool in POOLS}
+    inflight = {pool: 0 for pool in POOLS}
+    limits = {"llm": max(1, concurrency), "local": 1}
+    events = queue.Queue()
+    results = []
+
+    def finish(paper, name, status, key=None, elapsed=0.0, error=None, outputs=None):
+        result = {"paper": paper, "stage": name, "status": status, "elapsed": elapsed, "error": error}
+        results.append(result)
+
+        if status in ("ok", "cached", "failed", "timeout", "crashed"):
+            state[paper][name] = state_record(status, key, outputs, elapsed, error)
+            # Persisted after every stage, so a crash loses at most the
+            # stages that were still running
+            store.write(paper, "pipeline_state", state[paper])
+
+        if on_result is not None:
+            on_result(result)
+
+    def advance(paper):
+        for name in list(waiting[paper]):
+            if upstream[name] & (set(waiting[paper]) | running[paper]):
+                continue
+            waiting[paper].remove(name)
+            spec = STAGES[name]
+
+            if upstream[name] & stopped[paper]:
+                stopped[paper].add(name)
+                finish(paper, name, "skipped", error="an upstream stage did not run")
+                continue
+
+            key = fingerprint(store, paper, name, spec)
+            if key is None:
+                # Downstream stages check for the outputs they need themselves
+                if any(store.exists(paper, kind) for kind in spec["outputs"]):
+                    finish(paper, name, "kept")
+                else:
+                    stopped[paper].add(name)
+                    finish(paper, name, "blocked", error="missing inputs")
+                continue
+
+            if not force and is_fresh(store, paper, state[paper].get(name), key):
+                finish(paper, name, "fresh")
+                continue
+
+            running[paper].add(name)
+            ready[spec["pool"]].append((paper, name, key))
+
+        if not waiting[paper] and not running[paper]:
+            inputs_cache[paper].clear()
+
+    def load_inputs(paper, spec):
+        loaded = inputs_cache[paper]
+        for kind in spec["inputs"]:
+            if kind not in SOURCES and kind not in loaded:
+                loaded[kind] = store.read(paper, kind)
+        return {kind: loaded[kind] for kind in spec["inputs"] if kind in loaded}
+
+    def submit(pools):
+        for pool, executor in pools.items():
+            while ready[pool] and inflight[pool] < limits[pool]:
+                paper, name, key = ready[pool].popleft()
+                spec = STAGES[name]
+                try:
+                    inputs = load_inputs(paper, spec)
+                except (OSError, ValueError) as e:
+                    events.put((paper, name, key, {
+                        "status": "failed", "error": f"{type(e).__name__}: {e}", "elapsed": 0.0,
+                    }))
+                    continue
+
+                inflight[pool] += 1
+                future = executor.submit(_run_stage, name, spec, store, paper, inputs)
+                future.add_done_callback(
+                    lambda f, paper=paper, name=name, key=key, pool=pool:
+                        events.put((paper, name, key, f.result(), pool))
+                )
+
+    for paper in papers:
+        advance(paper)
+
+    # Ingestion is a source stage, so everything it has to do is known now
+    ingest_jobs = {}
+    for paper, name, key in ready["ingest"]:
+        ingest_jobs[paper] = (name, key)
+    ready["ingest"].clear()
+
+    def ingest():
+        reported = set()
+
+        def on_ingested(result):
+            reported.add(result["paper"])
+            name, key = ingest_jobs[result["paper"]]
+            events.put((result["paper"], name, key, result))
+
+        try:
+            run_batch(
+                [RAW_PDF_DIR / f"{paper}.pdf" for paper in ingest_jobs],
+                OUTPUT_DIR,
+                workers=workers,
+                timeout=timeout,
+                force=force,
+                on_result=on_ingested,
+            )
+        except Exception as e:
+            traceback.print_exc()
+            for paper, (name, key) in ingest_jobs.items():
+                if paper not in reported:
+                    events.put((paper, name, key, {"status": "failed", "error": f"{type(e).__name__}: {e}"}))
+
+    ingest_thread = None
+    if ingest_jobs:
+        ingest_thread = threading.Thread(target=ingest, name="pipeline-ingest", daemon=True)
+        ingest_thread.start()
+
+    with ThreadPoolExecutor(limits["llm"], thread_name_prefix="pipeline-llm") as llm_pool, \
+            ThreadPoolExecutor(limits["local"], thread_name_prefix="pipeline-local") as local_pool:
+        pools = {"llm": llm_pool, "local": local_pool}
+
+        while any(running.values()):
+            submit(pools)
+            paper, name, key, result, *pool = events.get()
+            if pool:
+                inflight[pool[0]] -= 1
+
+            running[paper].discard(name)
+            status = result["status"]
+            outputs = None
+            if status in ("ok", "cached"):
+                spec = STAGES[name]
+                # Downstream stages get what was just written without a re-read
+                for kind in spec["outputs"]:
+                    inputs_cache[paper].pop(kind, None)
+                inputs_cache[paper].update(result.get("data", {}))
+                outputs = {kind: store.info(paper, kind) for kind in spec["outputs"]}
+                outputs = {kind: info for kind, info in outputs.items() if info is not None}
+            else:
+                stopped[paper].add(name)
+
+            finish(paper, name, status, key, result.get("elapsed", 0.0), result.get("error"), outputs)
+            advance(paper)
+
+    if ingest_thread is not None:
+        ingest_thread.join()
+    return results
+
+
+def summarize(results: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    stages = {}
+    for r in results:
+        counts = stages.setdefault(r["stage"], {})
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+
+    busy = {}
+    for r in results:
+        busy[r["stage"]] = busy.get(r["stage"], 0.0) + r["elapsed"]
+
+    return {
+        "papers": len({r["paper"] for r in results}),
+        "stages": stages,
+        "wall_time_s": round(wall_time, 3),
+        "stage_busy_time_s": {k: round(v, 3) for k, v in busy.items()},
+        "failures": [
+            {"paper": r["paper"], "stage": r["stage"], "status": r["status"], "error": r["error"]}
+            for r in results if r["status"] in ("failed", "timeout", "crashed")
+        ],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the whole pipeline, re-running only stages whose inputs changed"
+    )
+    parser.add_argument(
+        "--stages", nargs="+", choices=list(STAGES), default=None,
+        help="stages to run; the others are taken as done (default: all)",
+    )
+    parser.add_argument("--papers", nargs="+", help="paper ids to process (default: all)")
+    parser.add_argument(
+        "--concurrency", type=int, default=pool_capacity(),
+        help=f"LLM requests in flight, match the Ollama hosts' total OLLAMA_NUM_PARALLEL (default: {pool_capacity()})",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=INGEST_WORKERS,
+        help=f"ingestion worker processes (default: {INGEST_WORKERS})",
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=INGEST_TIMEOUT_S,
+        help=f"per-paper ingestion timeout in seconds, 0 to disable (default: {INGEST_TIMEOUT_S})",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="re-run the selected stages even if they are up to date",
+    )
+    parser.add_argument(
+        "--plan", action="store_true",
+        help="print what would run for each paper and exit",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = get_store()
+    papers = args.papers or find_papers(store)
+
+    if not papers:
+        print("❌ No papers found (place PDFs in data/raw_pdfs)")
+        return
+
+    if args.plan:
+        for paper, decisions in plan(store, papers, args.stages, args.force).items():
+            print(f"{paper}: " + ", ".join(f"{name}={d}" for name, d in decisions.items()))
+        return
+
+    print(f"🧭 Running the pipeline over {len(papers)} papers")
+    metrics.start_http_server()
+
+    def on_result(result):
+        label = f"{result['stage']}: {result['paper']}"
+        if result["status"] == "ok":
+            print(f"✅ {label} ({result['elapsed']:.1f}s)")
+        elif result["status"] in ("failed", "timeout", "crashed"):
+            print(f"❌ {label}: {result['status']} ({result['error']})")
+        elif result["status"] == "blocked":
+            print(f"⏭️  {label}: {result['error']}")
+
+    start = time.perf_counter()
+    results = run_pipeline(
+        store,
+        papers,
+        stages=args.stages,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        timeout=args.timeout or None,
+        force=args.force,
+        on_result=on_result,
+    )
+    summary = summarize(results, time.perf_counter() - start)
+
+    summary_path = RUNS_DIR / f"pipeline_{datetime.now():%Y%m%d_%H%M%S}.json"
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    print(f"\n📊 {summary['papers']} papers in {summary['wall_time_s']}s")
+    for name, counts in summary["stages"].items():
+        print(f"   {name}: " + ", ".join(f"{n} {s}" for s, n in sorted(counts.items())))
+    print(f"✅ Run summary saved to {summary_path}")
+    if metrics.run_log.path is not None:
+        print(f"📈 Metrics log: {metrics.run_log.path}")
+
+
+if __name__ == "__main__":
+    main()
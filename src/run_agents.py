@@ -0,0 +1,77 @@
+import argparse
+import json
+import time
+from datetime import datetime
+
+from agents.ollama_pool import pool_capacity
+from agents.scheduler import AGENTS, build_jobs, run_agents
+from config import RUNS_DIR
+import metrics
+from storage import get_store
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run all extraction agents over every paper")
+    parser.add_argument(
+        "--agents", nargs="+", choices=list(AGENTS), default=list(AGENTS),
+        help="agents to run (default: all)",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=pool_capacity(),
+        help=f"LLM requests in flight, match the Ollama hosts' total OLLAMA_NUM_PARALLEL (default: {pool_capacity()})",
+    )
+    parser.add_argument(
+        "--skip-existing", action="store_true",
+        help="skip agent outputs that already exist",
+    )
+    parser.add_argument(
+        "--combined", action="store_true",
+        help="extract everything for a paper in one LLM request instead of one per agent",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    jobs = build_jobs(
+        get_store(), args.agents, skip_existing=args.skip_existing, combined=args.combined
+    )
+    if not jobs:
+        print("❌ No agent jobs to run (run src/main.py first)")
+        return
+
+    print(f"🤖 Running {len(jobs)} agent jobs with {args.concurrency} in flight")
+    metrics.start_http_server()
+
+    def on_result(result):
+        if result["status"] == "ok" and result["skipped"] == [result["agent"]]:
+            print(f"⏭️  {result['agent'].capitalize()} agent skipped by triage: {result['paper']}")
+        elif result["status"] == "ok":
+            print(f"✅ {result['agent'].capitalize()} agent done: {result['paper']} ({result['elapsed']:.1f}s)")
+        else:
+            print(f"❌ {result['agent'].capitalize()} agent failed: {result['paper']} ({result['error']})")
+
+    start = time.perf_counter()
+    results = run_agents(jobs, args.concurrency, on_result=on_result)
+    wall_time = time.perf_counter() - start
+
+    failed = [r for r in results if r["status"] != "ok"]
+    summary = {
+        "jobs": len(results),
+        "failed": len(failed),
+        "skipped_by_triage": sum(len(r["skipped"]) for r in results),
+        "wall_time_s": round(wall_time, 3),
+        "jobs_per_s": round(len(results) / wall_time, 3) if wall_time > 0 else 0.0,
+        "failures": failed,
+    }
+
+    summary_path = RUNS_DIR / f"agents_{datetime.now():%Y%m%d_%H%M%S}.json"
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+
+    print(f"\n📊 {len(results)} jobs in {wall_time:.1f}s, {len(failed)} failed")
+    print(f"✅ Run summary saved to {summary_path}")
+
+
+if __name__ == "__main__":
+    main()
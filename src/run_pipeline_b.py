@@ -1,27 +1,36 @@
-import json
-from evaluation.validator import evaluate_record
-from config import OUTPUT_DIR
+from typing import Dict, Any, List
 
+from evaluation.grounding import load_page_index
+from evaluation.validator import evaluate_records
+from storage import get_store
 
-def main():
-    for paper_dir in OUTPUT_DIR.iterdir():
-        micro = paper_dir / f"{paper_dir.name}_microstructure_agent.json"
-        if not micro.exists():
-            continue
 
-        records = json.loads(micro.read_text())
+def validate_paper(store, paper: str, records: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Validation of one paper's microstructure records."""
+    # Evidence is grounded against the source PDF when it is still around
+    try:
+        pages = load_page_index(paper, store)
+    except FileNotFoundError as e:
+        print(f"⚠️ {e}; evidence not grounded")
+        pages = None
+
+    microstructures = records["microstructures"]
+    return [
+        {"record": r, "validation": v}
+        for r, v in zip(microstructures, evaluate_records(microstructures, pages))
+    ]
 
-        validated = []
-        for r in records["microstructures"]:
-            validated.append({
-                "record": r,
-                "validation": evaluate_record(r)
-            })
 
-        out = paper_dir / f"{paper_dir.name}_validated.json"
-        out.write_text(json.dumps(validated, indent=2), encoding="utf-8")
+def main():
+    store = get_store()
+    for paper in store.papers():
+        if not store.exists(paper, "microstructure_agent"):
+            continue
+
+        records = store.read(paper, "microstructure_agent")
+        store.write(paper, "validated", validate_paper(store, paper, records))
 
-        print(f"✅ Pipeline B done: {paper_dir.name}")
+        print(f"✅ Pipeline B done: {paper}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from config import OUTPUT_DIR, STORAGE_BACKEND, STORE_DB_NAME
+
+
+# Artifact kinds written per paper. With the JSON backend each one is
+# OUTPUT_DIR/<paper>/<paper>_<kind>.json, the layout the pipeline has
+# always used.
+KINDS = [
+    "ingest_manifest",
+    "sections",
+    "section_index",
+    "tables",
+    "table1_clean",
+    "triage",
+    "mech_agent",
+    "composition_agent",
+    "processing_agent",
+    "microstructure_agent",
+    "validated",
+    "pipeline_state",
+]
+
+
+def _digest(blob: bytes) -> Dict[str, Any]:
+    return {"sha256": hashlib.sha256(blob).hexdigest(), "bytes": len(blob)}
+
+
+class JSONStore:
+    """One pretty-printed JSON file per artifact, grouped in a folder per paper."""
+
+    def __init__(self, root: Path = OUTPUT_DIR):
+        self.root = Path(root)
+
+    def path(self, paper: str, kind: str) -> Path:
+        return self.root / paper / f"{paper}_{kind}.json"
+
+    def exists(self, paper: str, kind: str) -> bool:
+        return self.path(paper, kind).exists()
+
+    def info(self, paper: str, kind: str) -> Optional[Dict[str, Any]]:
+        path = self.path(paper, kind)
+        if not path.exists():
+            return None
+        stat = path.stat()
+        return {"bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def read(self, paper: str, kind: str) -> Any:
+        path = self.path(paper, kind)
+        if not path.exists():
+            raise FileNotFoundError(f"Missing {kind} for {paper}: {path}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def write(self, paper: str, kind: str, data: Any) -> Dict[str, Any]:
+        path = self.path(paper, kind)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        blob = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+        # Write-then-rename so a crash never leaves a truncated artifact.
+        # Every write gets its own temp file: threads of one process may
+        # write the same artifact at once.
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_bytes(blob)
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return _digest(blob)
+
+    def papers(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    paper   TEXT NOT NULL,
+    kind    TEXT NOT NULL,
+    data    BLOB NOT NULL,
+    sha256  TEXT NOT NULL,
+    bytes   INTEGER NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (paper, kind)
+);
+"""
+
+
+class SQLiteStore:
+    """
+    Corpus-level store: every artifact of every paper is a row holding
+    zlib-compressed compact JSON. One file instead of ~8 per paper, and
+    no directory walk to find papers.
+    """
+
+    def __init__(self, path: Path = OUTPUT_DIR / STORE_DB_NAME):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=60, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(STORE_SCHEMA)
+        self._conn.commit()
+
+    def exists(self, paper: str, kind: str) -> bool:
+        return self.info(paper, kind) is not None
+
+    def info(self, paper: str, kind: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, bytes FROM artifacts WHERE paper = ? AND kind = ?",
+                (paper, kind),
+            ).fetchone()
+        return {"sha256": row[0], "bytes": row[1]} if row else None
+
+    def read(self, paper: str, kind: str) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM artifacts WHERE paper = ? AND kind = ?", (paper, kind)
+            ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"Missing {kind} for {paper} in {self.path}")
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def write(self, paper: str, kind: str, data: Any) -> Dict[str, Any]:
+        blob = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = _digest(blob)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (paper, kind, data, sha256, bytes, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (paper, kind, zlib.compress(blob), digest["sha256"], digest["bytes"], time.time()),
+            )
+            self._conn.commit()
+        return digest
+
+    def papers(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT paper FROM artifacts ORDER BY paper").fetchall()
+        return [r[0] for r in rows]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(backend: str = STORAGE_BACKEND, root: Path = OUTPUT_DIR):
+    """
+    Process-wide store for `backend` ("json" or "sqlite") under `root`.
+    Keyed by pid so worker processes never reuse a parent's connection.
+    """
+    root = Path(root)
+    key = (backend, str(root.resolve()), os.getpid())
+    with _stores_lock:
+        if key not in _stores:
+            if backend == "json":
+                _stores[key] = JSONStore(root)
+            elif backend == "sqlite":
+                _stores[key] = SQLiteStore(root / STORE_DB_NAME)
+            else:
+                raise ValueError(f"Unknown storage backend: {backend!r}")
+        return _stores[key]